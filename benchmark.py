@@ -0,0 +1,395 @@
+"""
+Benchmarks for both diagnosis engines.
+
+Synthetic patients are drawn from symptom_list.COMMON_SYMPTOMS,
+risk_factors.COMMON_RISK_FACTORS and travel_risk_factors. Each stage of the
+symptom_tracker pipeline and of diagnosis_calculator.DiagnosisCalculator is
+timed over the same patients and reported as p50/p99 latency, throughput and
+peak traced memory. Every stage is measured over several rounds, and the
+per-metric median is reported along with its range. Results can be saved as
+a baseline and later runs compared against it; --compare exits with status 1
+when a stage regressed:
+
+    python benchmark.py --save-baseline bench_baseline.json
+    python benchmark.py --compare bench_baseline.json
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import copy
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from diagnosis import POSSIBLE_DIAGNOSES
+from diagnosis_cache import DiagnosisCache
+from diagnosis_calculator import DiagnosisCalculator
+from risk_factors import COMMON_RISK_FACTORS
+from symptom_list import COMMON_SYMPTOMS
+from travel_risk_factors import travel_risk_factors
+import symptom_tracker
+
+# Answer options offered by HealthBot, used for assessment-style profiles
+AGE_OPTIONS = ["0-12", "13-19", "20-39", "40-59", "60-79", "80+"]
+SEX_OPTIONS = ["Male", "Female", "Other"]
+DURATION_OPTIONS = ["Less than 24 hours", "1-3 days", "4-7 days", "1-2 weeks", "More than 2 weeks"]
+SEVERITY_OPTIONS = ["1 - Very Mild", "2-3 - Mild", "4-5 - Moderate", "6-7 - Severe",
+                    "8-9 - Very Severe", "10 - Extremely Severe"]
+DRUG_OPTIONS = ["No medications", "Over-the-counter pain relievers", "Prescription medications",
+                "Multiple medications"]
+
+# Fraction of drawn symptoms taken from the scoring tables' own vocabulary;
+# most COMMON_SYMPTOMS entries have no weights, so purely uniform draws would
+# leave the scoring stages with almost nothing to do
+KNOWN_SYMPTOM_RATIO = 0.7
+
+# Relative slowdown (or memory growth) beyond which a stage counts as regressed
+REGRESSION_THRESHOLD = 0.2
+
+# Rounds each stage is measured in; a regression must show in every round
+REPEAT = 5
+
+# Smallest absolute change per metric that can count as a regression
+MIN_DELTA = {'p50_ms': 0.01, 'p99_ms': 0.05, 'mean_ms': 0.01, 'peak_kib': 4.0}
+
+
+class PatientGenerator:
+    """Seeded generator of synthetic patient profiles"""
+
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.common_symptoms = sorted({s.lower().strip() for s in COMMON_SYMPTOMS if s.strip()})
+        tables = symptom_tracker.get_scoring_tables()
+        self.known_symptoms = sorted(tables.symptoms.names)
+        self.combinations = [tables.symptom_names(members) for members in tables.combinations.members]
+        self.regions = sorted(travel_risk_factors)
+
+    def symptoms(self) -> List[str]:
+        """Draws 1-6 symptoms, sometimes seeded with a known combination"""
+        rng = self.rng
+        drawn = []
+        target = rng.randint(1, 6)
+        if rng.random() < 0.3:
+            members = rng.choice(self.combinations)
+            drawn.extend(rng.sample(members, rng.randint(min(2, len(members)), len(members))))
+        while len(drawn) < target:
+            pool = self.known_symptoms if rng.random() < KNOWN_SYMPTOM_RATIO else self.common_symptoms
+            drawn.append(rng.choice(pool))
+        return drawn
+
+    def tracker_profile(self) -> Dict[str, Any]:
+        """Keyword arguments for symptom_tracker.calculate_diagnosis"""
+        rng = self.rng
+        return {
+            'symptoms': self.symptoms(),
+            'duration': rng.randint(1, 14),
+            'duration_unit': rng.choice(['days', 'weeks', 'months']),
+            'severity': rng.choice(['mild', 'moderate', 'severe']),
+            'age': rng.randint(1, 95),
+            'gender': rng.choice(['male', 'female']),
+            'travel_region': rng.choice(self.regions) if rng.random() < 0.3 else None,
+            'risk_factors': rng.sample(COMMON_RISK_FACTORS, rng.randint(0, 3)) or None
+        }
+
+    def assessment_profile(self) -> Dict[str, Any]:
+        """user_data dictionary as collected by HealthBot"""
+        rng = self.rng
+        return {
+            'age': rng.choice(AGE_OPTIONS),
+            'sex': rng.choice(SEX_OPTIONS),
+            'symptoms': ', '.join(self.symptoms()),
+            'duration': rng.choice(DURATION_OPTIONS),
+            'severity': rng.choice(SEVERITY_OPTIONS),
+            'drug_history': rng.choice(DRUG_OPTIONS),
+            'travel_history': rng.choice(self.regions) if rng.random() < 0.3 else 'No recent travel',
+            'risk_factors': ', '.join(rng.sample(COMMON_RISK_FACTORS, rng.randint(0, 3)))
+        }
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty sample list"""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def measure(
+    fn: Callable[..., Any],
+    calls: List[Tuple[tuple, Dict[str, Any]]]
+) -> Dict[str, float]:
+    """
+    Time fn over every (args, kwargs) pair, then rerun under tracemalloc.
+
+    Memory is traced in a separate pass because tracing slows allocation
+    enough to distort the latency figures.
+    """
+    latencies = []
+    started = time.perf_counter()
+    for args, kwargs in calls:
+        call_started = time.perf_counter()
+        fn(*args, **kwargs)
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    peak = 0
+    for args, kwargs in calls:
+        tracemalloc.reset_peak()
+        fn(*args, **kwargs)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return {
+        'calls': len(calls),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 4),
+        'mean_ms': round(elapsed / len(calls) * 1000, 4),
+        'throughput_per_s': round(len(calls) / elapsed, 1) if elapsed else 0.0,
+        'peak_kib': round(peak / 1024, 1)
+    }
+
+
+def tracker_stages(profiles: List[Dict[str, Any]]) -> Dict[str, Tuple[Callable, List]]:
+    """Builds the symptom_tracker stages and their precomputed inputs"""
+    canonical = [symptom_tracker.canonical_profile(**profile) for profile in profiles]
+    tables = symptom_tracker.get_scoring_tables()
+    symptoms = [tables.symptom_ids(profile.symptoms) for profile in canonical]
+    factors = [profile.scoring_factors() for profile in canonical]
+    partial = [symptom_tracker.find_partial_matches(s) for s in symptoms]
+    individual = [symptom_tracker.calculate_individual_scores(s, f) for s, f in zip(symptoms, factors)]
+    combined = [
+        symptom_tracker.combine_scores(s, p, i)
+        for s, p, i in zip(symptoms, partial, individual)
+    ]
+
+    # The cached stage measures hits, so the shared cache is warmed first
+    symptom_tracker.diagnosis_cache.invalidate()
+    for profile in profiles:
+        symptom_tracker.calculate_diagnosis(**profile)
+    # Typed text as a user would send it: the first half of a symptom
+    typed = [profile['symptoms'][0] for profile in profiles]
+    typed = [symptom[:max(3, len(symptom) // 2)] for symptom in typed]
+    suggestions = symptom_tracker.get_suggestion_index()
+
+    def fresh_scores(values: List[Any]) -> List:
+        # apply_* mutate their input, so every call gets its own untimed copy
+        return [((copy.deepcopy(scores), value), {}) for scores, value in zip(combined, values)]
+
+    return {
+        'tracker.canonical_profile': (
+            symptom_tracker.canonical_profile, [((), profile) for profile in profiles]),
+        'tracker.suggest_symptoms': (
+            suggestions.suggest, [((text,), {}) for text in typed]),
+        'tracker.find_exact_matches': (
+            symptom_tracker.find_exact_matches, [((s,), {}) for s in symptoms]),
+        'tracker.find_partial_matches[dict]': (
+            symptom_tracker.find_partial_matches, [((s,), {'backend': 'dict'}) for s in symptoms]),
+        'tracker.find_partial_matches[matrix]': (
+            symptom_tracker.find_partial_matches, [((s,), {'backend': 'matrix'}) for s in symptoms]),
+        'tracker.individual_scores[dict]': (
+            symptom_tracker.calculate_individual_scores,
+            [((s, f), {'backend': 'dict'}) for s, f in zip(symptoms, factors)]),
+        'tracker.individual_scores[matrix]': (
+            symptom_tracker.calculate_individual_scores,
+            [((s, f), {'backend': 'matrix'}) for s, f in zip(symptoms, factors)]),
+        'tracker.combine_scores': (
+            symptom_tracker.combine_scores,
+            [((s, p, i), {}) for s, p, i in zip(symptoms, partial, individual)]),
+        'tracker.apply_travel_risks': (
+            symptom_tracker.apply_travel_risks,
+            fresh_scores([profile.travel_region for profile in canonical])),
+        'tracker.apply_risk_factors': (
+            symptom_tracker.apply_risk_factors,
+            fresh_scores([list(profile.risk_factors) or None for profile in canonical])),
+        'tracker.calculate_final_results[top5]': (
+            symptom_tracker.calculate_final_results,
+            [((scores, s, {'travel_region': None, 'risk_factors': None}), {'top_k': 5})
+             for scores, s in zip(combined, symptoms)]),
+        'tracker.calculate_diagnosis[uncached]': (
+            symptom_tracker.calculate_diagnosis,
+            [((), dict(profile, use_cache=False)) for profile in profiles]),
+        'tracker.calculate_diagnosis[cached]': (
+            symptom_tracker.calculate_diagnosis, [((), profile) for profile in profiles]),
+    }
+
+
+def assessment_stages(profiles: List[Dict[str, Any]]) -> Dict[str, Tuple[Callable, List]]:
+    """Builds the DiagnosisCalculator stages"""
+    uncached = DiagnosisCalculator(POSSIBLE_DIAGNOSES)
+    uncached.cache = DiagnosisCache(maxsize=0)
+    cached = DiagnosisCalculator(POSSIBLE_DIAGNOSES)
+    for profile in profiles:
+        cached.calculate_diagnosis(profile)
+    calls = [((profile,), {}) for profile in profiles]
+    return {
+        'assessment.calculate_diagnosis[uncached]': (uncached.calculate_diagnosis, calls),
+        'assessment.calculate_diagnosis[cached]': (cached.calculate_diagnosis, calls),
+    }
+
+
+def run_benchmarks(patients: int = 500, seed: int = 0, repeat: int = REPEAT) -> Dict[str, Any]:
+    """Runs every stage over the same synthetic patients, repeat times"""
+    generator = PatientGenerator(seed)
+    tracker_profiles = [generator.tracker_profile() for _ in range(patients)]
+    assessment_profiles = [generator.assessment_profile() for _ in range(patients)]
+
+    stages = {}
+    stages.update(tracker_stages(tracker_profiles))
+    stages.update(assessment_stages(assessment_profiles))
+
+    rounds = []
+    for _ in range(repeat):
+        results = {name: measure(fn, calls) for name, (fn, calls) in stages.items()}
+
+        # Batch APIs are measured per batch and reported per patient
+        batch = measure(symptom_tracker.calculate_diagnosis_batch, [((tracker_profiles,), {})])
+        results['tracker.calculate_diagnosis_batch'] = per_patient(batch, patients)
+        batch = measure(
+            DiagnosisCalculator(POSSIBLE_DIAGNOSES).calculate_diagnosis_batch,
+            [((assessment_profiles,), {})]
+        )
+        results['assessment.calculate_diagnosis_batch'] = per_patient(batch, patients)
+        rounds.append(results)
+
+    return {'meta': run_metadata(patients, seed, repeat), 'stages': summarize(rounds)}
+
+
+def summarize(rounds: List[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Reduces the rounds to the median of every metric per stage
+
+    The [min, max] of each compared metric over the rounds is kept under
+    'range', so compare can tell a shift from the spread between rounds.
+    """
+    summary = {}
+    for name in rounds[0]:
+        samples = [results[name] for results in rounds]
+        stats: Dict[str, Any] = {
+            metric: round(statistics.median(sample[metric] for sample in samples), 4)
+            for metric in samples[0]
+        }
+        stats['calls'] = samples[0]['calls']
+        stats['range'] = {
+            metric: [min(sample[metric] for sample in samples), max(sample[metric] for sample in samples)]
+            for metric in MIN_DELTA
+        }
+        summary[name] = stats
+    return summary
+
+
+def per_patient(batch: Dict[str, float], patients: int) -> Dict[str, float]:
+    """Rescales a single-batch measurement to per-patient figures"""
+    mean_ms = batch['mean_ms'] / patients
+    return {
+        'calls': patients,
+        'p50_ms': round(mean_ms, 4),
+        'p99_ms': round(mean_ms, 4),
+        'mean_ms': round(mean_ms, 4),
+        'throughput_per_s': round(batch['throughput_per_s'] * patients, 1),
+        'peak_kib': batch['peak_kib']
+    }
+
+
+def run_metadata(patients: int, seed: int, repeat: int) -> Dict[str, Any]:
+    """Describes the run so baselines from different setups are not mixed up"""
+    return {
+        'patients': patients,
+        'seed': seed,
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'tables': {
+            'symptom_weights': len(symptom_tracker.knowledge.symptom_weights),
+            'symptom_combinations': len(symptom_tracker.knowledge.symptom_combinations),
+            'travel_risk_factors': len(travel_risk_factors),
+            'possible_diagnoses': len(POSSIBLE_DIAGNOSES)
+        }
+    }
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = REGRESSION_THRESHOLD
+) -> List[str]:
+    """
+    Returns a line per stage metric that regressed beyond threshold
+
+    A metric regresses when its median grew by more than threshold and by
+    more than MIN_DELTA, and even its best round is worse than the worst
+    round of the baseline. Single slow rounds (a GC pause, another process
+    on the machine) and timer jitter on stages taking a few microseconds
+    are therefore not reported. Throughput is covered by mean_ms, its
+    reciprocal.
+    """
+    regressions = []
+    for name, stats in current['stages'].items():
+        before = baseline['stages'].get(name)
+        if before is None:
+            continue
+        for metric, floor in MIN_DELTA.items():
+            delta = stats[metric] - before[metric]
+            if delta <= floor or stats[metric] <= before[metric] * (1 + threshold):
+                continue
+            # Baselines saved before rounds were recorded only have medians
+            best = stats.get('range', {}).get(metric, [stats[metric]])[0]
+            worst_before = before.get('range', {}).get(metric, [before[metric]])[-1]
+            if best > worst_before:
+                regressions.append(f"{name} {metric}: {before[metric]} -> {stats[metric]}")
+    return regressions
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Formats stage results as a fixed-width table"""
+    lines = [
+        f"{'stage':<45}{'p50 ms':>10}{'p99 ms':>10}{'ops/s':>12}{'peak KiB':>11}"
+    ]
+    for name, stats in report['stages'].items():
+        lines.append(
+            f"{name:<45}{stats['p50_ms']:>10.4f}{stats['p99_ms']:>10.4f}"
+            f"{stats['throughput_per_s']:>12.1f}{stats['peak_kib']:>11.1f}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the diagnosis engines")
+    parser.add_argument('--patients', type=int, default=500, help="synthetic patients per stage")
+    parser.add_argument('--seed', type=int, default=0, help="patient generator seed")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="rounds each stage is measured in")
+    parser.add_argument('--save-baseline', metavar='PATH', help="write results to a baseline file")
+    parser.add_argument('--compare', metavar='PATH', help="compare results with a baseline file")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="allowed relative regression before a stage is flagged")
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    report = run_benchmarks(args.patients, args.seed, args.repeat)
+    print(format_report(report))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        if baseline['meta']['tables'] != report['meta']['tables']:
+            print("\nKnowledge tables changed since the baseline was recorded")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions:\n" + '\n'.join(regressions))
+            return 1
+        print("\nNo regressions against baseline")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,13 +7,14 @@ from telegram.ext import (
     ConversationHandler,
     CallbackContext,
 )
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from diagnosis_calculator import DiagnosisCalculator
 from message_formatter import MessageFormatter
 from symptom_list import COMMON_SYMPTOMS
 from risk_factors import COMMON_RISK_FACTORS
 from diagnosis import POSSIBLE_DIAGNOSES
 from health_chat_engine import HealthChatEngine
+from scoring_executor import ScoringExecutor, ScoringBusyError, score_health_assessment
 
 class HealthBot:
     # Define states for the conversation
@@ -63,10 +64,23 @@ class HealthBot:
         "Other (please specify)"
     ]
 
-    def __init__(self, token: str):
+    def __init__(
+        self,
+        token: str,
+        executor_mode: str = 'thread',
+        max_workers: Optional[int] = None,
+        max_pending: int = 32
+    ):
         self.token = token
         self.application = Application.builder().token(token).build()
         self.calculator = DiagnosisCalculator(POSSIBLE_DIAGNOSES)
+        # Scoring runs in a worker pool so it never blocks the event loop
+        self.executor = ScoringExecutor(
+            mode=executor_mode,
+            max_workers=max_workers,
+            max_pending=max_pending,
+            calculator=self.calculator
+        )
         self.formatter = MessageFormatter()
         self.chat_engine = HealthChatEngine()  # Add this line
 
@@ -80,7 +94,10 @@ class HealthBot:
         """Start the bot."""
         print("Enhanced CareWave Bot is starting...")
         self.setup_handlers()
-        self.application.run_polling()
+        try:
+            self.application.run_polling()
+        finally:
+            self.executor.shutdown()
 
     def _setup_conversation(self) -> ConversationHandler:
         """Set up the conversation handler with all states and transitions."""
@@ -289,8 +306,14 @@ class HealthBot:
         risk_factors = update.message.text
         context.user_data["risk_factors"] = risk_factors if risk_factors.lower() != "none" else ""
         
-        # Calculate diagnosis
-        diagnosis_results = self.calculator.calculate_diagnosis(context.user_data)
+        # Calculate diagnosis in the worker pool
+        try:
+            diagnosis_results = await self.executor.run(score_health_assessment, dict(context.user_data))
+        except ScoringBusyError:
+            await update.message.reply_text(
+                "We're handling a lot of assessments right now. Please send your answer again in a moment."
+            )
+            return self.RISK_FACTORS
         message = await MessageFormatter.format_diagnosis_result(diagnosis_results)
         
         await update.message.reply_text(message)
@@ -0,0 +1,103 @@
+from typing import Dict, Iterable, List, Tuple
+
+from vocabulary import Vocabulary, canonical_name
+
+
+def symptom_mask(symptom_ids: Iterable[int]) -> int:
+    """Returns the bitset of symptom IDs, with bit i set for ID i; unknown IDs are left out"""
+    mask = 0
+    for symptom_id in symptom_ids:
+        if symptom_id >= 0:
+            mask |= 1 << symptom_id
+    return mask
+
+
+class CombinationIndex:
+    """
+    Symptom combinations as bitsets, with an inverted index from each symptom
+
+    Every combination's members are stored as a symptom_mask, so the number
+    of symptoms a patient shares with it is the popcount of an AND and an
+    exact match is an integer comparison.
+    """
+
+    def __init__(
+        self,
+        combinations: Dict[str, Dict[str, float]],
+        symptoms: Vocabulary,
+        diseases: Vocabulary
+    ):
+        """
+        Build the index once from a symptom combination table.
+
+        Member symptoms and diseases are interned into the given vocabularies,
+        so spellings of one disease inside a combination add up to one weight,
+        and a symptom listed twice in one key counts as one member.
+
+        Args:
+            combinations: Mapping of comma-separated symptom keys to disease weights
+            symptoms: Vocabulary the member symptoms are interned into
+            diseases: Vocabulary the diseases are interned into
+        """
+        self.keys: List[str] = []
+        self.members: List[Tuple[int, ...]] = []
+        self.masks: List[int] = []
+        self.diseases: List[Dict[int, float]] = []
+        self.by_symptom: Dict[int, List[int]] = {}
+        # Member mask -> combination with exactly those members; a key listed
+        # in sorted order wins over other orderings of the same members
+        self.exact: Dict[int, int] = {}
+
+        for combination_id, (combination, weights) in enumerate(combinations.items()):
+            names = [canonical_name(symptom) for symptom in combination.split(',')]
+            members = tuple(dict.fromkeys(symptoms.intern(name) for name in names))
+            mask = symptom_mask(members)
+            disease_weights: Dict[int, float] = {}
+            for disease, weight in weights.items():
+                disease_id = diseases.intern(disease)
+                disease_weights[disease_id] = disease_weights.get(disease_id, 0) + weight
+
+            self.keys.append(combination)
+            self.members.append(members)
+            self.masks.append(mask)
+            self.diseases.append(disease_weights)
+            if names == sorted(names) or mask not in self.exact:
+                self.exact[mask] = combination_id
+            for symptom_id in members:
+                self.by_symptom.setdefault(symptom_id, []).append(combination_id)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def candidates(self, symptom_ids: Iterable[int]) -> List[int]:
+        """Returns IDs of combinations sharing at least one symptom, in table order"""
+        combination_ids = set()
+        for symptom_id in set(symptom_ids):
+            combination_ids.update(self.by_symptom.get(symptom_id, ()))
+        return sorted(combination_ids)
+
+    def matches(self, mask: int) -> List[Tuple[int, List[int]]]:
+        """
+        Returns the combinations a symptom mask partially matches, in table order
+
+        A combination matches when the mask shares at least two of its
+        members, or its only member. Each match comes with the shared member
+        IDs in member order.
+        """
+        matched = []
+        for combination_id in self.candidates(self.symptoms_of(mask)):
+            shared = mask & self.masks[combination_id]
+            members = self.members[combination_id]
+            if shared.bit_count() >= min(2, len(members)):
+                matched.append((combination_id, [s for s in members if shared >> s & 1]))
+        return matched
+
+    @staticmethod
+    def symptoms_of(mask: int) -> List[int]:
+        """Returns the symptom IDs set in a mask, in ascending order"""
+        symptom_ids = []
+        while mask:
+            lowest = mask & -mask
+            symptom_ids.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        return symptom_ids
@@ -0,0 +1,118 @@
+from typing import Dict, List
+import numpy as np
+
+from combination_index import CombinationIndex
+
+
+class CombinationMatrix:
+    """Symptom combinations as two CSR matrices over combination rows"""
+
+    # CSR arrays of a matrix, as exported by arrays(): combination x symptom
+    # membership (all ones, so only the structure is stored) and
+    # combination x disease weights
+    ARRAYS = ('member_start', 'member_ids', 'disease_start', 'disease_ids', 'weights')
+
+    def __init__(self, index: CombinationIndex, symptom_count: int):
+        """
+        Compile a combination index into CSR arrays.
+
+        Args:
+            index: Combinations with interned member and disease IDs
+            symptom_count: Number of symptom IDs, the width of the membership matrix
+        """
+        self.symptom_count = symptom_count
+        self.member_start = self._starts(index.members)
+        self.member_ids = np.array(
+            [symptom_id for members in index.members for symptom_id in members], dtype=np.int64
+        )
+        self.disease_start = self._starts(index.diseases)
+        self.disease_ids = np.array(
+            [disease_id for diseases in index.diseases for disease_id in diseases], dtype=np.int64
+        )
+        self.weights = np.array(
+            [weight for diseases in index.diseases for weight in diseases.values()], dtype=np.float64
+        )
+
+    @staticmethod
+    def _starts(rows: List) -> np.ndarray:
+        """CSR row pointers of a list of rows"""
+        starts = np.zeros(len(rows) + 1, dtype=np.int64)
+        starts[1:] = np.cumsum([len(row) for row in rows], dtype=np.int64)
+        return starts
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], symptom_count: int) -> 'CombinationMatrix':
+        """
+        Rebuild a matrix around existing arrays without copying them.
+
+        Args:
+            arrays: Arrays as returned by arrays(), e.g. views of a memory-mapped file
+            symptom_count: Number of symptom IDs
+        """
+        matrix = cls.__new__(cls)
+        matrix.symptom_count = symptom_count
+        for name in cls.ARRAYS:
+            setattr(matrix, name, arrays[name])
+        return matrix
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Returns every array of the matrix, keyed by attribute name"""
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def match_ratios(self, symptom_ids: List[int]) -> np.ndarray:
+        """
+        Returns the partial match ratio of every combination for a symptom set.
+
+        The shared member count of each combination is the membership matrix
+        times the patient's 0/1 symptom vector, taken as differences of a
+        running sum over each CSR row. Combinations sharing fewer than two
+        members (or their only member) get a ratio of 0.
+        """
+        patient = np.zeros(self.symptom_count + 1, dtype=np.int64)
+        known = [symptom_id for symptom_id in symptom_ids if 0 <= symptom_id < self.symptom_count]
+        patient[known] = 1
+
+        shared = np.zeros(len(self.member_ids) + 1, dtype=np.int64)
+        np.cumsum(patient[self.member_ids], out=shared[1:])
+        counts = shared[self.member_start[1:]] - shared[self.member_start[:-1]]
+        sizes = np.diff(self.member_start)
+
+        matched = (counts > 0) & (counts >= np.minimum(2, sizes))
+        return np.where(matched, counts / np.maximum(sizes, 1), 0.0)
+
+    def partial_matches(self, symptom_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Scores partial combination matches in the same shape as find_partial_matches.
+
+        Disease scores are the transposed weight matrix times the ratio
+        vector, summed by one bincount in combination order, so they carry
+        the same floating point sums as the dict walk.
+        """
+        ratios = self.match_ratios(symptom_ids)
+        rows = np.flatnonzero(ratios)
+        if not len(rows):
+            return {}
+
+        # Weight entries of the matched rows, gathered without a Python loop
+        lengths = self.disease_start[rows + 1] - self.disease_start[rows]
+        entry_rows = np.repeat(rows, lengths)
+        offsets = np.repeat(self.disease_start[rows] - (np.cumsum(lengths) - lengths), lengths)
+        entries = np.arange(len(entry_rows)) + offsets
+        totals = np.bincount(
+            self.disease_ids[entries],
+            weights=self.weights[entries] * ratios[entry_rows]
+        ).tolist()
+
+        patient = set(symptom_ids)
+        matches = {}
+        for row in rows.tolist():
+            members = self.member_ids[self.member_start[row]:self.member_start[row + 1]].tolist()
+            intersection = [symptom_id for symptom_id in members if symptom_id in patient]
+            for disease_id in self.disease_ids[self.disease_start[row]:self.disease_start[row + 1]].tolist():
+                if disease_id not in matches:
+                    matches[disease_id] = {
+                        'score': totals[disease_id],
+                        'matching_symptoms': []
+                    }
+                matches[disease_id]['matching_symptoms'].extend(intersection)
+        return matches
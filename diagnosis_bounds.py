@@ -0,0 +1,83 @@
+from typing import Any, Dict, List, Mapping, Tuple
+
+
+class DiagnosisBounds:
+    """
+    Per-disease upper bounds on every score contribution, for top-k pruning
+
+    A single symptom weight entry, combination, travel region, drug or risk
+    factor can add at most the bound of its kind to a disease's score, so a
+    request's upper bound for a disease is the number of active sources of
+    each kind times these bounds. The per-disease symptom entries and the
+    row totals let a pruned ranking score single diseases and normalize by
+    the total score without building a score table for every disease.
+
+    Bounds only hold while no weight or modifier factor is negative; admissible
+    is False otherwise, and scores must not be pruned.
+    """
+
+    def __init__(self, tables: Any, profile_bounds: List[float]):
+        """
+        Collect the bounds of a scoring tables snapshot.
+
+        Args:
+            tables: ScoringTables (or SharedScoringTables) snapshot
+            profile_bounds: Largest modifier product of every profile, by profile ID
+        """
+        disease_count = len(tables.diseases)
+        self.admissible = all(
+            factor >= 0 for profile in tables.profiles
+            for factors in profile.values() for factor in factors.values()
+        )
+
+        # Kind -> disease ID -> largest contribution of one source of that kind
+        self.symptom = [0.0] * disease_count
+        self.combination = [0.0] * disease_count
+        self.travel = [0.0] * disease_count
+        self.drugs = [0.0] * disease_count
+        self.risks = [0.0] * disease_count
+
+        # Disease ID -> symptom ID -> (weight, profile ID) entries, in row order
+        self.symptom_entries: Dict[int, Dict[int, List[Tuple[float, int]]]] = {}
+        # Symptom ID -> disease of every entry of its row, in entry order (a
+        # disease spelled twice in a row is listed twice), and profile ID ->
+        # summed weight of the row's entries
+        self.row_diseases: Dict[int, Tuple[int, ...]] = {}
+        self.row_totals: Dict[int, Dict[int, float]] = {}
+
+        for symptom_id in tables.symptom_rows:
+            entries = tables.symptom_rows[symptom_id]
+            totals: Dict[int, float] = {}
+            for disease_id, weight, profile_id in entries:
+                self.admissible = self.admissible and weight >= 0
+                bound = weight * profile_bounds[profile_id]
+                if bound > self.symptom[disease_id]:
+                    self.symptom[disease_id] = bound
+                self.symptom_entries.setdefault(disease_id, {}).setdefault(symptom_id, []).append(
+                    (weight, profile_id)
+                )
+                totals[profile_id] = totals.get(profile_id, 0) + weight
+            self.row_diseases[symptom_id] = tuple(disease_id for disease_id, _, _ in entries)
+            self.row_totals[symptom_id] = totals
+
+        self.combination_totals: List[float] = []
+        for diseases in tables.combinations.diseases:
+            self._collect(self.combination, diseases)
+            self.combination_totals.append(sum(diseases.values()))
+
+        # Factor table name -> factor -> summed weight of its row
+        self.factor_totals: Dict[str, Dict[str, float]] = {}
+        for table_name in ('travel', 'drugs', 'risks'):
+            table = getattr(tables, table_name)
+            self.factor_totals[table_name] = {}
+            for factor in table:
+                row = table[factor]
+                self._collect(getattr(self, table_name), row)
+                self.factor_totals[table_name][factor] = sum(row.values())
+
+    def _collect(self, bounds: List[float], row: Mapping[int, float]) -> None:
+        """Raises the bounds of a row's diseases to its weights"""
+        for disease_id, weight in row.items():
+            self.admissible = self.admissible and weight >= 0
+            if weight > bounds[disease_id]:
+                bounds[disease_id] = weight
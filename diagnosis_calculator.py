@@ -1,58 +1,338 @@
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, Callable, FrozenSet, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
 from datetime import datetime, timedelta
+from diagnosis_cache import DiagnosisCache
+from fuzzy_index import FuzzyIndex
+from symptom_extractor import SymptomExtractor
+from symptom_aliases import symptom_aliases as SYMPTOM_ALIASES
+
+# Symptom inputs whose resolved symptoms are kept, so repeated inputs skip matching
+SYMPTOM_CACHE_SIZE = 4096
+
+def _canonical_factors(names: Iterable[str]) -> FrozenSet[str]:
+    """Lower-cases and strips table names the way patient symptoms and risk factors are"""
+    return frozenset(name.lower().strip() for name in names if name)
+
+class CompiledDiagnosis:
+    """Scoring data for one diagnosis, resolved once from its raw dictionary."""
+
+    __slots__ = (
+        'name', 'symptom_categories', 'explained_symptoms',
+        'risk_factors', 'risk_factor_count', 'risk_weights', 'similarity_factors',
+        'typical_severity', 'age_ranges', 'age_risk_factors',
+        'duration_range', 'sex_specific', 'drug_interactions', 'travel_related',
+        'urgent_care_needed', 'primary_recommendations',
+        'secondary_recommendations', 'general_recommendations',
+        'risk_factor_recommendations'
+    )
+
+    def __init__(self, diagnosis: Dict[str, Any], default_symptom_weights: Dict[str, float]):
+        """
+        Compile one entry of the diagnosis table.
+        
+        Args:
+            diagnosis: Raw diagnosis dictionary
+            default_symptom_weights: Category weights used when the diagnosis has none
+        """
+        if not isinstance(diagnosis, dict):
+            raise ValueError("each diagnosis must be a dictionary")
+
+        self.name = diagnosis.get('diagnosis', 'Unknown')
+
+        # (weight, symptom set, symptom count) for every weighted category present
+        symptoms = diagnosis.get('symptoms', {})
+        weights = diagnosis.get('symptom_weights', default_symptom_weights)
+        self.symptom_categories = tuple(
+            (weight, frozenset(symptoms[category]), len(symptoms[category]))
+            for category, weight in weights.items()
+            if category in symptoms
+        ) if isinstance(symptoms, dict) else ()
+
+        # Symptoms reported as matches; None when the table entry cannot be explained
+        self.explained_symptoms = (
+            frozenset(symptoms.get('primary', [])) | frozenset(symptoms.get('secondary', []))
+            if isinstance(symptoms, dict) else None
+        )
+
+        risk_factors = diagnosis.get('risk_factors', [])
+        self.risk_factors = frozenset(risk_factors)
+        self.risk_factor_count = len(risk_factors)
+        self.risk_weights = diagnosis.get('risk_weights', {})
+
+        # (primary symptoms, secondary symptoms, risk factors) compared by
+        # DiagnosisSimilarity and intersected with the patient's canonical
+        # inputs, so spelled as those are; a plain symptom list counts as primary
+        if isinstance(symptoms, dict):
+            primary = _canonical_factors(symptoms.get('primary', []))
+            secondary = _canonical_factors(symptoms.get('secondary', []))
+        else:
+            primary = _canonical_factors(symptoms or [])
+            secondary = frozenset()
+        self.similarity_factors = (
+            primary, secondary, _canonical_factors([*risk_factors, *diagnosis.get('risk_modifiers', {})])
+        )
+
+        self.typical_severity = diagnosis.get('typical_severity', 0.5)
+        self.age_ranges = frozenset(diagnosis.get('age_range', []))
+        self.age_risk_factors = diagnosis.get('age_risk_factors', {})
+
+        typical_duration = diagnosis.get('typical_duration', {})
+        self.duration_range = (
+            (typical_duration.get('min', 0), typical_duration.get('max', float('inf')))
+            if typical_duration else None
+        )
+
+        sex_specific = diagnosis.get('sex_specific')
+        self.sex_specific = sex_specific.lower() if sex_specific else None
+        self.drug_interactions = tuple(diagnosis.get('drug_interactions') or ())
+        self.travel_related = bool(diagnosis.get('travel_related'))
+
+        self.urgent_care_needed = diagnosis.get('urgent_care_needed', False)
+        self.primary_recommendations = tuple(diagnosis.get('primary_recommendations', []))
+        self.secondary_recommendations = tuple(diagnosis.get('secondary_recommendations', []))
+        self.general_recommendations = tuple(diagnosis.get('general_recommendations', []))
+        self.risk_factor_recommendations = diagnosis.get('risk_factor_recommendations', {})
+
+class DiagnosisSimilarity:
+    """Pairwise symptom and risk factor overlap of a diagnosis table, computed once."""
+
+    # Weights of shared primary symptoms, secondary symptoms and risk factors
+    FACTOR_WEIGHTS = (0.5, 0.3, 0.2)
+
+    def __init__(self, model: List[CompiledDiagnosis]):
+        """
+        Build the similarity matrix of a compiled diagnosis table.
+        
+        Row a of the matrix holds, for every diagnosis b sharing anything
+        with a, the shared factors of each kind, and the similarity of b to
+        a: the weighted count of shared factors relative to the weighted
+        count of a's factors, so 1.0 when b has all of them.
+        
+        Args:
+            model: Compiled diagnoses; rows and columns follow their order
+        """
+        self.names = [diagnosis.name for diagnosis in model]
+        self.factors = [diagnosis.similarity_factors for diagnosis in model]
+        # Name -> row; a name listed twice refers to its first entry
+        self.index: Dict[str, int] = {}
+        for position, name in enumerate(self.names):
+            self.index.setdefault(name, position)
+
+        self.overlaps: List[Dict[int, Tuple[FrozenSet[str], ...]]] = []
+        self.similar: List[List[Tuple[float, int]]] = []
+        for first in model:
+            overlaps = {}
+            similar = []
+            factor_weight = self._weighted(first.similarity_factors)
+            for position, second in enumerate(model):
+                if second is first:
+                    continue
+                shared = tuple(
+                    factors & other
+                    for factors, other in zip(first.similarity_factors, second.similarity_factors)
+                )
+                if any(shared):
+                    overlaps[position] = shared
+                    # Suggestions list every other name once
+                    if self.index[second.name] == position and second.name != first.name:
+                        similar.append((self._weighted(shared) / factor_weight, position))
+            self.overlaps.append(overlaps)
+            # Most similar first, table order between equals
+            self.similar.append(sorted(similar, key=lambda item: -item[0]))
+
+    def _weighted(self, factors: Tuple[FrozenSet[str], ...]) -> float:
+        """Weighted count of (primary, secondary, risk) factors."""
+        return sum(weight * len(kind) for weight, kind in zip(self.FACTOR_WEIGHTS, factors))
+
+    def patient_similarity(
+        self,
+        first: int,
+        second: int,
+        matched: Tuple[FrozenSet[str], ...]
+    ) -> float:
+        """
+        Similarity of two diagnoses over the factors a patient matched.
+        
+        Args:
+            first: Row of the reference diagnosis
+            second: Row of the compared diagnosis
+            matched: The patient's matches of each factor kind for the first diagnosis
+            
+        Returns:
+            Weighted count of matched factors both diagnoses share, relative
+            to the weighted count of matched factors, or 0.0 when nothing
+            matched; 1.0 when the second diagnosis has every matched factor
+        """
+        total_weight = self._weighted(matched)
+        shared = self.overlaps[first].get(second)
+        if not total_weight or shared is None:
+            return 0.0
+        return self._weighted(tuple(kind & factors for kind, factors in zip(shared, matched))) / total_weight
 
 class DiagnosisCalculator:
-    def __init__(self, possible_diagnoses: List[Dict[str, Any]]):
+    def __init__(
+        self,
+        possible_diagnoses: List[Dict[str, Any]],
+        cache_size: int = 1024,
+        cache_ttl: Optional[float] = 3600,
+        symptom_aliases: Optional[Mapping[str, Sequence[str]]] = None
+    ):
         """
         Initialize the DiagnosisCalculator with possible diagnoses.
         
         Args:
             possible_diagnoses: List of dictionaries containing diagnosis information
+            cache_size: Maximum number of cached results, 0 disables the result cache
+            cache_ttl: Seconds a cached result stays valid, None keeps it until evicted
+            symptom_aliases: Canonical symptom -> other names, defaults to the symptom_aliases table
         """
         if not isinstance(possible_diagnoses, list):
             raise ValueError("possible_diagnoses must be a list")
         self.possible_diagnoses = possible_diagnoses
+        self.symptom_aliases = SYMPTOM_ALIASES if symptom_aliases is None else symptom_aliases
         self.symptom_weights = {
             'primary': 0.5,
             'secondary': 0.3,
             'tertiary': 0.2
         }
+        self.model = self._compile_model(possible_diagnoses)
+        self.similarity = DiagnosisSimilarity(self.model)
+        self.symptom_resolver, self.symptom_extractor = self._compile_symptom_matchers(self.model)
+        self.symptom_cache = DiagnosisCache(SYMPTOM_CACHE_SIZE)
+        self.cache = DiagnosisCache(cache_size, cache_ttl)
+
+    def _compile_model(self, possible_diagnoses: List[Dict[str, Any]]) -> List[CompiledDiagnosis]:
+        """Compile the raw diagnosis table into the records scored per request."""
+        return [CompiledDiagnosis(diagnosis, self.symptom_weights) for diagnosis in possible_diagnoses]
+
+    def _compile_symptom_matchers(
+        self,
+        model: List[CompiledDiagnosis]
+    ) -> Tuple[FuzzyIndex, SymptomExtractor]:
+        """
+        Index every symptom the compiled diagnoses name, for misspelled and free-text input.
+        
+        Every name of an alias group resolves to the first name of the group
+        the diagnoses use; names the diagnoses use resolve to themselves.
+        """
+        names = set()
+        for diagnosis in model:
+            for _, symptoms, _ in diagnosis.symptom_categories:
+                names.update(symptoms)
+            primary, secondary, _ = diagnosis.similarity_factors
+            names.update(primary | secondary)
+        terms = [(name, name.lower().strip()) for name in sorted(names)]
+
+        known = {symptom for _, symptom in terms}
+        for symptom, aliases in self.symptom_aliases.items():
+            group = [name.lower().strip() for name in (symptom, *aliases)]
+            used = [name for name in group if name in known]
+            if used:
+                terms.extend((name, used[0]) for name in group)
+        return FuzzyIndex(terms), SymptomExtractor(terms)
+
+    def reload_diagnoses(self, possible_diagnoses: List[Dict[str, Any]]) -> None:
+        """
+        Replace the diagnosis table and drop results cached against the old one.
+        
+        Args:
+            possible_diagnoses: List of dictionaries containing diagnosis information
+        """
+        if not isinstance(possible_diagnoses, list):
+            raise ValueError("possible_diagnoses must be a list")
+        model = self._compile_model(possible_diagnoses)
+        self.similarity = DiagnosisSimilarity(model)
+        self.symptom_resolver, self.symptom_extractor = self._compile_symptom_matchers(model)
+        self.model = model
+        self.possible_diagnoses = possible_diagnoses
+        self.symptom_cache.invalidate()
+        self.cache.invalidate()
 
     def calculate_diagnosis(self, user_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Calculate diagnosis based on user inputs.
         
+        Inputs are reduced to a canonical profile (deduplicated, sorted and
+        lower-cased symptoms and risk factors, with misspelled symptoms
+        resolved to the table's, parsed age group, duration and severity)
+        and results for a profile seen before are served from self.cache.
+        Cached results are shared and must not be modified.
+        
         Args:
             user_data: Dictionary containing user health information
             
         Returns:
             List of dictionaries containing diagnosis results
         """
+        return self._calculate_diagnosis(user_data, {})
+
+    def calculate_diagnosis_batch(
+        self,
+        profiles: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Calculate diagnoses for many user profiles in one call.
+        
+        Raw inputs repeated across profiles (symptom strings, severity, age
+        and duration options) are parsed once for the whole batch.
+        
+        Args:
+            profiles: List of user_data dictionaries as accepted by calculate_diagnosis
+            
+        Returns:
+            One list of diagnosis results per profile, in input order
+        """
+        parse_cache: Dict[Tuple[str, str], Any] = {}
+        return [self._calculate_diagnosis(profile, parse_cache) for profile in profiles]
+
+    def _calculate_diagnosis(
+        self,
+        user_data: Dict[str, Any],
+        parse_cache: Dict[Tuple[str, str], Any]
+    ) -> List[Dict[str, Any]]:
+        """Calculate diagnosis, reusing parsed inputs from parse_cache."""
         try:
             # Input validation
             if not isinstance(user_data, dict):
                 raise ValueError("user_data must be a dictionary")
 
             # Parse and normalize user inputs with defaults
-            user_symptoms = self._normalize_symptoms(user_data.get('symptoms', ''))
-            user_risk_factors = self._normalize_list(user_data.get('risk_factors', ''))
-            severity = self._parse_severity(user_data.get('severity', 'moderate'))
-            age = self._parse_age_range(user_data.get('age', 'adult'))
-            duration = self._parse_duration(user_data.get('duration', '1-3 days'))
+            user_symptoms = self._parse_cached(
+                parse_cache, self._canonical_symptoms, user_data.get('symptoms', ''))
+            user_risk_factors = self._parse_cached(
+                parse_cache, self._canonical_list, user_data.get('risk_factors', ''))
+            severity = self._parse_cached(
+                parse_cache, self._parse_severity, user_data.get('severity', 'moderate'))
+            age = self._parse_cached(
+                parse_cache, self._parse_age_range, user_data.get('age', 'adult'))
+            duration = self._parse_cached(
+                parse_cache, self._parse_duration, user_data.get('duration', '1-3 days'))
+            sex = self._canonical_text(user_data.get('sex', ''))
+            drug_history = self._canonical_text(user_data.get('drug_history', ''))
+            travel_history = user_data.get('travel_history', '')
+
+            cache_key = self._profile_key(
+                user_symptoms, user_risk_factors, severity, age, duration,
+                sex, drug_history, travel_history
+            )
+            if cache_key is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
             
             results = []
+            user_symptom_set = frozenset(user_symptoms)
             
-            for diagnosis in self.possible_diagnoses:
+            for diagnosis in self.model:
                 score = self._calculate_comprehensive_score(
                     diagnosis=diagnosis,
-                    user_symptoms=user_symptoms,
+                    user_symptoms=user_symptom_set,
                     user_risk_factors=user_risk_factors,
                     severity=severity,
                     age=age,
                     duration=duration,
-                    sex=user_data.get('sex', ''),
-                    drug_history=user_data.get('drug_history', ''),
-                    travel_history=user_data.get('travel_history', '')
+                    sex=sex,
+                    drug_history=drug_history,
+                    travel_history=travel_history
                 )
                 
                 matching_factors = self._analyze_matching_factors(
@@ -60,25 +340,63 @@ class DiagnosisCalculator:
                     user_data={
                         'symptoms': user_symptoms,
                         'risk_factors': user_risk_factors,
-                        'travel_history': user_data.get('travel_history', ''),
-                        'drug_history': user_data.get('drug_history', '')
+                        'travel_history': travel_history,
+                        'drug_history': drug_history
                     }
                 )
                 
                 results.append({
-                    "diagnosis": diagnosis.get('diagnosis', 'Unknown'),
+                    "diagnosis": diagnosis.name,
                     "probability": round(score, 2),
                     "confidence": self._calculate_confidence_level(score, matching_factors),
                     "matching_factors": matching_factors,
                     "recommendations": self._generate_recommendations(diagnosis, score, matching_factors)
                 })
 
-            return self._apply_differential_diagnosis(results)
+            results = self._apply_differential_diagnosis(results, user_symptom_set, user_risk_factors)
+            if cache_key is not None:
+                self.cache.put(cache_key, results)
+            return results
             
         except Exception as e:
             print(f"Error in calculate_diagnosis: {str(e)}")
             return [{"diagnosis": "Error", "probability": 0, "confidence": {"level": "Low", "score": 0}}]
 
+    def _parse_cached(
+        self,
+        parse_cache: Dict[Tuple[str, str], Any],
+        parser: Callable[[Any], Any],
+        raw_value: Any
+    ) -> Any:
+        """Parse a raw string input once per cache, passing other types straight through."""
+        if not isinstance(raw_value, str):
+            return parser(raw_value)
+        key = (parser.__name__, raw_value)
+        if key not in parse_cache:
+            parse_cache[key] = parser(raw_value)
+        return parse_cache[key]
+
+    def _profile_key(self, *profile: Any) -> Optional[Hashable]:
+        """Build the result cache key for a canonical profile, or None if it is unhashable."""
+        key = tuple(tuple(part) if isinstance(part, list) else part for part in profile)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def _canonical_symptoms(self, symptoms: Union[str, List[str]]) -> List[str]:
+        """Normalize symptoms, then deduplicate and sort them."""
+        return sorted(set(self._normalize_symptoms(symptoms)))
+
+    def _canonical_list(self, items: Union[str, List[str]]) -> List[str]:
+        """Normalize a list input, then deduplicate and sort it."""
+        return sorted(set(self._normalize_list(items)))
+
+    def _canonical_text(self, value: Any) -> Any:
+        """Lower-case free text that is only ever compared case-insensitively."""
+        return value.lower().strip() if isinstance(value, str) else value
+
     def _parse_severity(self, severity: str) -> float:
         """Parse severity string to float value."""
         try:
@@ -143,22 +461,22 @@ class DiagnosisCalculator:
     def _calculate_risk_score(
         self,
         user_risk_factors: List[str],
-        diagnosis_risk_factors: List[str],
-        risk_weights: Dict[str, float]
+        diagnosis: CompiledDiagnosis
     ) -> float:
         """Calculate risk score based on matching risk factors."""
         try:
-            if not diagnosis_risk_factors:
+            if not diagnosis.risk_factor_count:
                 return 0.0
                 
-            matches = sum(1 for risk in user_risk_factors if risk in diagnosis_risk_factors)
-            base_score = (matches / len(diagnosis_risk_factors)) * 100
+            matches = sum(1 for risk in user_risk_factors if risk in diagnosis.risk_factors)
+            base_score = (matches / diagnosis.risk_factor_count) * 100
             
             # Apply weights if available
+            risk_weights = diagnosis.risk_weights
             if risk_weights:
                 weighted_score = 0
                 for risk in user_risk_factors:
-                    if risk in diagnosis_risk_factors:
+                    if risk in diagnosis.risk_factors:
                         weighted_score += risk_weights.get(risk, 1.0)
                 return min(weighted_score * 20, 100)  # Scale to 0-100
                 
@@ -169,8 +487,8 @@ class DiagnosisCalculator:
 
     def _calculate_comprehensive_score(
         self,
-        diagnosis: Dict[str, Any],
-        user_symptoms: List[str],
+        diagnosis: CompiledDiagnosis,
+        user_symptoms: FrozenSet[str],
         user_risk_factors: List[str],
         severity: float,
         age: str,
@@ -185,40 +503,34 @@ class DiagnosisCalculator:
             
             # Symptom score (40%)
             symptom_score = self._calculate_weighted_symptom_score(
-                user_symptoms, 
-                diagnosis.get('symptoms', {}),
-                diagnosis.get('symptom_weights', self.symptom_weights)
+                user_symptoms,
+                diagnosis.symptom_categories
             )
             score += symptom_score * 0.4
             
             # Risk score (20%)
-            risk_score = self._calculate_risk_score(
-                user_risk_factors,
-                diagnosis.get('risk_factors', []),
-                diagnosis.get('risk_weights', {})
-            )
+            risk_score = self._calculate_risk_score(user_risk_factors, diagnosis)
             score += risk_score * 0.2
             
             # Severity score (15%)
             severity_score = self._calculate_severity_alignment(
                 severity,
-                diagnosis.get('typical_severity', 0.5)
+                diagnosis.typical_severity
             )
             score += severity_score * 0.15
             
             # Age appropriateness (10%)
             age_score = self._calculate_age_appropriateness(
                 age,
-                diagnosis.get('age_range', []),
-                diagnosis.get('age_risk_factors', {})
+                diagnosis.age_ranges,
+                diagnosis.age_risk_factors
             )
             score += age_score * 0.1
             
             # Duration appropriateness (10%)
             duration_score = self._calculate_duration_appropriateness(
                 duration,
-                diagnosis.get('typical_duration', {}),
-                diagnosis.get('duration_weights', {})
+                diagnosis.duration_range
             )
             score += duration_score * 0.1
             
@@ -237,22 +549,19 @@ class DiagnosisCalculator:
 
     def _calculate_weighted_symptom_score(
         self,
-        user_symptoms: List[str],
-        diagnosis_symptoms: Dict[str, List[str]],
-        weights: Dict[str, float]
+        user_symptoms: FrozenSet[str],
+        symptom_categories: Tuple[Tuple[float, FrozenSet[str], int], ...]
     ) -> float:
         """Calculate weighted symptom score."""
         try:
             score = 0.0
             total_weight = 0.0
             
-            for category, weight in weights.items():
-                if category in diagnosis_symptoms:
-                    matches = len([s for s in user_symptoms if s in diagnosis_symptoms[category]])
-                    total_possible = len(diagnosis_symptoms[category])
-                    if total_possible > 0:
-                        score += (matches / total_possible) * weight
-                        total_weight += weight
+            for weight, category_symptoms, total_possible in symptom_categories:
+                matches = len(user_symptoms & category_symptoms)
+                if total_possible > 0:
+                    score += (matches / total_possible) * weight
+                    total_weight += weight
             
             return (score / total_weight * 100) if total_weight > 0 else 0
             
@@ -270,7 +579,7 @@ class DiagnosisCalculator:
     def _calculate_age_appropriateness(
         self,
         age: str,
-        age_ranges: List[str],
+        age_ranges: FrozenSet[str],
         age_risk_factors: Dict[str, float]
     ) -> float:
         """Calculate age appropriateness score."""
@@ -293,16 +602,14 @@ class DiagnosisCalculator:
     def _calculate_duration_appropriateness(
         self,
         duration: int,
-        typical_duration: Dict[str, int],
-        duration_weights: Dict[str, float]
+        duration_range: Optional[Tuple[float, float]]
     ) -> float:
         """Calculate duration appropriateness score."""
         try:
-            if not typical_duration:
+            if duration_range is None:
                 return 100.0
             
-            min_duration = typical_duration.get('min', 0)
-            max_duration = typical_duration.get('max', float('inf'))
+            min_duration, max_duration = duration_range
             
             if min_duration <= duration <= max_duration:
                 return 100.0
@@ -320,7 +627,7 @@ class DiagnosisCalculator:
 
     def _evaluate_contextual_factors(
         self,
-        diagnosis: Dict[str, Any],
+        diagnosis: CompiledDiagnosis,
         context: Dict[str, str]
     ) -> float:
         """Evaluate contextual factors for diagnosis."""
@@ -329,20 +636,20 @@ class DiagnosisCalculator:
             relevant_factors = 0
             
             # Check sex-specific conditions
-            if diagnosis.get('sex_specific'):
-                if context['sex'].lower() != diagnosis['sex_specific'].lower():
+            if diagnosis.sex_specific:
+                if context['sex'].lower() != diagnosis.sex_specific:
                     score *= 0.5
                 relevant_factors += 1
             
             # Check drug interactions
-            if diagnosis.get('drug_interactions'):
+            if diagnosis.drug_interactions:
                 if any(drug in context['drug_history'].lower() 
-                      for drug in diagnosis['drug_interactions']):
+                      for drug in diagnosis.drug_interactions):
                     score *= 0.7
                 relevant_factors += 1
             
             # Check travel-related factors
-            if diagnosis.get('travel_related'):
+            if diagnosis.travel_related:
                 if 'no recent travel' in context['travel_history'].lower():
                     score *= 0.8
                 relevant_factors += 1
@@ -354,26 +661,28 @@ class DiagnosisCalculator:
 
     def _analyze_matching_factors(
         self,
-        diagnosis: Dict[str, Any],
+        diagnosis: CompiledDiagnosis,
         user_data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Analyze matching factors between user data and diagnosis."""
         try:
+            if diagnosis.explained_symptoms is None:
+                raise ValueError("diagnosis symptoms are not categorized")
+
             # Combine primary and secondary symptoms into a single list
             matching_symptoms = [
                 symptom for symptom in user_data['symptoms']
-                if (symptom in diagnosis.get('symptoms', {}).get('primary', []) or
-                    symptom in diagnosis.get('symptoms', {}).get('secondary', []))
+                if symptom in diagnosis.explained_symptoms
             ]
             
             # Get matching risk factors
             matching_risk_factors = [
                 factor for factor in user_data['risk_factors']
-                if factor in diagnosis.get('risk_factors', [])
+                if factor in diagnosis.risk_factors
             ]
 
             # Check travel risk
-            travel_match = ('No' if not diagnosis.get('travel_related') or
+            travel_match = ('No' if not diagnosis.travel_related or
                         'no recent travel' in user_data['travel_history'].lower()
                         else user_data['travel_history'])
 
@@ -455,7 +764,7 @@ class DiagnosisCalculator:
 
     def _generate_recommendations(
         self,
-        diagnosis: Dict[str, Any],
+        diagnosis: CompiledDiagnosis,
         probability: float,
         matching_factors: Dict[str, Any]
     ) -> List[str]:
@@ -465,19 +774,19 @@ class DiagnosisCalculator:
             
             # High probability recommendations
             if probability >= 75:
-                if diagnosis.get('urgent_care_needed', False):
+                if diagnosis.urgent_care_needed:
                     recommendations.append("Seek immediate medical attention")
-                recommendations.extend(diagnosis.get('primary_recommendations', []))
+                recommendations.extend(diagnosis.primary_recommendations)
                 
             # Medium probability recommendations
             elif probability >= 50:
                 recommendations.append("Consider consulting a healthcare provider")
-                recommendations.extend(diagnosis.get('secondary_recommendations', []))
+                recommendations.extend(diagnosis.secondary_recommendations)
                 
             # Low probability recommendations
             else:
                 recommendations.append("Monitor symptoms for changes")
-                recommendations.extend(diagnosis.get('general_recommendations', []))
+                recommendations.extend(diagnosis.general_recommendations)
             
             # Add risk factor specific recommendations
             if matching_factors['risk_factors']:
@@ -493,13 +802,13 @@ class DiagnosisCalculator:
 
     def _get_risk_factor_recommendations(
         self,
-        diagnosis: Dict[str, Any],
+        diagnosis: CompiledDiagnosis,
         risk_factors: List[str]
     ) -> List[str]:
         """Get recommendations specific to identified risk factors."""
         try:
             recommendations = []
-            risk_recommendations = diagnosis.get('risk_factor_recommendations', {})
+            risk_recommendations = diagnosis.risk_factor_recommendations
             
             for risk_factor in risk_factors:
                 if risk_factor in risk_recommendations:
@@ -512,7 +821,9 @@ class DiagnosisCalculator:
 
     def _apply_differential_diagnosis(
         self,
-        results: List[Dict[str, Any]]
+        results: List[Dict[str, Any]],
+        user_symptoms: FrozenSet[str],
+        user_risk_factors: List[str]
     ) -> List[Dict[str, Any]]:
         """Apply differential diagnosis logic to results."""
         try:
@@ -530,29 +841,47 @@ class DiagnosisCalculator:
             ]
             
             # Adjust confidence levels for similar diagnoses
-            return self._adjust_similar_diagnoses(filtered_results)
+            return self._adjust_similar_diagnoses(filtered_results, user_symptoms, user_risk_factors)
             
         except Exception:
             return results
 
     def _adjust_similar_diagnoses(
         self,
-        results: List[Dict[str, Any]]
+        results: List[Dict[str, Any]],
+        user_symptoms: FrozenSet[str],
+        user_risk_factors: List[str]
     ) -> List[Dict[str, Any]]:
-        """Adjust confidence levels for similar diagnoses."""
+        """
+        Adjust confidence levels for diagnoses similar to the top one.
+        
+        Similarity comes from the precomputed similarity matrix row of the
+        top diagnosis, restricted to the factors the patient matched.
+        """
         try:
             if not results:
                 return results
                 
+            similarity = self.similarity
             adjusted_results = results.copy()
-            top_diagnosis = results[0]
+            top = similarity.index.get(results[0]['diagnosis'])
+            if top is None:
+                return adjusted_results
+
+            # The patient's matches of each factor kind for the top diagnosis
+            primary, secondary, risks = similarity.factors[top]
+            matched = (
+                primary & user_symptoms,
+                secondary & user_symptoms,
+                risks & frozenset(user_risk_factors)
+            )
             
             for i, diagnosis in enumerate(adjusted_results[1:], 1):
                 # Check for overlapping symptoms
-                similarity_score = self._calculate_similarity(
-                    top_diagnosis['matching_factors'],
-                    diagnosis['matching_factors']
-                )
+                second = similarity.index.get(diagnosis['diagnosis'])
+                if second is None:
+                    continue
+                similarity_score = similarity.patient_similarity(top, second, matched)
                 
                 # Adjust confidence if diagnoses are very similar
                 if similarity_score > 0.7:
@@ -564,51 +893,64 @@ class DiagnosisCalculator:
         except Exception:
             return results
 
-    def _calculate_similarity(
-        self,
-        factors1: Dict[str, Any],
-        factors2: Dict[str, Any]
-    ) -> float:
-        """Calculate similarity score between two sets of matching factors."""
-        try:
-            primary_intersection = len(
-                set(factors1['primary_symptoms']) &
-                set(factors2['primary_symptoms'])
-            )
-            secondary_intersection = len(
-                set(factors1['secondary_symptoms']) &
-                set(factors2['secondary_symptoms'])
-            )
-            risk_intersection = len(
-                set(factors1['risk_factors']) &
-                set(factors2['risk_factors'])
-            )
-            
-            total_factors = len(factors1['primary_symptoms']) + \
-                          len(factors1['secondary_symptoms']) + \
-                          len(factors1['risk_factors'])
+    def similar_conditions(self, diagnosis: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        List the diagnoses most similar to one diagnosis.
+        
+        Args:
+            diagnosis: Diagnosis name as listed in the diagnosis table
+            limit: Maximum number of conditions returned
             
-            if total_factors == 0:
-                return 0.0
-                
-            return (primary_intersection * 0.5 + 
-                   secondary_intersection * 0.3 +
-                   risk_intersection * 0.2) / total_factors
-                   
-        except Exception:
-            return 0.0
+        Returns:
+            List of dictionaries with the similar diagnosis and its similarity
+            score between 0 and 1, most similar first; empty for unknown names
+        """
+        similarity = self.similarity
+        position = similarity.index.get(diagnosis)
+        if position is None:
+            return []
+        return [
+            {"diagnosis": similarity.names[other], "similarity": round(score, 2)}
+            for score, other in similarity.similar[position][:limit]
+        ]
 
     def _normalize_symptoms(self, symptoms: Union[str, List[str]]) -> List[str]:
-        """Normalize symptom input to list format."""
+        """
+        Normalize symptom input to list format.
+        
+        Each comma-separated item is taken as one symptom, resolving misspellings
+        of known symptoms; an item that is not one is searched for the known
+        symptoms it mentions, dropping negated ones ("fever but no cough").
+        Resolved items are kept in self.symptom_cache.
+        """
         try:
             if isinstance(symptoms, list):
-                return [s.lower().strip() for s in symptoms if s]
+                items = [s.lower().strip() for s in symptoms if s]
             elif isinstance(symptoms, str):
-                return [s.lower().strip() for s in symptoms.split(',') if s]
-            return []
+                items = [s.lower().strip() for s in symptoms.split(',') if s]
+            else:
+                return []
+            normalized = []
+            for item in items:
+                matched = self.symptom_cache.get(item)
+                if matched is None:
+                    matched = self._match_symptoms(item)
+                    self.symptom_cache.put(item, matched)
+                normalized.extend(matched)
+            return normalized
         except Exception:
             return []
 
+    def _match_symptoms(self, item: str) -> Tuple[str, ...]:
+        """Resolve one symptom input to the known symptoms it names, or keep it as is."""
+        resolved = self.symptom_resolver.resolve(item)
+        if resolved is not None:
+            return (resolved,)
+        mentions = self.symptom_extractor.mentions(item)
+        if mentions:
+            return tuple(symptom for symptom, negated in mentions if not negated)
+        return (item,)
+
     def _normalize_list(self, items: Union[str, List[str]]) -> List[str]:
         """Normalize any list input to standard format."""
         try:
@@ -0,0 +1,126 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from vocabulary import canonical_name
+
+# Most edits a lookup tolerates, reached by texts of 8 characters or more
+MAX_DISTANCE = 2
+
+# Leading characters of a term whose deletions are indexed
+PREFIX_LENGTH = 7
+
+
+def allowed_distance(text: str) -> int:
+    """Edits tolerated for text: none up to 3 characters, one up to 7, then MAX_DISTANCE"""
+    return min(MAX_DISTANCE, len(text) // 4)
+
+
+def edit_distance(first: str, second: str, limit: int) -> int:
+    """
+    Returns the edit distance of two strings, or limit + 1 when it exceeds limit.
+
+    Insertions, deletions, substitutions and swaps of adjacent characters
+    (optimal string alignment) each count as one edit. Only the diagonal band
+    of width limit is filled, and the walk stops once a row exceeds limit.
+    """
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    if len(first) > len(second):
+        first, second = second, first
+    beyond = limit + 1
+
+    previous: List[int] = []
+    row = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        before, previous = previous, row
+        row = [beyond] * (len(second) + 1)
+        row[0] = i
+        character = first[i - 1]
+        low = max(1, i - limit)
+        high = min(len(second), i + limit)
+        for j in range(low, high + 1):
+            cost = 0 if character == second[j - 1] else 1
+            value = min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + cost)
+            if (cost and i > 1 and j > 1 and character == second[j - 2]
+                    and first[i - 2] == second[j - 1]):
+                value = min(value, before[j - 2] + 1)
+            row[j] = value
+        if min(row[low - 1:high + 1]) > limit:
+            return beyond
+    return min(row[len(second)], beyond)
+
+
+def deletions(text: str, depth: int) -> Set[str]:
+    """Returns text and every string made by deleting up to depth of its characters"""
+    found = {text}
+    layer = {text}
+    for _ in range(depth):
+        layer = {word[:i] + word[i + 1:] for word in layer for i in range(len(word))} - found
+        found |= layer
+    return found
+
+
+class FuzzyIndex:
+    """
+    Resolves misspelled text to the closest known term, within a few edits
+
+    Symmetric deletion index: each term is filed under every string left by
+    deleting up to MAX_DISTANCE characters from its first PREFIX_LENGTH
+    characters. Two texts within k edits of each other share such a string,
+    so a lookup only generates the deletions of its own prefix and verifies
+    the terms filed under them, instead of comparing against every term.
+    """
+
+    def __init__(self, terms: Iterable[Tuple[str, str]]):
+        """
+        Build the index once.
+
+        Args:
+            terms: (term, resolution) pairs; the term is matched against text,
+                the resolution is returned for it. The first pair of a term wins.
+        """
+        self.resolutions: Dict[str, str] = {}
+        self.terms: List[str] = []
+        # Deletion of a term prefix -> term IDs filed under it, in term order
+        self.deletions: Dict[str, List[int]] = {}
+
+        for term, resolution in terms:
+            term = canonical_name(term)
+            if not term or term in self.resolutions:
+                continue
+            self.resolutions[term] = resolution
+            term_id = len(self.terms)
+            self.terms.append(term)
+            for deletion in deletions(term[:PREFIX_LENGTH], MAX_DISTANCE):
+                self.deletions.setdefault(deletion, []).append(term_id)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def resolve(self, text: str) -> Optional[str]:
+        """
+        Returns the resolution of the term closest to text, or None.
+
+        A known term resolves directly. Otherwise the closest term within
+        allowed_distance(text) edits wins, ties going to the earlier term.
+        """
+        query = canonical_name(text)
+        if query in self.resolutions:
+            return self.resolutions[query]
+        matches = self.matches(query, allowed_distance(query))
+        return self.resolutions[matches[0][1]] if matches else None
+
+    def matches(self, text: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Returns (distance, term) of every term within max_distance edits of text, closest first"""
+        query = canonical_name(text)
+        max_distance = min(max_distance, MAX_DISTANCE)
+        candidates: Set[int] = set()
+        for deletion in deletions(query[:PREFIX_LENGTH], max_distance):
+            candidates.update(self.deletions.get(deletion, ()))
+
+        found = []
+        for term_id in sorted(candidates):
+            term = self.terms[term_id]
+            distance = edit_distance(query, term, max_distance)
+            if distance <= max_distance:
+                found.append((distance, term_id))
+        return [(distance, self.terms[term_id]) for distance, term_id in sorted(found)]
@@ -0,0 +1,141 @@
+"""
+Lazy access to the knowledge tables.
+
+The table modules (symptom_weights, symptom_combinations, ...) are large
+dict literals. KnowledgeBase imports each one the first time it is read, so
+processes that never score symptoms never load the tables, and reload()
+re-executes the modules to pick up edits without a restart.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+import importlib
+import threading
+
+# Table name -> (module, attribute) it is loaded from
+KNOWLEDGE_MODULES = {
+    'symptom_weights': ('symptom_weights', 'symptom_weights'),
+    'symptom_combinations': ('symptom_combinations', 'symptom_combinations'),
+    'risk_factor_weights': ('risk_factor_weights', 'risk_factor_weights'),
+    'travel_risk_factors': ('travel_risk_factors', 'travel_risk_factors'),
+    'drug_history_weights': ('drug_history_weights', 'drug_history_weights'),
+    'common_symptoms': ('symptom_list', 'COMMON_SYMPTOMS'),
+    'common_risk_factors': ('risk_factors', 'COMMON_RISK_FACTORS'),
+    'symptom_aliases': ('symptom_aliases', 'symptom_aliases'),
+}
+
+
+def load_knowledge_tables(
+    names: Iterable[str] = KNOWLEDGE_MODULES,
+    reload: bool = False
+) -> Dict[str, Any]:
+    """
+    Load knowledge tables from their modules.
+
+    Args:
+        names: Tables to load, keys of KNOWLEDGE_MODULES
+        reload: Re-execute already imported modules
+
+    Returns:
+        Mapping of table name to table; tables whose module is missing are
+        left out
+    """
+    tables = {}
+    for name in names:
+        module, attribute = KNOWLEDGE_MODULES[name]
+        try:
+            loaded = importlib.import_module(module)
+            if reload:
+                loaded = importlib.reload(loaded)
+        except ImportError:
+            continue
+        tables[name] = getattr(loaded, attribute)
+    return tables
+
+
+class KnowledgeBase:
+    """
+    Lazy accessor for the knowledge tables.
+
+    Each table is loaded the first time it is read as an attribute
+    (knowledge.symptom_weights), so processes that never score symptoms
+    never load the tables. Tables whose module is missing read as empty.
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in KNOWLEDGE_MODULES:
+            raise AttributeError(name)
+        return self.table(name)
+
+    def table(self, name: str) -> Any:
+        """Returns a table, loading it on first use"""
+        table = self._tables.get(name)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(name)
+                if table is None:
+                    table = self._load([name]).get(name)
+        return table
+
+    def _load(self, names: List[str], reload: bool = False) -> Dict[str, Any]:
+        self._tables.update(self.read(names, reload))
+        return self._tables
+
+    def read(self, names: Iterable[str], reload: bool = False) -> Dict[str, Any]:
+        """
+        Load tables without serving them.
+
+        Args:
+            names: Tables to load
+            reload: Re-execute the table modules instead of reusing imported ones
+
+        Returns:
+            Mapping of table name to table, with missing tables as empty dicts
+        """
+        names = list(names)
+        loaded = load_knowledge_tables(names, reload)
+        for name in names:
+            if name not in loaded:
+                print(f"Knowledge table {name} is unavailable, using an empty table")
+        return {name: loaded.get(name, {}) for name in names}
+
+    def replace(self, tables: Dict[str, Any]) -> None:
+        """Serves the given tables in place of the current ones, all at once"""
+        with self._lock:
+            self._tables = dict(self._tables, **tables)
+
+    def loaded(self) -> List[str]:
+        """Names of the tables loaded so far"""
+        return sorted(self._tables)
+
+    def prewarm(
+        self,
+        names: Iterable[str] = KNOWLEDGE_MODULES,
+        background: bool = True
+    ) -> Optional[threading.Thread]:
+        """
+        Load tables ahead of their first use.
+
+        Args:
+            names: Tables to load
+            background: Load in a daemon thread and return it instead of blocking
+
+        Returns:
+            The loading thread, or None when loaded in the foreground
+        """
+        names = list(names)
+        if not background:
+            for name in names:
+                self.table(name)
+            return None
+        thread = threading.Thread(
+            target=self.prewarm, args=(names, False), name='knowledge-prewarm', daemon=True
+        )
+        thread.start()
+        return thread
+
+    def reload(self) -> None:
+        """Re-reads every table loaded so far and swaps them in together"""
+        self.replace(self.read(self.loaded(), reload=True))
@@ -0,0 +1,192 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import importlib
+import os
+import threading
+
+from diagnosis import POSSIBLE_DIAGNOSES
+from diagnosis_calculator import DiagnosisCalculator
+
+EXECUTOR_MODES = ('thread', 'process')
+
+# Knowledge base loaded once per worker process, or once for a thread pool
+_worker_calculator: Optional[DiagnosisCalculator] = None
+
+
+class ScoringBusyError(Exception):
+    """Raised when the scoring queue stays full for longer than the queue timeout"""
+
+
+def preload_knowledge_base(
+    preload_tracker: bool = False,
+    calculator: Optional[DiagnosisCalculator] = None,
+    shared_tables: Optional[str] = None
+) -> None:
+    """
+    Load the scoring tables before the first request reaches a worker.
+
+    Args:
+        preload_tracker: Also load the symptom_tracker tables and combination index
+        calculator: Calculator to share with thread workers instead of building one
+        shared_tables: Snapshot file to attach the symptom_tracker tables to
+            instead of loading them into this process
+    """
+    global _worker_calculator
+    if _worker_calculator is None:
+        _worker_calculator = calculator or DiagnosisCalculator(POSSIBLE_DIAGNOSES)
+    if shared_tables:
+        importlib.import_module('symptom_tracker').attach_shared_tables(shared_tables)
+    elif preload_tracker:
+        importlib.import_module('symptom_tracker').prewarm_knowledge_base(background=False)
+
+
+def score_health_assessment(user_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Run the health assessment calculator inside a worker."""
+    if _worker_calculator is None:
+        preload_knowledge_base()
+    return _worker_calculator.calculate_diagnosis(user_data)
+
+
+class ScoringExecutor:
+    """Runs synchronous diagnosis scoring off the asyncio event loop"""
+
+    def __init__(
+        self,
+        mode: str = 'thread',
+        max_workers: Optional[int] = None,
+        max_pending: int = 32,
+        queue_timeout: float = 5.0,
+        calculator: Optional[DiagnosisCalculator] = None,
+        preload_tracker: bool = False,
+        share_tables: bool = False
+    ):
+        """
+        Start a worker pool for diagnosis scoring.
+
+        Args:
+            mode: 'thread' for a thread pool or 'process' for a process pool
+            max_workers: Pool size, defaults to the executor's own default
+            max_pending: Maximum jobs running or waiting at once
+            queue_timeout: Seconds a job may wait for a free slot before it is rejected
+            calculator: Calculator shared by thread workers; process workers build their own
+            preload_tracker: Also load the symptom_tracker tables in every worker
+            share_tables: In process mode, compile the symptom_tracker tables
+                once in this process and have every worker map them read-only
+                instead of holding its own copy
+        """
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"mode must be one of {EXECUTOR_MODES}")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+
+        self.mode = mode
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+        self._max_workers = max_workers
+        self._preload_tracker = preload_tracker
+        self._share_tables = share_tables
+        self._shared_files: List[str] = []
+        if mode == 'process':
+            self._executor: Executor = self._process_pool()
+        else:
+            # Threads share memory, so the knowledge base is loaded once here
+            preload_knowledge_base(preload_tracker, calculator)
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix='scoring'
+            )
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        shared_tables = None
+        if self._share_tables:
+            shared_tables = importlib.import_module('symptom_tracker').export_shared_tables()
+            self._shared_files.append(shared_tables)
+        return ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            initializer=preload_knowledge_base,
+            initargs=(self._preload_tracker, None, shared_tables)
+        )
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run fn(*args, **kwargs) in the pool and await its result.
+
+        At most max_pending jobs are admitted at once. Callers beyond that wait
+        up to queue_timeout seconds for a slot and then get ScoringBusyError,
+        so a burst of assessments cannot pile up unbounded work. In process
+        mode fn and its arguments must be picklable.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ScoringBusyError("Too many assessments are being scored right now")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue occupancy and counters."""
+        return {
+            'mode': self.mode,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+
+    def restart(self) -> None:
+        """
+        Start fresh workers after the knowledge tables were reloaded.
+
+        Process workers keep the tables they loaded at startup, so the pool is
+        replaced: new jobs go to the new workers while jobs already submitted
+        finish in the old ones. With share_tables, the new workers attach to
+        a freshly exported snapshot, and the old snapshot is removed once the
+        old workers have exited. Thread workers share the reloaded tables and
+        are left running.
+        """
+        if self.mode != 'process':
+            return
+        retired_files = list(self._shared_files)
+        previous, self._executor = self._executor, self._process_pool()
+        threading.Thread(
+            target=self._retire, args=(previous, retired_files), name='scoring-retire', daemon=True
+        ).start()
+
+    def _retire(self, pool: Executor, paths: List[str]) -> None:
+        """Waits for a replaced pool to finish its jobs, then removes its snapshots"""
+        # Workers started for queued jobs may not have attached to the file
+        # yet, so it is only removed after every worker has exited
+        pool.shutdown(wait=True)
+        self._remove_shared_files(paths)
+
+    def _remove_shared_files(self, paths: List[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._shared_files = [path for path in self._shared_files if path not in paths]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool and remove its shared table snapshots."""
+        self._executor.shutdown(wait=wait)
+        # Workers that still map a removed file keep reading it until they exit
+        self._remove_shared_files(list(self._shared_files))
@@ -0,0 +1,148 @@
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+
+class ScoringMatrix:
+    """Compiled symptom x disease weight table"""
+
+    # Array attributes of a matrix, as exported by arrays()
+    ARRAYS = (
+        'symptom_row', 'row_start', 'row_disease_start', 'row_disease_ids',
+        'disease_index', 'weights', 'entry_profile'
+    )
+
+    def __init__(self, rows: Dict[int, List[Tuple[int, float, int]]], disease_count: int):
+        """
+        Compile symptom weight rows into flat arrays.
+
+        Entries are stored row by row (one row per symptom), so each row is a
+        contiguous slice of the disease, weight and profile arrays. Modifiers
+        are not part of the matrix: every request passes the multiplier of
+        each modifier profile, which entries pick up by profile ID.
+
+        Args:
+            rows: Mapping of symptom ID -> (disease ID, weight, profile ID) entries
+            disease_count: Number of disease IDs, the width of the score table
+        """
+        self.disease_count = disease_count
+        self.symptom_row = np.full(max(rows, default=-1) + 1, -1, dtype=np.int64)
+        row_start = [0]
+        row_disease_start = [0]
+        row_disease_ids = []
+
+        disease_index = []
+        entry_weights = []
+        entry_profile = []
+
+        for symptom_id, entries in rows.items():
+            self.symptom_row[symptom_id] = len(row_start) - 1
+            for disease_id, weight, profile_id in entries:
+                disease_index.append(disease_id)
+                entry_weights.append(weight)
+                entry_profile.append(profile_id)
+            row_start.append(len(entry_weights))
+            row_disease_ids.extend(dict.fromkeys(disease_id for disease_id, _, _ in entries))
+            row_disease_start.append(len(row_disease_ids))
+
+        self.row_start = np.array(row_start, dtype=np.int64)
+        self.row_disease_start = np.array(row_disease_start, dtype=np.int64)
+        self.row_disease_ids = np.array(row_disease_ids, dtype=np.int64)
+        self.disease_index = np.array(disease_index, dtype=np.int64)
+        self.weights = np.array(entry_weights, dtype=np.float64)
+        self.entry_profile = np.array(entry_profile, dtype=np.int64)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], disease_count: int) -> 'ScoringMatrix':
+        """
+        Rebuild a matrix around existing arrays without copying them.
+
+        Args:
+            arrays: Arrays as returned by arrays(), e.g. views of a memory-mapped file
+            disease_count: Number of disease IDs
+        """
+        matrix = cls.__new__(cls)
+        matrix.disease_count = disease_count
+        for name in cls.ARRAYS:
+            setattr(matrix, name, arrays[name])
+        return matrix
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Returns every array of the matrix, keyed by attribute name"""
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def row_of(self, symptom_id: int) -> int:
+        """Returns the row of a symptom ID, or -1 when it has no weights"""
+        if 0 <= symptom_id < len(self.symptom_row):
+            return int(self.symptom_row[symptom_id])
+        return -1
+
+    def row_diseases(self, row: int) -> List[int]:
+        """Returns the distinct disease IDs of a row, in entry order"""
+        return self.row_disease_ids[self.row_disease_start[row]:self.row_disease_start[row + 1]].tolist()
+
+    def score(
+        self,
+        symptom_ids: List[int],
+        multipliers: Sequence[float]
+    ) -> Dict[int, Dict]:
+        """Scores symptoms in the same shape as calculate_individual_scores"""
+        return self.score_batch([(symptom_ids, multipliers)])[0]
+
+    def score_batch(
+        self,
+        requests: List[Tuple[List[int], Sequence[float]]]
+    ) -> List[Dict[int, Dict]]:
+        """
+        Score many (symptoms, profile multipliers) pairs with one set of array operations.
+
+        Entries of all requests are gathered into a single vector and summed
+        into a (requests x diseases) table by one bincount, so per-request
+        Python work is limited to row lookups and result assembly. Requests
+        sharing one multiplier sequence convert it to an array once.
+        """
+        request_rows = []
+        entry_chunks = []
+        modifier_chunks = []
+        offset_chunks = []
+        multiplier_arrays = {}
+
+        for position, (symptom_ids, multipliers) in enumerate(requests):
+            rows = [(symptom_id, self.row_of(symptom_id)) for symptom_id in symptom_ids]
+            rows = [(symptom_id, row) for symptom_id, row in rows if row >= 0]
+            request_rows.append(rows)
+            if not rows:
+                continue
+
+            entries = np.concatenate([
+                np.arange(self.row_start[row], self.row_start[row + 1]) for _, row in rows
+            ])
+            entry_chunks.append(entries)
+            offset_chunks.append(np.full(len(entries), position * self.disease_count))
+            if id(multipliers) not in multiplier_arrays:
+                multiplier_arrays[id(multipliers)] = np.asarray(multipliers, dtype=np.float64)
+            modifier_chunks.append(multiplier_arrays[id(multipliers)][self.entry_profile[entries]])
+
+        if not entry_chunks:
+            return [{} for _ in requests]
+
+        entries = np.concatenate(entry_chunks)
+        totals = np.bincount(
+            np.concatenate(offset_chunks) + self.disease_index[entries],
+            weights=self.weights[entries] * np.concatenate(modifier_chunks),
+            minlength=len(requests) * self.disease_count
+        ).reshape(len(requests), self.disease_count).tolist()
+
+        results = []
+        for rows, request_totals in zip(request_rows, totals):
+            scores = {}
+            for symptom_id, row in rows:
+                for disease_id in self.row_diseases(row):
+                    if disease_id not in scores:
+                        scores[disease_id] = {
+                            'score': request_totals[disease_id],
+                            'matching_symptoms': []
+                        }
+                    scores[disease_id]['matching_symptoms'].append(symptom_id)
+            results.append(scores)
+
+        return results
@@ -0,0 +1,212 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+import threading
+
+from combination_index import CombinationIndex
+from combination_matrix import CombinationMatrix
+from diagnosis_bounds import DiagnosisBounds
+from scoring_matrix import ScoringMatrix
+from vocabulary import Vocabulary
+
+# (patient factor, symptom_weights entry field) pairs, in the order modifiers multiply
+MODIFIER_FIELDS = (
+    ('duration', 'durationFactors'),
+    ('severity', 'severityFactors'),
+    ('age_group', 'ageFactors'),
+    ('gender', 'genderFactors'),
+)
+
+# Resolved patient factors: for every MODIFIER_FIELDS entry, the table keys
+# to try in order of preference
+ModifierKeys = Tuple[Tuple[str, ...], ...]
+
+# Distinct resolved factor sets whose profile multipliers are kept per snapshot
+MULTIPLIER_CACHE_SIZE = 256
+
+
+def modifier_product(profile: Mapping[str, Any], keys: ModifierKeys) -> float:
+    """
+    Multiplies the factors a modifier profile lists for resolved patient factors.
+
+    For each field the first key the profile's table has is used; a table
+    listing none of them (or a profile without the table) leaves the product
+    unchanged.
+    """
+    product = 1.0
+    for (_, field), candidates in zip(MODIFIER_FIELDS, keys):
+        table = profile.get(field) or {}
+        for key in candidates:
+            if key in table:
+                product *= table[key]
+                break
+    return product
+
+
+def modifier_bound(profile: Mapping[str, Any]) -> float:
+    """
+    Largest modifier product a profile can give any patient.
+
+    Patient factors missing from a table leave the product unchanged, so
+    every field can contribute its largest factor or 1.
+    """
+    product = 1.0
+    for _, field in MODIFIER_FIELDS:
+        product *= max([1.0, *(profile.get(field) or {}).values()])
+    return product
+
+
+def _frozen(value: Any) -> Any:
+    """Hashable form of nested dicts and lists, equal for equal contents"""
+    if isinstance(value, Mapping):
+        return dict, tuple(sorted((key, _frozen(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen(item) for item in value)
+    return value
+
+
+class ScoringTables:
+    """Knowledge tables compiled to dense symptom and disease IDs"""
+
+    def __init__(
+        self,
+        symptom_combinations: Mapping[str, Mapping[str, float]],
+        symptom_weights: Mapping[str, Mapping[str, Dict]],
+        travel_risk_factors: Mapping[str, Mapping[str, float]],
+        drug_history_weights: Mapping[str, Mapping[str, float]],
+        risk_factor_weights: Mapping[str, Mapping[str, Any]],
+        symptom_aliases: Optional[Mapping[str, Sequence[str]]] = None,
+        version: int = 0
+    ):
+        """
+        Intern every symptom and disease name and re-key the tables by ID.
+
+        Names that differ only in case or spacing ("Dengue fever", "dengue
+        fever", "weight loss ") share one ID, so their scores accumulate in one
+        bucket; so do the aliases of a symptom in symptom_aliases (canonical
+        name -> other names), which are registered before any table is read
+        and show as their canonical name. Symptom weight rows of several
+        spellings that share an ID are merged, keeping the largest entry per
+        disease, so a symptom reported once counts once. Travel regions,
+        drugs and risk factors stay keyed by name.
+
+        The tables are never modified after construction, so one instance is
+        a consistent snapshot; version tells snapshots apart in cache keys.
+        """
+        self.version = version
+        self.symptoms = Vocabulary(keep_case=False)
+        self.diseases = Vocabulary()
+        for symptom, aliases in (symptom_aliases or {}).items():
+            for alias in aliases:
+                self.symptoms.add_alias(alias, symptom)
+
+        # Modifier profiles: the factor tables of a weight entry, everything
+        # but its weight. Most entries repeat a handful of profiles, so each
+        # distinct one is kept once and entries refer to it by ID.
+        self.profiles: List[Dict[str, Any]] = []
+        profile_ids: Dict[Any, int] = {}
+
+        # Symptom ID -> (disease ID, weight, profile ID) entries of every spelling
+        self.symptom_rows: Dict[int, List[Tuple[int, float, int]]] = {}
+        # Symptom ID -> disease ID -> (position in the row, spelling that added it)
+        entry_sources: Dict[int, Dict[int, Tuple[int, str]]] = {}
+        for symptom, diseases in symptom_weights.items():
+            symptom_id = self.symptoms.intern(symptom)
+            row = self.symptom_rows.setdefault(symptom_id, [])
+            sources = entry_sources.setdefault(symptom_id, {})
+            for disease, data in diseases.items():
+                profile = {field: value for field, value in data.items() if field != 'weight'}
+                key = _frozen(profile)
+                profile_id = profile_ids.get(key)
+                if profile_id is None:
+                    profile_id = profile_ids[key] = len(self.profiles)
+                    self.profiles.append(profile)
+                entry = (self.diseases.intern(disease), data['weight'], profile_id)
+
+                # Another spelling of the symptom already weighs this disease:
+                # the larger entry stands for both
+                source = sources.get(entry[0])
+                if source is None or source[1] == symptom:
+                    sources.setdefault(entry[0], (len(row), symptom))
+                    row.append(entry)
+                elif entry[1] > row[source[0]][1]:
+                    row[source[0]] = entry
+
+        self.combinations = CombinationIndex(symptom_combinations, self.symptoms, self.diseases)
+        self.travel = self._disease_weights(travel_risk_factors)
+        self.drugs = self._disease_weights(drug_history_weights)
+        self.risks = self._disease_weights(risk_factor_weights)
+
+        self._matrix: Optional[ScoringMatrix] = None
+        self._combination_matrix: Optional[CombinationMatrix] = None
+        self._bounds: Optional[DiagnosisBounds] = None
+        self._multipliers: Dict[ModifierKeys, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _disease_weights(self, table: Mapping[str, Mapping[str, Any]]) -> Dict[str, Dict[int, float]]:
+        """
+        Re-keys a factor -> disease -> weight table by disease ID.
+
+        Nested groups (a factor whose values are themselves disease -> weight
+        tables) contribute all of their diseases to the factor.
+        """
+        compiled = {}
+        for factor, diseases in table.items():
+            weights: Dict[int, float] = {}
+            pending = list(diseases.items())
+            while pending:
+                disease, weight = pending.pop(0)
+                if isinstance(weight, Mapping):
+                    pending.extend(weight.items())
+                    continue
+                disease_id = self.diseases.intern(disease)
+                weights[disease_id] = weights.get(disease_id, 0) + weight
+            compiled[factor] = weights
+        return compiled
+
+    def matrix(self) -> ScoringMatrix:
+        """Returns the array form of symptom_rows, building it on first use"""
+        if self._matrix is None:
+            with self._lock:
+                if self._matrix is None:
+                    self._matrix = ScoringMatrix(self.symptom_rows, len(self.diseases))
+        return self._matrix
+
+    def combination_matrix(self) -> CombinationMatrix:
+        """Returns the CSR form of combinations, building it on first use"""
+        if self._combination_matrix is None:
+            with self._lock:
+                if self._combination_matrix is None:
+                    self._combination_matrix = CombinationMatrix(self.combinations, len(self.symptoms))
+        return self._combination_matrix
+
+    def bounds(self) -> DiagnosisBounds:
+        """Returns the per-disease contribution bounds, collecting them on first use"""
+        if self._bounds is None:
+            with self._lock:
+                if self._bounds is None:
+                    self._bounds = DiagnosisBounds(self, [modifier_bound(profile) for profile in self.profiles])
+        return self._bounds
+
+    def profile_multipliers(self, keys: ModifierKeys) -> List[float]:
+        """
+        Returns the modifier product of every profile for resolved patient factors.
+
+        The list is indexed by profile ID, so scoring a weight entry is one
+        lookup and one multiplication. Lists are kept for the most recent
+        MULTIPLIER_CACHE_SIZE factor sets and must not be modified.
+        """
+        multipliers = self._multipliers.get(keys)
+        if multipliers is None:
+            multipliers = [modifier_product(profile, keys) for profile in self.profiles]
+            with self._lock:
+                if len(self._multipliers) >= MULTIPLIER_CACHE_SIZE:
+                    self._multipliers.pop(next(iter(self._multipliers)))
+                self._multipliers[keys] = multipliers
+        return multipliers
+
+    def symptom_ids(self, symptoms: Iterable[str]) -> List[int]:
+        """Returns the IDs of symptoms, with UNKNOWN_ID for unknown ones"""
+        return self.symptoms.ids_of(symptoms)
+
+    def symptom_names(self, symptom_ids: Iterable[int]) -> List[str]:
+        """Returns the display names of symptom IDs"""
+        return [self.symptoms.names[symptom_id] for symptom_id in symptom_ids]
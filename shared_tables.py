@@ -0,0 +1,635 @@
+"""
+Scoring tables shared read-only by worker processes.
+
+export_scoring_tables() writes a compiled ScoringTables snapshot into one
+array file:
+
+    vocabularies    display names, plus canonical spellings sorted for lookup
+    matrix          the ScoringMatrix arrays of the symptom weight rows
+    profiles        one (profiles x keys) factor matrix per modifier field
+    combinations    member bitmaps, member and disease weight rows (the
+                    CombinationMatrix CSR arrays), and the symptom index
+    factor tables   travel, drug and risk factor weights per disease
+    bounds          the DiagnosisBounds arrays top-k ranking prunes with
+
+SharedScoringTables memory-maps that file and serves the ScoringTables
+attributes from views into the mapping, so every process attached to the
+same file shares its pages and only builds the small objects a request
+actually reads. Kept under /dev/shm, the file lives in shared memory.
+"""
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import bisect
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+import numpy as np
+
+from combination_index import CombinationIndex
+from combination_matrix import CombinationMatrix
+from diagnosis_bounds import DiagnosisBounds
+from scoring_matrix import ScoringMatrix
+from scoring_tables import MODIFIER_FIELDS, ScoringTables
+from vocabulary import UNKNOWN_ID, Vocabulary, canonical_name
+
+MAGIC = b'CWST'
+FORMAT_VERSION = 5
+# Magic, format version, header length and a reserved word, keeping arrays 8-byte aligned
+PREFIX_SIZE = 16
+
+# Where snapshot files are written; /dev/shm keeps them off the disk
+SHARED_TABLES_DIR = os.environ.get(
+    'CAREWAVE_SHARED_TABLES_DIR',
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+)
+
+# Snapshot names of the CombinationMatrix arrays, shared with SharedCombinationIndex
+COMBINATION_ARRAYS = {
+    'member_start': 'combination_member_start',
+    'member_ids': 'combination_member_ids',
+    'disease_start': 'combination_disease_start',
+    'disease_ids': 'combination_disease_ids',
+    'weights': 'combination_weights'
+}
+
+# ScoringTables attributes holding factor -> disease ID -> weight tables
+FACTOR_TABLES = ('travel', 'drugs', 'risks')
+
+# DiagnosisBounds attributes holding one bound per disease ID
+BOUND_KINDS = ('symptom', 'combination', 'travel', 'drugs', 'risks')
+
+
+class SharedTablesError(Exception):
+    """Raised for snapshot files of another type or format version"""
+
+
+def write_array_file(
+    path: str,
+    magic: bytes,
+    version: int,
+    header: Dict[str, Any],
+    arrays: Dict[str, np.ndarray]
+) -> Dict[str, Any]:
+    """
+    Write named numpy arrays into one file that map_array_file can map.
+
+    The file is a 16-byte prefix (magic, format version, header length), a
+    JSON header and the arrays, each starting 8-byte aligned. The file is
+    written next to path and moved into place, so readers never see it
+    half written.
+
+    Args:
+        path: Destination file
+        magic: Four bytes identifying the file type
+        version: Format version checked by map_array_file
+        header: JSON-serializable metadata stored with the arrays
+        arrays: Arrays to store, in file order
+
+    Returns:
+        The header that was written, with the section table added
+    """
+    header = dict(header, version=version, sections={})
+    # Section offsets are relative to the end of the header, which is padded
+    # to 8 bytes so every array starts aligned
+    offset = 0
+    for name, array in arrays.items():
+        header['sections'][name] = [offset, array.dtype.str, list(array.shape)]
+        offset += _aligned(array.nbytes)
+    header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+    header_bytes += b' ' * (_aligned(len(header_bytes)) - len(header_bytes))
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as handle:
+        handle.write(magic + struct.pack('<III', version, len(header_bytes), 0))
+        handle.write(header_bytes)
+        for array in arrays.values():
+            data = np.ascontiguousarray(array).tobytes()
+            handle.write(data + b'\0' * (_aligned(len(data)) - len(data)))
+    os.replace(temporary, path)
+    return header
+
+
+def map_array_file(
+    path: str,
+    magic: bytes,
+    version: int
+) -> Tuple[mmap.mmap, Dict[str, Any], Dict[str, np.ndarray]]:
+    """
+    Memory-map a file written by write_array_file.
+
+    Args:
+        path: File to map
+        magic: Expected file type
+        version: Expected format version
+
+    Returns:
+        The mapping, the header and read-only array views into the mapping
+
+    Raises:
+        SharedTablesError: The file has another type or format version
+    """
+    with open(path, 'rb') as handle:
+        mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapping[:4] != magic:
+        raise SharedTablesError(f"{path} is not a {magic.decode()} file")
+    found, header_size = struct.unpack_from('<II', mapping, 4)
+    if found != version:
+        raise SharedTablesError(f"{path} has format version {found}, expected {version}")
+
+    header = json.loads(bytes(mapping[PREFIX_SIZE:PREFIX_SIZE + header_size]))
+    data_start = PREFIX_SIZE + header_size
+    arrays = {}
+    for name, (offset, dtype, shape) in header['sections'].items():
+        count = int(np.prod(shape, dtype=np.int64))
+        arrays[name] = np.frombuffer(
+            mapping, dtype=np.dtype(dtype), count=count, offset=data_start + offset
+        ).reshape(shape)
+    return mapping, header, arrays
+
+
+def _aligned(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+def _strings(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encodes strings as (offsets, UTF-8 bytes) arrays"""
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(data) for data in encoded], dtype=np.int64)
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def _starts(rows: List[Any]) -> np.ndarray:
+    """Row start offsets of a ragged table, with the total length appended"""
+    starts = np.zeros(len(rows) + 1, dtype=np.int64)
+    starts[1:] = np.cumsum([len(row) for row in rows], dtype=np.int64)
+    return starts
+
+
+def export_scoring_tables(tables: ScoringTables, path: str) -> Dict[str, Any]:
+    """
+    Write a scoring tables snapshot that SharedScoringTables can attach to.
+
+    Args:
+        tables: Snapshot to export
+        path: Destination file
+
+    Returns:
+        The header that was written
+    """
+    arrays: Dict[str, np.ndarray] = {}
+
+    for prefix, vocabulary in (('symptom', tables.symptoms), ('disease', tables.diseases)):
+        keys = sorted(vocabulary.ids)
+        arrays[f'{prefix}_name_offsets'], arrays[f'{prefix}_names'] = _strings(vocabulary.names)
+        arrays[f'{prefix}_key_offsets'], arrays[f'{prefix}_keys'] = _strings(keys)
+        arrays[f'{prefix}_key_ids'] = np.array([vocabulary.ids[key] for key in keys], dtype=np.int64)
+
+    matrix = tables.matrix()
+    for name, array in matrix.arrays().items():
+        arrays[f'matrix_{name}'] = array
+
+    # Factor tables of every profile by field, NaN where a profile lacks the key
+    profile_keys = []
+    for _, field in MODIFIER_FIELDS:
+        keys = sorted({key for profile in tables.profiles for key in profile.get(field) or {}})
+        factors = np.full((len(tables.profiles), len(keys)), np.nan)
+        for profile_id, profile in enumerate(tables.profiles):
+            for key, factor in (profile.get(field) or {}).items():
+                factors[profile_id, keys.index(key)] = factor
+        arrays[f'profile_{field}'] = factors
+        profile_keys.append(keys)
+
+    index = tables.combinations
+    arrays['combination_key_offsets'], arrays['combination_keys'] = _strings(index.keys)
+    # Fixed-width little-endian bitmaps of the member masks, one row per combination
+    words = max(1, (len(tables.symptoms) + 63) // 64)
+    arrays['combination_bitmaps'] = np.frombuffer(
+        b''.join(mask.to_bytes(words * 8, 'little') for mask in index.masks), dtype='<u8'
+    ).reshape(len(index.masks), words)
+    for name, array in tables.combination_matrix().arrays().items():
+        arrays[COMBINATION_ARRAYS[name]] = array
+    arrays['combination_exact'] = np.array(
+        [index.exact.get(mask) == combination_id for combination_id, mask in enumerate(index.masks)],
+        dtype=np.uint8
+    )
+    by_symptom = [index.by_symptom.get(symptom_id, []) for symptom_id in range(len(tables.symptoms))]
+    arrays['symptom_combination_start'] = _starts(by_symptom)
+    arrays['symptom_combination_ids'] = np.array(
+        [combination_id for combinations in by_symptom for combination_id in combinations], dtype=np.int64
+    )
+
+    bounds = tables.bounds()
+    for table_name in FACTOR_TABLES:
+        table = getattr(tables, table_name)
+        factors = sorted(table)
+        rows = [table[factor] for factor in factors]
+        arrays[f'{table_name}_factor_offsets'], arrays[f'{table_name}_factors'] = _strings(factors)
+        arrays[f'{table_name}_start'] = _starts(rows)
+        arrays[f'{table_name}_disease_ids'] = np.array(
+            [disease_id for row in rows for disease_id in row], dtype=np.int64
+        )
+        arrays[f'{table_name}_weights'] = np.array(
+            [weight for row in rows for weight in row.values()], dtype=np.float64
+        )
+        arrays[f'bounds_{table_name}_totals'] = np.array(
+            [bounds.factor_totals[table_name][factor] for factor in factors], dtype=np.float64
+        )
+
+    # Bounds, so attached workers do not each collect their own; the row
+    # diseases are the matrix rows, which the snapshot already holds
+    for kind in BOUND_KINDS:
+        arrays[f'bounds_{kind}'] = np.array(getattr(bounds, kind), dtype=np.float64)
+    arrays['bounds_combination_totals'] = np.array(bounds.combination_totals, dtype=np.float64)
+    row_totals = [bounds.row_totals.get(symptom_id, {}) for symptom_id in range(len(tables.symptoms))]
+    arrays['bounds_row_total_start'] = _starts(row_totals)
+    arrays['bounds_row_total_profiles'] = np.array(
+        [profile_id for totals in row_totals for profile_id in totals], dtype=np.int64
+    )
+    arrays['bounds_row_total_weights'] = np.array(
+        [weight for totals in row_totals for weight in totals.values()], dtype=np.float64
+    )
+    # Symptom weight entries by disease: (symptom ID, weight, profile ID) in row order
+    entries = [
+        [
+            (symptom_id, weight, profile_id)
+            for symptom_id, symptom_entries in bounds.symptom_entries.get(disease_id, {}).items()
+            for weight, profile_id in symptom_entries
+        ]
+        for disease_id in range(matrix.disease_count)
+    ]
+    arrays['bounds_entry_start'] = _starts(entries)
+    for position, (name, dtype) in enumerate(
+        (('symptom_ids', np.int64), ('weights', np.float64), ('profile_ids', np.int64))
+    ):
+        arrays[f'bounds_entry_{name}'] = np.array(
+            [entry[position] for disease_entries in entries for entry in disease_entries], dtype=dtype
+        )
+
+    header = {
+        'snapshot_version': tables.version,
+        'bounds_admissible': bounds.admissible,
+        'disease_count': matrix.disease_count,
+        'profile_count': len(tables.profiles),
+        # Column keys of each profile_<field> matrix, in MODIFIER_FIELDS order
+        'profile_keys': profile_keys
+    }
+    return write_array_file(path, MAGIC, FORMAT_VERSION, header, arrays)
+
+
+class StringArray(Sequence):
+    """Read-only list of strings stored as offsets into UTF-8 bytes"""
+
+    __slots__ = ('_offsets', '_data')
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self._offsets = offsets
+        self._data = data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return bytes(self._data[self._offsets[index]:self._offsets[index + 1]]).decode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def find(self, text: str) -> int:
+        """Returns the position of text in a sorted array, or -1"""
+        position = bisect.bisect_left(self, text)
+        if position < len(self) and self[position] == text:
+            return position
+        return -1
+
+
+class RaggedArray(Sequence):
+    """Read-only list of integer rows, each a slice of one flat array"""
+
+    __slots__ = ('_starts', '_values')
+
+    def __init__(self, starts: np.ndarray, values: np.ndarray):
+        self._starts = starts
+        self._values = values
+
+    def __getitem__(self, index: int) -> Tuple[int, ...]:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return tuple(self._values[self._starts[index]:self._starts[index + 1]].tolist())
+
+    def __len__(self) -> int:
+        return len(self._starts) - 1
+
+    def get(self, index: int, default: Any = None) -> Any:
+        """Returns row index, or default when it is out of range"""
+        return self[index] if 0 <= index < len(self) else default
+
+
+class FloatArray(Sequence):
+    """Read-only list of floats stored in one flat array"""
+
+    __slots__ = ('_values',)
+
+    def __init__(self, values: np.ndarray):
+        self._values = values
+
+    def __getitem__(self, index: int) -> float:
+        return self._values[index].item()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class RaggedWeights(Sequence):
+    """Read-only list of disease ID -> weight dicts, each a slice of two flat arrays"""
+
+    __slots__ = ('_starts', '_ids', '_weights')
+
+    def __init__(self, starts: np.ndarray, ids: np.ndarray, weights: np.ndarray):
+        self._starts = starts
+        self._ids = ids
+        self._weights = weights
+
+    def __getitem__(self, index: int) -> Dict[int, float]:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start, end = self._starts[index], self._starts[index + 1]
+        return dict(zip(self._ids[start:end].tolist(), self._weights[start:end].tolist()))
+
+    def __len__(self) -> int:
+        return len(self._starts) - 1
+
+
+class SharedVocabulary(Vocabulary):
+    """Vocabulary served from a snapshot file; it cannot learn new names"""
+
+    def __init__(self, names: StringArray, keys: StringArray, key_ids: np.ndarray):
+        self.keep_case = True
+        self.names = names
+        self._keys = keys
+        self._key_ids = key_ids
+
+    @property
+    def ids(self) -> Dict[str, int]:
+        """Canonical spelling -> ID, built on demand"""
+        return dict(zip(self._keys, self._key_ids.tolist()))
+
+    def intern(self, name: str) -> int:
+        raise TypeError("Shared vocabularies are read-only")
+
+    def add_alias(self, alias: str, name: str) -> int:
+        raise TypeError("Shared vocabularies are read-only")
+
+    def id(self, name: str) -> int:
+        position = self._keys.find(canonical_name(name))
+        return UNKNOWN_ID if position < 0 else int(self._key_ids[position])
+
+
+class BitmapArray(Sequence):
+    """Read-only list of symptom masks stored as rows of 64-bit words"""
+
+    __slots__ = ('_bitmaps',)
+
+    def __init__(self, bitmaps: np.ndarray):
+        self._bitmaps = bitmaps
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return int.from_bytes(self._bitmaps[index].tobytes(), 'little')
+
+    def __len__(self) -> int:
+        return len(self._bitmaps)
+
+
+class SharedExactIndex:
+    """Member mask -> combination lookup over the snapshot's symptom index"""
+
+    def __init__(self, masks: BitmapArray, by_symptom: RaggedArray, exact: np.ndarray):
+        self._masks = masks
+        self._by_symptom = by_symptom
+        self._exact = exact
+
+    def get(self, mask: int, default: Optional[int] = None) -> Optional[int]:
+        if mask <= 0:
+            return default
+        # The combinations of any one member include the one made of exactly the mask
+        lowest = (mask & -mask).bit_length() - 1
+        for combination_id in self._by_symptom.get(lowest, ()):
+            if self._exact[combination_id] and self._masks[combination_id] == mask:
+                return combination_id
+        return default
+
+
+class SharedCombinationIndex(CombinationIndex):
+    """CombinationIndex served from a snapshot file"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.keys = StringArray(arrays['combination_key_offsets'], arrays['combination_keys'])
+        self.members = RaggedArray(arrays['combination_member_start'], arrays['combination_member_ids'])
+        self.masks = BitmapArray(arrays['combination_bitmaps'])
+        self.diseases = RaggedWeights(
+            arrays['combination_disease_start'],
+            arrays['combination_disease_ids'],
+            arrays['combination_weights']
+        )
+        self.by_symptom = RaggedArray(arrays['symptom_combination_start'], arrays['symptom_combination_ids'])
+        self.exact = SharedExactIndex(self.masks, self.by_symptom, arrays['combination_exact'])
+
+
+class SharedFactorTable(Mapping):
+    """Factor -> row table served from a snapshot file, rows stored in factor order"""
+
+    def __init__(self, factors: StringArray, rows: Sequence):
+        self._factors = factors
+        self._rows = rows
+
+    def __getitem__(self, factor: str) -> Any:
+        position = self._factors.find(factor) if isinstance(factor, str) else -1
+        if position < 0:
+            raise KeyError(factor)
+        return self._rows[position]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factors)
+
+    def __len__(self) -> int:
+        return len(self._factors)
+
+
+class SharedProfiles(Sequence):
+    """Modifier profiles rebuilt from the per-field factor matrices"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], keys: List[List[str]], count: int):
+        self._fields = [
+            (field, field_keys, arrays[f'profile_{field}'])
+            for (_, field), field_keys in zip(MODIFIER_FIELDS, keys)
+        ]
+        self._count = count
+
+    def __getitem__(self, profile_id: int) -> Dict[str, Dict]:
+        if not 0 <= profile_id < len(self):
+            raise IndexError(profile_id)
+        profile = {}
+        for field, keys, factors in self._fields:
+            table = {key: float(factor) for key, factor in zip(keys, factors[profile_id]) if not np.isnan(factor)}
+            if table:
+                profile[field] = table
+        return profile
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class SharedSymptomRows(Mapping):
+    """Symptom ID -> (disease ID, weight, profile ID) rows read from the matrix arrays"""
+
+    def __init__(self, matrix: ScoringMatrix):
+        self._matrix = matrix
+
+    def __getitem__(self, symptom_id: int) -> List[Tuple[int, float, int]]:
+        matrix = self._matrix
+        row = matrix.row_of(symptom_id) if isinstance(symptom_id, int) else -1
+        if row < 0:
+            raise KeyError(symptom_id)
+        entries = slice(matrix.row_start[row], matrix.row_start[row + 1])
+        return list(zip(
+            matrix.disease_index[entries].tolist(),
+            matrix.weights[entries].tolist(),
+            matrix.entry_profile[entries].tolist()
+        ))
+
+    def __contains__(self, symptom_id: object) -> bool:
+        return isinstance(symptom_id, int) and self._matrix.row_of(symptom_id) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(np.flatnonzero(self._matrix.symptom_row >= 0).tolist())
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._matrix.symptom_row >= 0))
+
+
+class SharedRowDiseases(SharedSymptomRows):
+    """Symptom ID -> disease ID of every entry of its row, read from the matrix arrays"""
+
+    def __getitem__(self, symptom_id: int) -> Tuple[int, ...]:
+        matrix = self._matrix
+        row = matrix.row_of(symptom_id) if isinstance(symptom_id, int) else -1
+        if row < 0:
+            raise KeyError(symptom_id)
+        return tuple(matrix.disease_index[matrix.row_start[row]:matrix.row_start[row + 1]].tolist())
+
+
+class SharedSymptomEntries(Mapping):
+    """Disease ID -> symptom ID -> (weight, profile ID) entries served from a snapshot file"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self._starts = arrays['bounds_entry_start']
+        self._symptom_ids = arrays['bounds_entry_symptom_ids']
+        self._weights = arrays['bounds_entry_weights']
+        self._profile_ids = arrays['bounds_entry_profile_ids']
+
+    def __getitem__(self, disease_id: int) -> Dict[int, List[Tuple[float, int]]]:
+        if not isinstance(disease_id, int) or not 0 <= disease_id < len(self._starts) - 1:
+            raise KeyError(disease_id)
+        start, end = self._starts[disease_id], self._starts[disease_id + 1]
+        if start == end:
+            raise KeyError(disease_id)
+        entries: Dict[int, List[Tuple[float, int]]] = {}
+        for symptom_id, weight, profile_id in zip(
+            self._symptom_ids[start:end].tolist(),
+            self._weights[start:end].tolist(),
+            self._profile_ids[start:end].tolist()
+        ):
+            entries.setdefault(symptom_id, []).append((weight, profile_id))
+        return entries
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(np.flatnonzero(np.diff(self._starts)).tolist())
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(np.diff(self._starts)))
+
+
+class SharedDiagnosisBounds(DiagnosisBounds):
+    """DiagnosisBounds served from a snapshot file instead of collected per process"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], admissible: bool, matrix: ScoringMatrix):
+        self.admissible = admissible
+        for kind in BOUND_KINDS:
+            setattr(self, kind, FloatArray(arrays[f'bounds_{kind}']))
+        self.symptom_entries = SharedSymptomEntries(arrays)
+        self.row_diseases = SharedRowDiseases(matrix)
+        self.row_totals = RaggedWeights(
+            arrays['bounds_row_total_start'],
+            arrays['bounds_row_total_profiles'],
+            arrays['bounds_row_total_weights']
+        )
+        self.combination_totals = FloatArray(arrays['bounds_combination_totals'])
+        self.factor_totals = {
+            table_name: SharedFactorTable(
+                StringArray(arrays[f'{table_name}_factor_offsets'], arrays[f'{table_name}_factors']),
+                FloatArray(arrays[f'bounds_{table_name}_totals'])
+            )
+            for table_name in FACTOR_TABLES
+        }
+
+
+class SharedScoringTables(ScoringTables):
+    """
+    ScoringTables attached to a file written by export_scoring_tables.
+
+    Nothing is compiled in the attaching process: vocabulary lookups, weight
+    rows and combinations are read from the mapped arrays when used.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Snapshot file to map read-only
+        """
+        self.path = path
+        self._map, header, arrays = map_array_file(path, MAGIC, FORMAT_VERSION)
+        self.version = header['snapshot_version']
+
+        self.symptoms, self.diseases = [
+            SharedVocabulary(
+                StringArray(arrays[f'{prefix}_name_offsets'], arrays[f'{prefix}_names']),
+                StringArray(arrays[f'{prefix}_key_offsets'], arrays[f'{prefix}_keys']),
+                arrays[f'{prefix}_key_ids']
+            )
+            for prefix in ('symptom', 'disease')
+        ]
+
+        self._matrix = ScoringMatrix.from_arrays(
+            {name[len('matrix_'):]: array for name, array in arrays.items() if name.startswith('matrix_')},
+            header['disease_count']
+        )
+        self.profiles = SharedProfiles(arrays, header['profile_keys'], header['profile_count'])
+        self.symptom_rows = SharedSymptomRows(self._matrix)
+        self.combinations = SharedCombinationIndex(arrays)
+        self._combination_matrix = CombinationMatrix.from_arrays(
+            {name: arrays[array_name] for name, array_name in COMBINATION_ARRAYS.items()},
+            len(self.symptoms)
+        )
+        for table_name in FACTOR_TABLES:
+            setattr(self, table_name, SharedFactorTable(
+                StringArray(arrays[f'{table_name}_factor_offsets'], arrays[f'{table_name}_factors']),
+                RaggedWeights(
+                    arrays[f'{table_name}_start'],
+                    arrays[f'{table_name}_disease_ids'],
+                    arrays[f'{table_name}_weights']
+                )
+            ))
+
+        self._bounds = SharedDiagnosisBounds(arrays, header['bounds_admissible'], self._matrix)
+        self._multipliers = {}
+        self._lock = threading.Lock()
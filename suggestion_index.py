@@ -0,0 +1,175 @@
+from collections import Counter
+import math
+from typing import Dict, Iterable, List, Set, Tuple
+
+from vocabulary import canonical_name
+
+# Suggestions kept per trie node by default, the most a lookup can return
+# from the trie
+TRIE_TOP = 5
+
+# Smallest trigram (Dice) similarity of a fuzzy suggestion
+MIN_SIMILARITY = 0.4
+
+
+def trigrams(text: str) -> List[str]:
+    """Returns the distinct trigrams of text padded with spaces, in order"""
+    padded = f'  {text} '
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+
+class SuggestionIndex:
+    """
+    Ranked symptom suggestions for typed text
+
+    Every term (a symptom name or an alias of one) is indexed twice:
+
+    - a prefix trie over the whole term and over each of its words, whose
+      nodes keep their best `top` suggestions, so prefix lookups cost the
+      length of the typed text
+    - a trigram inverted index, for text found inside a word or misspelled
+
+    Suggestions rank whole-term prefix matches first, then word prefix
+    matches, then other substring matches, then fuzzy matches by trigram
+    similarity; ties keep the order terms were given in.
+    """
+
+    def __init__(self, terms: Iterable[Tuple[str, str]], top: int = TRIE_TOP):
+        """
+        Build the index once.
+
+        Args:
+            terms: (term, suggestion) pairs; the term is matched against typed
+                text, the suggestion is what is offered for it
+            top: Entries kept per trie node, the longest list a prefix
+                lookup answers from the trie alone
+        """
+        self.top = top
+        self.terms: List[str] = []
+        self.suggestions: List[str] = []
+        self.trigram_counts: List[int] = []
+        # Trie node: {character: child node}, with the node's best
+        # (rank, term ID) pairs under the None key
+        self.trie: Dict = {}
+        self.postings: Dict[str, List[int]] = {}
+        # Posting lists lookups have probed rather than scanned, as sets
+        self.posting_sets: Dict[str, Set[int]] = {}
+
+        for term, suggestion in terms:
+            term = canonical_name(term)
+            if not term:
+                continue
+            term_id = len(self.terms)
+            self.terms.append(term)
+            self.suggestions.append(suggestion)
+
+            self._insert(term, (0, term_id))
+            start = term.find(' ')
+            while start >= 0:
+                self._insert(term[start + 1:], (1, term_id))
+                start = term.find(' ', start + 1)
+            term_trigrams = trigrams(term)
+            self.trigram_counts.append(len(term_trigrams))
+            for trigram in term_trigrams:
+                self.postings.setdefault(trigram, []).append(term_id)
+
+    def _insert(self, text: str, entry: Tuple[int, int]) -> None:
+        """Adds a ranked term to the best lists along the trie path of text"""
+        node = self.trie
+        for character in text:
+            node = node.setdefault(character, {})
+            best = node.setdefault(None, [])
+            if len(best) < self.top:
+                best.append(entry)
+            elif entry < best[-1]:
+                best[-1] = entry
+            else:
+                continue
+            best.sort()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def suggest(self, text: str, limit: int = TRIE_TOP) -> List[str]:
+        """
+        Returns up to limit distinct suggestions for typed text, best first.
+
+        Prefix matches come from the trie; only when they do not fill the
+        list is the trigram index consulted.
+        """
+        query = canonical_name(text)
+        if not query:
+            return []
+
+        node = self.trie
+        for character in query:
+            node = node.get(character)
+            if node is None:
+                break
+        ranked = list(node.get(None, ())) if node is not None else []
+        suggestions = self._distinct(ranked, limit)
+        # The trie keeps `top` entries per node, some of which may suggest
+        # the same name; a short list is filled from the trigram index
+        if len(suggestions) < limit:
+            suggestions = self._distinct(ranked + self._trigram_matches(query), limit)
+        return suggestions
+
+    def _distinct(self, ranked: List[Tuple[float, int]], limit: int) -> List[str]:
+        """Returns the first limit distinct suggestions of ranked term IDs"""
+        suggestions: List[str] = []
+        for _, term_id in sorted(set(ranked)):
+            suggestion = self.suggestions[term_id]
+            if suggestion not in suggestions:
+                suggestions.append(suggestion)
+                if len(suggestions) == limit:
+                    break
+        return suggestions
+
+    def _trigram_matches(self, query: str) -> List[Tuple[float, int]]:
+        """Ranked (rank, term ID) pairs of terms containing query or similar enough to it"""
+        query_trigrams = trigrams(query)
+        ordered = sorted(query_trigrams, key=lambda trigram: len(self.postings.get(trigram, ())))
+
+        # A term at least MIN_SIMILARITY similar shares `fewest` trigrams or
+        # more (it has at least two), so it is on one of the len - fewest + 1
+        # shortest posting lists; the longest lists are only probed for the
+        # terms found on those
+        fewest = math.ceil(max(
+            len(query_trigrams) * MIN_SIMILARITY / (2 - MIN_SIMILARITY),
+            (len(query_trigrams) + 2) * MIN_SIMILARITY / 2
+        ) - 1e-9)
+        scanned = max(len(ordered) - fewest + 1, 0)
+        shared = Counter()
+        for trigram in ordered[:scanned]:
+            shared.update(self.postings.get(trigram, ()))
+        # A term containing query contains every trigram inside it
+        inner = [self.postings.get(query[i:i + 3], ()) for i in range(len(query) - 2)]
+        if inner:
+            shared.update(dict.fromkeys(min(inner, key=len), 0))
+        probed = [self._posting_set(trigram) for trigram in ordered[scanned:]]
+
+        matches = []
+        for term_id, count in shared.items():
+            term = self.terms[term_id]
+            if term.startswith(query):
+                rank = 0
+            elif f' {query}' in term:
+                rank = 1
+            elif query in term:
+                rank = 2
+            else:
+                count += sum(term_id in posting for posting in probed)
+                similarity = 2 * count / (len(query_trigrams) + self.trigram_counts[term_id])
+                if similarity < MIN_SIMILARITY:
+                    continue
+                # Between 3 and 4, more similar first
+                rank = 4 - similarity
+            matches.append((rank, term_id))
+        return matches
+
+    def _posting_set(self, trigram: str) -> Set[int]:
+        """Returns the posting list of a trigram as a set, kept for later lookups"""
+        posting = self.posting_sets.get(trigram)
+        if posting is None:
+            posting = self.posting_sets[trigram] = set(self.postings.get(trigram, ()))
+        return posting
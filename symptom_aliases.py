@@ -0,0 +1,51 @@
+# Canonical symptom name -> other names for the same symptom (medical terms,
+# lay terms and spelling variants). Every alias is scored, matched and cached
+# as its canonical symptom.
+symptom_aliases = {
+    "coughing up blood": [
+        "hemoptysis", "haemoptysis", "persistent cough with blood", "coughing blood",
+        "blood-streaked sputum", "blood-tinged sputum"
+    ],
+    "sensitivity to light": ["photophobia", "light sensitivity"],
+    "shortness of breath": ["dyspnea", "dyspnoea", "breathlessness", "short of breath"],
+    "itching": ["pruritus", "itchy skin", "itchiness"],
+    "vomiting blood": ["hematemesis", "haematemesis"],
+    "fainting": ["syncope", "feeling faint", "passing out"],
+    "jaundice": [
+        "yellowing of skin and eyes", "yellow skin", "yellowing of skin", "yellowing of the skin",
+        "yellowing of eyes", "yellowing of the eyes"
+    ],
+    "painful urination": [
+        "dysuria", "pain during urination", "pain on urination", "pain when urinating",
+        "burning sensation during urination"
+    ],
+    "difficulty swallowing": ["dysphagia"],
+    "painful swallowing": ["odynophagia", "pain when swallowing", "pain with swallowing"],
+    "hives": ["urticaria"],
+    "edema": ["oedema"],
+    "ringing in ears": ["tinnitus", "ringing in ears (tinnitus)", "ringing in the ears", "ear ringing"],
+    "hair loss": ["alopecia"],
+    "frequent urination": ["polyuria", "increased urination"],
+    "excessive thirst": ["polydipsia", "increased thirst", "extreme thirst"],
+    "blood in urine": ["hematuria", "haematuria"],
+    "nosebleeds": ["epistaxis", "nosebleed", "nose bleeds"],
+    "palpitations": ["heart palpitations"],
+    "night sweats": ["sweating at night", "nighttime sweating", "sweat at night"],
+    "excessive sweating": ["sweating excessively", "increased sweating", "hyperhidrosis"],
+    "abdominal distention": ["abdominal distension"],
+    "abdominal cramping": ["abdominal cramps", "stomach cramps"],
+    "runny nose": ["rhinorrhea", "rhinorrhoea"],
+    "nasal congestion": ["stuffy nose", "blocked nose"],
+    "insomnia": ["sleeplessness"],
+    "weight loss": ["loss of weight"],
+    "bloody diarrhea": ["diarrhea with blood"],
+    "blood in stool": ["bloody stool", "bloody stools"],
+    "fever": ["pyrexia"],
+    "headache": ["cephalalgia"],
+    "diarrhea": ["diarrhoea"],
+    "muscle pain": ["myalgia", "muscle aches"],
+    "joint pain": ["arthralgia"],
+    "bloating": ["abdominal bloating"],
+    "double vision": ["diplopia"],
+    "loss of appetite": ["anorexia", "decreased appetite", "poor appetite"],
+}
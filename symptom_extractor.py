@@ -0,0 +1,150 @@
+import re
+from typing import Dict, Iterable, List, Tuple
+
+from vocabulary import canonical_name
+
+# Words opening a negation scope ("no fever", "I don't have a cough")
+NEGATION_CUES = frozenset({
+    'no', 'not', 'never', 'neither', 'none', 'without', 'deny', 'denies', 'denied', 'cannot',
+    "don't", "doesn't", "didn't", "haven't", "hasn't", "hadn't", "isn't", "aren't",
+    "wasn't", "weren't", "can't", 'dont', 'doesnt', 'didnt', 'havent', 'hasnt', 'hadnt'
+})
+
+# Words that may separate a cue from the symptom it negates ("no signs of fever")
+NEGATION_WINDOW = 3
+
+# Tokens closing a negation scope
+CLAUSE_BREAKS = frozenset({
+    ',', '.', ';', ':', '!', '?', 'but', 'however', 'although', 'though', 'except', 'yet'
+})
+
+# Tokens that carry a negation on to the next symptom of a list ("no fever, cough or chills")
+LIST_CONNECTORS = frozenset({',', 'or', 'nor'})
+
+TOKENS = re.compile(r"[\w']+|[,.;:!?]")
+
+
+class SymptomExtractor:
+    """
+    Finds every known symptom mentioned in free text, in one pass
+
+    An Aho-Corasick automaton over all terms reports each term occurrence as
+    the text is read once. Occurrences must start and end at word boundaries;
+    overlapping ones keep the leftmost, then the longest ("hay fever" over
+    "fever"). A symptom is negated when a negation cue precedes it within
+    NEGATION_WINDOW words in the same clause, or when it continues a list
+    whose previous symptom was negated.
+    """
+
+    def __init__(self, terms: Iterable[Tuple[str, str]]):
+        """
+        Build the automaton once.
+
+        Args:
+            terms: (term, symptom) pairs; the term is searched for in text,
+                the symptom is reported for it. The first pair of a term wins.
+        """
+        self.terms: List[str] = []
+        self.symptoms: List[str] = []
+        # State -> {character: next state}, its failure state and the term IDs
+        # ending there (its own and those of its failure chain)
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+
+        known = set()
+        for term, symptom in terms:
+            term = canonical_name(term)
+            if not term or term in known:
+                continue
+            known.add(term)
+            self._insert(term, len(self.terms))
+            self.terms.append(term)
+            self.symptoms.append(symptom)
+        self._link()
+
+    def _insert(self, term: str, term_id: int) -> None:
+        """Adds the trie path of a term"""
+        state = 0
+        for character in term:
+            next_state = self.goto[state].get(character)
+            if next_state is None:
+                next_state = self.goto[state][character] = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append(term_id)
+
+    def _link(self) -> None:
+        """Sets failure states breadth first, merging the outputs along them"""
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for character, next_state in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and character not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(character, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+                queue.append(next_state)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def extract(self, text: str) -> List[str]:
+        """Returns the distinct symptoms text mentions and does not negate, in order"""
+        return list(dict.fromkeys(
+            symptom for symptom, negated in self.mentions(text) if not negated
+        ))
+
+    def mentions(self, text: str) -> List[Tuple[str, bool]]:
+        """Returns (symptom, negated) for every symptom mentioned in text, in order"""
+        query = canonical_name(text).replace('’', "'")
+        mentions = []
+        position = 0
+        negated = False
+        for start, end, term_id in self._longest_matches(query):
+            tokens = TOKENS.findall(query[position:start])
+            if not (negated and all(token in LIST_CONNECTORS for token in tokens)):
+                negated = self._negates(tokens)
+            mentions.append((self.symptoms[term_id], negated))
+            position = end
+        return mentions
+
+    def _longest_matches(self, query: str) -> List[Tuple[int, int, int]]:
+        """Returns non-overlapping (start, end, term ID) matches at word boundaries, leftmost-longest"""
+        found = []
+        state = 0
+        for position, character in enumerate(query):
+            while state and character not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(character, 0)
+            if not self.output[state]:
+                continue
+            end = position + 1
+            if end < len(query) and query[end].isalnum():
+                continue
+            for term_id in self.output[state]:
+                start = end - len(self.terms[term_id])
+                if start == 0 or not query[start - 1].isalnum():
+                    found.append((start, -end, term_id))
+
+        matches = []
+        covered = 0
+        for start, end, term_id in sorted(found):
+            if start >= covered:
+                matches.append((start, -end, term_id))
+                covered = -end
+        return matches
+
+    def _negates(self, tokens: List[str]) -> bool:
+        """Tells whether the tokens before a symptom leave it in a negation scope"""
+        window = -1
+        for token in tokens:
+            if token in CLAUSE_BREAKS:
+                window = -1
+            elif token in NEGATION_CUES:
+                window = NEGATION_WINDOW
+            elif window >= 0:
+                window -= 1
+        return window >= 0
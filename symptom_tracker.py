@@ -1,22 +1,47 @@
-from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import (
+    Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup,
+    InlineQueryResultArticle, InputTextMessageContent
+)
 from telegram.ext import (
+    CallbackQueryHandler,
     ContextTypes,
     ConversationHandler,
     CommandHandler,
+    InlineQueryHandler,
     MessageHandler,
     filters
 )
-from typing import Dict, List, Union, Optional
+from telegram.warnings import PTBUserWarning
+from typing import Any, Callable, Dict, List, Tuple, Union, Optional
 from dataclasses import dataclass
+import asyncio
+import heapq
+import itertools
 import json
+import os
+import signal
+import threading
+import warnings
 
 # Import all necessary modules
-import symptom_combinations
-import symptom_list
-import drug_history_weights
-from risk_factor_weights import risk_factor_weights
-import travel_risk_factors
-import symptom_weights
+from knowledge_base import KnowledgeBase
+from combination_index import CombinationIndex, symptom_mask
+from scoring_matrix import ScoringMatrix
+from scoring_tables import ModifierKeys, ScoringTables, modifier_product
+from shared_tables import SHARED_TABLES_DIR, SharedScoringTables, export_scoring_tables
+from suggestion_index import SuggestionIndex
+from fuzzy_index import FuzzyIndex
+from symptom_extractor import SymptomExtractor
+from vocabulary import UNKNOWN_ID, canonical_name
+from diagnosis_cache import DiagnosisCache
+from scoring_executor import ScoringExecutor, ScoringBusyError
+
+# Knowledge tables, each imported from its module on first use
+knowledge = KnowledgeBase()
+TRACKER_TABLES = (
+    'symptom_combinations', 'symptom_weights', 'risk_factor_weights',
+    'travel_risk_factors', 'drug_history_weights', 'common_symptoms', 'symptom_aliases'
+)
 
 # Conversation states
 (ENTER_AGE, ENTER_GENDER, ENTER_SYMPTOMS, ENTER_DURATION, 
@@ -29,6 +54,75 @@ CONFIDENCE_THRESHOLDS = {
     'MEDIUM': 0.4
 }
 
+# Number of diagnoses shown to the user at the end of /track
+TOP_DIAGNOSES = 5
+
+# Duration factor buckets as (key, longest duration in days); anything
+# longer is 'long'
+DURATION_BUCKETS = (('short', 7), ('medium', 30))
+
+# Age factor keys tried for each age group, most specific first
+AGE_FACTOR_KEYS = {
+    'child': ('child', 'children', 'allAges'),
+    'adolescent': ('adolescent', 'youngAdults', 'allAges'),
+    'adult': ('adult', 'adults', 'youngAdults', 'middleAged', 'allAges'),
+    'elderly': ('elderly', 'allAges')
+}
+
+# Relative slack on upper bounds before rank_top_diagnoses prunes a disease
+BOUND_SLACK = 1 + 1e-9
+
+# Decimal places a percentage is cut to before it is rounded, so backends that
+# sum the total score in a different order round a tie the same way
+PERCENT_DIGITS = 9
+
+# Symptom scoring backends: nested dict walk or compiled arrays
+SCORING_BACKENDS = ('dict', 'matrix')
+
+# Knowledge tables re-keyed by symptom and disease IDs, built on first use and
+# replaced as a whole when the tables are reloaded
+_scoring_tables: Optional[ScoringTables] = None
+_scoring_tables_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_snapshot_versions = itertools.count(1)
+
+# Symptom lookup indexes by name, with the snapshot version each was built for
+_snapshot_indexes: Dict[str, Tuple[int, Any]] = {}
+# Index name -> builder taking a snapshot and the common symptoms it offers
+SNAPSHOT_INDEXES: Dict[str, Callable[[ScoringTables, List[str]], Any]] = {
+    'suggestions': lambda tables, common_symptoms: SuggestionIndex(
+        symptom_terms(tables, common_symptoms), top=INLINE_RESULTS
+    ),
+    'resolver': lambda tables, common_symptoms: FuzzyIndex(
+        symptom_terms(tables, common_symptoms)
+    ),
+    'extractor': lambda tables, common_symptoms: SymptomExtractor(
+        symptom_terms(tables, common_symptoms) + [(name, name) for name in tables.symptoms.names]
+    ),
+}
+
+# Telegram user IDs allowed to run /reload_knowledge
+RELOAD_ADMIN_IDS = {
+    int(user_id) for user_id in os.environ.get('CAREWAVE_ADMIN_IDS', '').split(',')
+    if user_id.strip().isdigit()
+}
+
+# Results keyed on snapshot version and canonical patient profile
+DIAGNOSIS_CACHE_SIZE = 1024
+DIAGNOSIS_CACHE_TTL = 3600
+diagnosis_cache = DiagnosisCache(DIAGNOSIS_CACHE_SIZE, DIAGNOSIS_CACHE_TTL)
+
+# Inline-mode symptom autocomplete: results per query (also the entries kept
+# per suggestion trie node), seconds Telegram may cache an answer, and
+# answers kept here, keyed on snapshot version and canonical query
+INLINE_RESULTS = 10
+INLINE_CACHE_TIME = 300
+INLINE_CACHE_SIZE = 4096
+inline_results_cache = DiagnosisCache(INLINE_CACHE_SIZE, INLINE_CACHE_TIME)
+
+# Longest callback data Telegram accepts on a button, in bytes
+CALLBACK_DATA_LIMIT = 64
+
 @dataclass
 class DiagnosisFactors:
     symptoms: List[str]
@@ -42,6 +136,31 @@ class DiagnosisResult:
     confidence: str
     matching_factors: Dict[str, str]
 
+@dataclass(frozen=True)
+class PatientProfile:
+    """Canonical, hashable form of the inputs to calculate_diagnosis"""
+    symptoms: Tuple[str, ...]
+    duration: str
+    severity: str
+    age_group: str
+    gender: str
+    drug_history: Tuple[str, ...]
+    travel_region: Optional[str]
+    risk_factors: Tuple[str, ...]
+
+    def scoring_factors(self) -> Dict[str, Union[int, str]]:
+        """Returns the factors used by the individual symptom scorers"""
+        return {
+            'duration': self.duration,
+            'severity': self.severity,
+            'age_group': self.age_group,
+            'gender': self.gender
+        }
+
+    def modifier_keys(self) -> ModifierKeys:
+        """Returns the scoring factors resolved to modifier table keys"""
+        return resolve_modifier_keys(self.scoring_factors())
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Cancel the current operation"""
     await update.message.reply_text(
@@ -51,14 +170,35 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 class SymptomTracker:
-    def __init__(self):
-        self.symptom_list = symptom_list
-        self.symptom_combinations = symptom_combinations
+    def __init__(self, executor: Optional[ScoringExecutor] = None):
         self.calculator = DiagnosisCalculator()
+        # The tracker tables are left to setup_bot's background prewarm, or
+        # to their first use, instead of blocking construction
+        self.executor = executor or ScoringExecutor()
+
+    @property
+    def symptom_list(self) -> List[str]:
+        return knowledge.common_symptoms
+
+    @property
+    def symptom_combinations(self) -> Dict[str, Dict[str, float]]:
+        return knowledge.symptom_combinations
+
+    @staticmethod
+    def get_scorer(context: ContextTypes.DEFAULT_TYPE) -> 'IncrementalScorer':
+        """Returns the conversation's running scorer, creating it only if there is none"""
+        if 'scorer' not in context.user_data:
+            context.user_data['scorer'] = IncrementalScorer()
+        return context.user_data['scorer']
         
     async def start_tracking(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start the symptom tracking process"""
         context.user_data['patient_info'] = {}
+        # The scorer needs the compiled tables; if the background prewarm has
+        # not built them yet, they are built off the event loop
+        context.user_data['scorer'] = await asyncio.get_running_loop().run_in_executor(
+            None, IncrementalScorer
+        )
         await update.message.reply_text(
             "Let's track your symptoms. First, please enter your age:",
             reply_markup=ReplyKeyboardRemove()
@@ -89,7 +229,11 @@ class SymptomTracker:
         context.user_data['patient_info']['gender'] = update.message.text
         
         await update.message.reply_text(
-            "Please enter your symptoms one at a time. Use /done when finished."
+            "Please enter your symptoms one at a time. Use /done when finished "
+            "or /remove <symptom> to take one back.",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("Search symptoms", switch_inline_query_current_chat="")
+            ]])
         )
         return ENTER_SYMPTOMS
 
@@ -99,17 +243,28 @@ class SymptomTracker:
             context.user_data['patient_info']['symptoms'] = []
             
         symptom = update.message.text
+        scorer = self.get_scorer(context)
+        mentioned = []
+        if symptom not in self.symptom_combinations and symptom not in self.symptom_list:
+            # A typo within a few edits of a known symptom is taken as that
+            # symptom; otherwise the message is searched for symptoms it mentions
+            resolved = get_symptom_resolver().resolve(symptom)
+            if resolved is not None:
+                symptom = resolved
+            else:
+                mentioned = get_symptom_extractor().extract(symptom)
         
+        # The scorer tracks every symptom under its canonical name, so it turns
+        # away aliases of symptoms already in the list
         if symptom in self.symptom_combinations:
-            new_symptoms = [s for s in self.symptom_combinations[symptom] 
-                          if s not in context.user_data['patient_info']['symptoms']]
+            new_symptoms = [s for s in symptom.split(', ') if scorer.add(s)]
             context.user_data['patient_info']['symptoms'].extend(new_symptoms)
             await update.message.reply_text(
                 f"Added symptom combination: {', '.join(new_symptoms)}\n"
                 "Enter another symptom or use /done when finished"
             )
         elif symptom in self.symptom_list:
-            if symptom not in context.user_data['patient_info']['symptoms']:
+            if scorer.add(symptom):
                 context.user_data['patient_info']['symptoms'].append(symptom)
                 await update.message.reply_text(
                     f"Added: {symptom}\n"
@@ -120,10 +275,24 @@ class SymptomTracker:
                     "This symptom is already in your list.\n"
                     "Enter another symptom or use /done when finished"
                 )
+        elif mentioned:
+            new_symptoms = [s for s in mentioned if scorer.add(s)]
+            context.user_data['patient_info']['symptoms'].extend(new_symptoms)
+            if new_symptoms:
+                await update.message.reply_text(
+                    f"Added: {', '.join(new_symptoms)}\n"
+                    "Enter another symptom or use /done when finished"
+                )
+            else:
+                await update.message.reply_text(
+                    "These symptoms are already in your list.\n"
+                    "Enter another symptom or use /done when finished"
+                )
         else:
-            suggestions = [s for s in self.symptom_list 
-                         if symptom.lower() in s.lower()][:5]
+            suggestions = get_suggestion_index().suggest(symptom)
             
+            suggestions = [s for s in suggestions
+                         if len(f"symptom:{s}".encode()) <= CALLBACK_DATA_LIMIT]
             if suggestions:
                 keyboard = [[InlineKeyboardButton(s, callback_data=f"symptom:{s}")] 
                           for s in suggestions]
@@ -138,6 +307,64 @@ class SymptomTracker:
                 )
         return ENTER_SYMPTOMS
 
+    async def handle_symptom_choice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle a symptom picked from the "Did you mean" keyboard"""
+        query = update.callback_query
+        await query.answer()
+        symptom = query.data.split(':', 1)[1]
+        symptoms = context.user_data['patient_info'].setdefault('symptoms', [])
+        scorer = self.get_scorer(context)
+
+        if scorer.add(symptom):
+            symptoms.append(symptom)
+            await query.edit_message_text(
+                f"Added: {symptom}\n"
+                "Enter another symptom or use /done when finished"
+            )
+        else:
+            await query.edit_message_text(
+                "This symptom is already in your list.\n"
+                "Enter another symptom or use /done when finished"
+            )
+        return ENTER_SYMPTOMS
+
+    async def handle_inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Answer inline-mode queries with symptoms matching the typed text
+
+        Picking a result sends the symptom as a message, which handle_symptoms
+        adds like any typed symptom. Answers are the same for every user, so
+        Telegram may serve them from its own cache for INLINE_CACHE_TIME.
+        """
+        query = update.inline_query
+        await query.answer(
+            inline_symptom_results(query.query),
+            cache_time=INLINE_CACHE_TIME,
+            is_personal=False
+        )
+
+    async def handle_remove_symptom(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle removal of a previously entered symptom, by any of its names"""
+        symptoms = context.user_data['patient_info'].get('symptoms', [])
+        symptom = ' '.join(context.args or [])
+        scorer = self.get_scorer(context)
+        canonical = scorer.canonical(symptom)
+        listed = next((s for s in symptoms if scorer.canonical(s) == canonical), None)
+
+        if listed is None:
+            await update.message.reply_text(
+                "That symptom is not in your list. Usage: /remove <symptom>"
+            )
+            return ENTER_SYMPTOMS
+
+        symptoms.remove(listed)
+        scorer.remove(listed)
+        await update.message.reply_text(
+            f"Removed: {listed}\n"
+            "Enter another symptom or use /done when finished"
+        )
+        return ENTER_SYMPTOMS
+
     async def handle_done_symptoms(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle completion of symptom entry"""
         if not context.user_data['patient_info'].get('symptoms'):
@@ -239,18 +466,33 @@ class SymptomTracker:
             )
             return ConversationHandler.END
 
-        # Calculate diagnosis
+        # Calculate diagnosis in the worker pool; symptom scores were accumulated
+        # while they were entered. Process workers hold their own tables, so
+        # they score from the symptom list rather than the running scorer.
         info = context.user_data['patient_info']
-        diagnosis_result = self.calculator.calculate_diagnosis(
-            symptoms=info['symptoms'],
-            duration=int(info['duration']),
-            duration_unit=info['duration_unit'],
-            severity=info['severity'],
-            age=int(info['age']),
-            gender=info['gender'],
-            drug_history=info['medications'] if info['medications'] != 'None' else None,
-            travel_region=info['travel_history'] if info['travel_history'] != 'None' else None
-        )
+        scorer = context.user_data.get('scorer')
+        if scorer is not None and self.executor.mode == 'thread':
+            calculate = scorer.finalize
+        else:
+            calculate = self.calculator.calculate_diagnosis
+        try:
+            diagnosis_result = await self.executor.run(
+                calculate,
+                symptoms=info['symptoms'],
+                duration=int(info['duration']),
+                duration_unit=info['duration_unit'],
+                severity=info['severity'],
+                age=int(info['age']),
+                gender=info['gender'],
+                drug_history=info['medications'] if info['medications'] != 'None' else None,
+                travel_region=info['travel_history'] if info['travel_history'] != 'None' else None,
+                top_k=TOP_DIAGNOSES
+            )
+        except ScoringBusyError:
+            await update.message.reply_text(
+                "We're handling a lot of requests right now. Please reply 'yes' again in a moment."
+            )
+            return CONFIRM
 
         if 'error' in diagnosis_result:
             await update.message.reply_text(
@@ -259,7 +501,7 @@ class SymptomTracker:
             )
         else:
             # Format top 5 diagnoses
-            diagnoses = diagnosis_result['detailed'][:5]
+            diagnoses = diagnosis_result['detailed'][:TOP_DIAGNOSES]
             response_text = "Top 5 Possible Diagnoses:\n\n"
             
             for i, result in enumerate(diagnoses, 1):
@@ -279,33 +521,501 @@ class SymptomTracker:
 
         return ConversationHandler.END
 
+    def reload_knowledge(self) -> Optional[int]:
+        """Reloads the knowledge tables and restarts process workers onto them"""
+        version = reload_knowledge_tables()
+        if version is not None:
+            self.executor.restart()
+        return version
+
+    async def handle_reload(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /reload_knowledge from an admin"""
+        if update.effective_user is None or update.effective_user.id not in RELOAD_ADMIN_IDS:
+            await update.message.reply_text("You are not allowed to reload the knowledge tables.")
+            return
+
+        await update.message.reply_text("Reloading knowledge tables...")
+        # Rebuilding takes a while, so it runs off the event loop
+        version = await asyncio.get_running_loop().run_in_executor(None, self.reload_knowledge)
+        if version is None:
+            await update.message.reply_text("Reload failed; the previous tables are still in use.")
+        else:
+            await update.message.reply_text(f"Knowledge tables reloaded (version {version}).")
+
     def get_conversation_handler(self) -> ConversationHandler:
-        """Return the conversation handler for the symptom tracker"""
-        return ConversationHandler(
-            entry_points=[CommandHandler('track', self.start_tracking)],
-            states={
-                ENTER_AGE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_age)],
-                ENTER_GENDER: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_gender)],
-                ENTER_SYMPTOMS: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_symptoms),
-                    CommandHandler('done', self.handle_done_symptoms)
-                ],
-                ENTER_DURATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_duration)],
-                ENTER_DURATION_UNIT: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_duration_unit)],
-                ENTER_SEVERITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_severity)],
-                ENTER_TRAVEL: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_travel)],
-                ENTER_TRAVEL_DATES: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_travel_dates)],
-                ENTER_MEDICATIONS: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_medications)],
-                CONFIRM: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_confirmation)]
-            },
-            fallbacks=[CommandHandler('cancel', cancel)]
-        )
+        """
+        Return the conversation handler for the symptom tracker
+
+        Conversations are tracked per chat and user, not per message: the
+        "Did you mean" keyboard only answers the latest symptom prompt, so a
+        choice belongs to the user's conversation rather than to the message
+        that carried it. PTB warns about any CallbackQueryHandler under
+        per_message=False, which is the intended setup here.
+        """
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                'ignore', message="If 'per_message=False'", category=PTBUserWarning
+            )
+            return ConversationHandler(
+                entry_points=[CommandHandler('track', self.start_tracking)],
+                states={
+                    ENTER_AGE: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_age)],
+                    ENTER_GENDER: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_gender)],
+                    ENTER_SYMPTOMS: [
+                        MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_symptoms),
+                        CallbackQueryHandler(self.handle_symptom_choice, pattern='^symptom:'),
+                        CommandHandler('remove', self.handle_remove_symptom),
+                        CommandHandler('done', self.handle_done_symptoms)
+                    ],
+                    ENTER_DURATION: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_duration)],
+                    ENTER_DURATION_UNIT: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_duration_unit)],
+                    ENTER_SEVERITY: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_severity)],
+                    ENTER_TRAVEL: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_travel)],
+                    ENTER_TRAVEL_DATES: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_travel_dates)],
+                    ENTER_MEDICATIONS: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_medications)],
+                    CONFIRM: [MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_confirmation)]
+                },
+                fallbacks=[CommandHandler('cancel', cancel)],
+                per_chat=True,
+                per_user=True,
+                per_message=False
+            )
+
+    def get_inline_query_handler(self) -> InlineQueryHandler:
+        """Return the handler for inline-mode symptom autocomplete"""
+        return InlineQueryHandler(self.handle_inline_query)
 
 class DiagnosisCalculator:
+    def __init__(self, backend: str = 'dict', use_cache: bool = True):
+        if backend not in SCORING_BACKENDS:
+            raise ValueError(f"backend must be one of {SCORING_BACKENDS}")
+        self.backend = backend
+        self.use_cache = use_cache
+
     def calculate_diagnosis(self, **kwargs) -> Dict:
         """Calculate diagnosis based on symptoms and other factors"""
+        kwargs.setdefault('backend', self.backend)
+        kwargs.setdefault('use_cache', self.use_cache)
         return calculate_diagnosis(**kwargs)
 
+    def calculate_diagnosis_batch(
+        self,
+        profiles: List[Dict],
+        top_k: Optional[int] = None
+    ) -> List[Dict]:
+        """Calculate diagnoses for many patient profiles in one call"""
+        return calculate_diagnosis_batch(profiles, self.backend, top_k)
+
+class IncrementalScorer:
+    """
+    Running symptom scores for the /track flow
+
+    Each added or removed symptom updates the combinations it takes part in
+    and fetches its symptom weight row, so finalize() only has to apply the
+    duration, severity, travel, drug and risk factor modifiers. The scorer
+    keeps the tables it was created with, so a reload mid-conversation does
+    not mix old and new IDs.
+    """
+
+    def __init__(self):
+        self.tables = get_scoring_tables()
+        self.symptoms = set()
+        # Bitset of the tracked symptoms the tables know
+        self.mask = 0
+        # Active combination ID -> (matching member IDs, disease ID -> weight * match ratio)
+        self.active_combinations: Dict[int, Tuple[List[int], Dict[int, float]]] = {}
+        self.symptom_rows: Dict[int, List[Tuple[int, float, int]]] = {}
+
+    def canonical(self, symptom: str) -> str:
+        """Returns the name a symptom is tracked under, shared by all its aliases"""
+        return self.tables.symptoms.display(symptom) or canonical_name(symptom)
+
+    def add(self, symptom: str) -> bool:
+        """Adds a symptom, returning False if it (or an alias of it) was already present"""
+        symptom = self.canonical(symptom)
+        if not symptom or symptom in self.symptoms:
+            return False
+
+        self.symptoms.add(symptom)
+        symptom_id = self.tables.symptoms.id(symptom)
+        if symptom_id != UNKNOWN_ID:
+            self.mask |= 1 << symptom_id
+            if symptom_id in self.tables.symptom_rows:
+                self.symptom_rows[symptom_id] = self.tables.symptom_rows[symptom_id]
+            self._update_combinations(symptom_id)
+        return True
+
+    def remove(self, symptom: str) -> bool:
+        """Removes a symptom, returning False if it was not present"""
+        symptom = self.canonical(symptom)
+        if symptom not in self.symptoms:
+            return False
+
+        self.symptoms.discard(symptom)
+        symptom_id = self.tables.symptoms.id(symptom)
+        if symptom_id != UNKNOWN_ID:
+            self.mask &= ~(1 << symptom_id)
+            self.symptom_rows.pop(symptom_id, None)
+            self._update_combinations(symptom_id)
+        return True
+
+    def sync(self, symptoms: List[str]) -> None:
+        """Adds and removes symptoms so that exactly the given ones are tracked"""
+        wanted = {self.canonical(symptom) for symptom in symptoms}
+        for symptom in self.symptoms - wanted:
+            self.remove(symptom)
+        for symptom in symptoms:
+            self.add(symptom)
+
+    def _update_combinations(self, symptom_id: int) -> None:
+        """Re-evaluates only the combinations containing the changed symptom"""
+        index = self.tables.combinations
+        for combination_id in index.by_symptom.get(symptom_id, ()):
+            combination_symptoms = index.members[combination_id]
+            shared = self.mask & index.masks[combination_id]
+            shared_count = shared.bit_count()
+
+            if shared_count and shared_count >= min(2, len(combination_symptoms)):
+                intersection = [s for s in combination_symptoms if shared >> s & 1]
+                match_ratio = shared_count / len(combination_symptoms)
+                self.active_combinations[combination_id] = (intersection, {
+                    disease_id: weight * match_ratio
+                    for disease_id, weight in index.diseases[combination_id].items()
+                })
+            else:
+                self.active_combinations.pop(combination_id, None)
+
+    def partial_matches(self) -> Dict:
+        """Returns the running combination scores in find_partial_matches form"""
+        matches = {}
+        for combination_id in sorted(self.active_combinations):
+            intersection, contributions = self.active_combinations[combination_id]
+            for disease_id, contribution in contributions.items():
+                if disease_id not in matches:
+                    matches[disease_id] = {
+                        'score': 0,
+                        'matching_symptoms': []
+                    }
+                matches[disease_id]['score'] += contribution
+                matches[disease_id]['matching_symptoms'].extend(intersection)
+        return matches
+
+    def individual_scores(self, factors: Dict[str, Union[int, str]]) -> Dict:
+        """Applies patient modifiers to the symptom weight rows collected so far"""
+        symptom_ids = sorted(self.symptom_rows, key=self.tables.symptoms.name)
+        return score_symptom_rows(
+            [(symptom_id, self.symptom_rows[symptom_id]) for symptom_id in symptom_ids],
+            self.tables.profile_multipliers(resolve_modifier_keys(factors))
+        )
+
+    def finalize(
+        self,
+        symptoms: List[str],
+        duration: int,
+        duration_unit: str,
+        severity: str,
+        age: int,
+        gender: str,
+        drug_history: Optional[Union[str, List[str]]] = None,
+        travel_region: Optional[str] = None,
+        risk_factors: Optional[List[str]] = None,
+        top_k: Optional[int] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Union[List[DiagnosisResult], str]]:
+        """
+        Produces the same result as calculate_diagnosis for the given symptoms
+
+        The running state is first synced to symptoms, so only symptoms that
+        were not tracked yet (or no longer are) are rescored.
+        """
+        try:
+            self.sync(symptoms)
+            if not self.symptoms:
+                return {'error': 'Please select at least one symptom'}
+
+            profile = canonical_profile(
+                list(self.symptoms), duration, duration_unit, severity, age, gender,
+                drug_history, travel_region, risk_factors, self.tables
+            )
+            cache_key = (self.tables.version, profile, top_k)
+            if use_cache:
+                cached = diagnosis_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+            symptom_ids = self.tables.symptom_ids(profile.symptoms)
+            diagnosis_scores = combine_scores(
+                symptom_ids,
+                self.partial_matches(),
+                self.individual_scores(profile.scoring_factors()),
+                self.tables
+            )
+
+            result = finalize_diagnosis(
+                diagnosis_scores,
+                symptom_ids,
+                list(profile.drug_history) or None,
+                profile.travel_region,
+                list(profile.risk_factors) or None,
+                top_k,
+                self.tables
+            )
+            if use_cache:
+                diagnosis_cache.put(cache_key, result)
+            return result
+
+        except Exception as error:
+            print(f'Calculation error: {str(error)}')
+            return {'error': f'Error calculating diagnosis: {str(error)}'}
+
+def get_scoring_tables() -> ScoringTables:
+    """Returns the knowledge tables compiled to IDs, building them on first use"""
+    global _scoring_tables
+    tables = _scoring_tables
+    if tables is None:
+        with _scoring_tables_lock:
+            if _scoring_tables is None:
+                _scoring_tables = build_scoring_tables(
+                    {name: knowledge.table(name) for name in TRACKER_TABLES}
+                )
+            tables = _scoring_tables
+    return tables
+
+def build_scoring_tables(tables: Dict) -> ScoringTables:
+    """Compiles loaded knowledge tables into a new, versioned snapshot"""
+    return ScoringTables(
+        tables['symptom_combinations'],
+        tables['symptom_weights'],
+        tables['travel_risk_factors'],
+        tables['drug_history_weights'],
+        tables['risk_factor_weights'],
+        tables['symptom_aliases'],
+        version=next(_snapshot_versions)
+    )
+
+def export_shared_tables(directory: Optional[str] = None) -> str:
+    """
+    Writes the current snapshot to a file that worker processes attach to
+
+    The file name carries the process ID and snapshot version, so snapshots
+    written after a reload never replace a file workers still map.
+    Returns the path of the file.
+    """
+    tables = get_scoring_tables()
+    path = os.path.join(
+        directory or SHARED_TABLES_DIR,
+        f'carewave-tables-{os.getpid()}-{tables.version}.bin'
+    )
+    export_scoring_tables(tables, path)
+    return path
+
+def attach_shared_tables(path: str) -> None:
+    """Scores from a snapshot file written by export_shared_tables instead of compiling the tables"""
+    global _scoring_tables
+    tables = SharedScoringTables(path)
+    with _scoring_tables_lock:
+        _scoring_tables = tables
+
+def get_scoring_matrix() -> ScoringMatrix:
+    """Returns the compiled symptom weight rows, building them on first use"""
+    return get_scoring_tables().matrix()
+
+def get_combination_index() -> CombinationIndex:
+    """Returns the symptom -> combination index"""
+    return get_scoring_tables().combinations
+
+def snapshot_index(name: str) -> Any:
+    """
+    Returns an index of the current snapshot, building it on first use
+
+    reload_knowledge_tables publishes every index together with its
+    snapshot, so this only builds on the first use after startup.
+    """
+    tables = get_scoring_tables()
+    built = _snapshot_indexes.get(name)
+    if built is not None and built[0] == tables.version:
+        return built[1]
+    index = SNAPSHOT_INDEXES[name](tables, knowledge.common_symptoms)
+    with _scoring_tables_lock:
+        # A reload may have published a newer snapshot's index meanwhile
+        current = _snapshot_indexes.get(name)
+        if current is None or current[0] < tables.version:
+            _snapshot_indexes[name] = (tables.version, index)
+    return index
+
+def build_snapshot_indexes(
+    tables: ScoringTables,
+    common_symptoms: List[str]
+) -> Dict[str, Tuple[int, Any]]:
+    """Builds every symptom lookup index of a snapshot, keyed as _snapshot_indexes"""
+    return {
+        name: (tables.version, build(tables, common_symptoms))
+        for name, build in SNAPSHOT_INDEXES.items()
+    }
+
+def get_suggestion_index() -> SuggestionIndex:
+    """Returns the symptom suggestion index of the current snapshot"""
+    return snapshot_index('suggestions')
+
+def inline_symptom_results(text: str) -> List[InlineQueryResultArticle]:
+    """
+    Returns inline query results for typed text
+
+    Prefixes are answered from the suggestion trie, whose nodes hold their
+    best INLINE_RESULTS symptoms, and each answer is kept in
+    inline_results_cache. An empty query lists the first common symptoms.
+    """
+    key = (get_scoring_tables().version, canonical_name(text))
+    results = inline_results_cache.get(key)
+    if results is None:
+        if key[1]:
+            symptoms = get_suggestion_index().suggest(text, INLINE_RESULTS)
+        else:
+            symptoms = list(knowledge.common_symptoms[:INLINE_RESULTS])
+        results = [
+            InlineQueryResultArticle(
+                id=str(position),
+                title=symptom,
+                input_message_content=InputTextMessageContent(symptom)
+            )
+            for position, symptom in enumerate(symptoms)
+        ]
+        inline_results_cache.put(key, results)
+    return results
+
+def get_symptom_resolver() -> FuzzyIndex:
+    """Returns the index resolving misspelled symptoms of the current snapshot"""
+    return snapshot_index('resolver')
+
+def get_symptom_extractor() -> SymptomExtractor:
+    """Returns the automaton finding symptoms in free text of the current snapshot"""
+    return snapshot_index('extractor')
+
+def symptom_terms(
+    tables: ScoringTables,
+    common_symptoms: Optional[List[str]] = None
+) -> List[Tuple[str, str]]:
+    """
+    Returns (term, common symptom) pairs for every common symptom and every alias of one
+
+    Aliases are the other spellings the symptom vocabulary maps onto a
+    common symptom's ID. All names of one ID lead to the same common
+    symptom: the canonical name of the ID when it is a common symptom, else
+    the first common symptom with that ID. common_symptoms defaults to the
+    served common symptom table.
+    """
+    if common_symptoms is None:
+        common_symptoms = knowledge.common_symptoms
+    offered = {}
+    for symptom in common_symptoms:
+        symptom_id = tables.symptoms.id(symptom)
+        if symptom_id != UNKNOWN_ID:
+            offered.setdefault(symptom_id, symptom)
+    common = set(common_symptoms)
+    for symptom_id in offered:
+        if tables.symptoms.name(symptom_id) in common:
+            offered[symptom_id] = tables.symptoms.name(symptom_id)
+
+    terms = [
+        (symptom, offered.get(tables.symptoms.id(symptom), symptom)) for symptom in common_symptoms
+    ]
+    common_keys = {canonical_name(symptom) for symptom in common_symptoms}
+    for key, symptom_id in tables.symptoms.ids.items():
+        if symptom_id in offered and key not in common_keys:
+            terms.append((key, offered[symptom_id]))
+    return terms
+
+def prewarm_knowledge_base(background: bool = True):
+    """Loads the tables /track needs and compiles them ahead of use"""
+    def load():
+        knowledge.prewarm(TRACKER_TABLES, background=False)
+        get_scoring_tables()
+        for name in SNAPSHOT_INDEXES:
+            snapshot_index(name)
+
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name='tracker-prewarm', daemon=True)
+    thread.start()
+    return thread
+
+def __getattr__(name: str):
+    """Keeps symptom_tracker.symptom_weights and friends readable as module attributes"""
+    if name == 'combination_index':
+        return get_combination_index()
+    if name in TRACKER_TABLES:
+        return knowledge.table(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def reload_knowledge_tables() -> Optional[int]:
+    """
+    Re-reads the knowledge tables and swaps in a snapshot compiled from them
+
+    The new snapshot and its symptom lookup indexes are built on the
+    calling thread while the current ones keep serving requests, and are
+    published together; assessments that already hold the old snapshot
+    finish on it. If the tables cannot be read or compiled, the current
+    snapshot stays in place.
+    Returns the new snapshot version, or None when the reload failed.
+    """
+    global _scoring_tables
+
+    with _reload_lock:
+        try:
+            loaded = knowledge.read(TRACKER_TABLES, reload=True)
+            tables = build_scoring_tables(loaded)
+            indexes = build_snapshot_indexes(tables, loaded['common_symptoms'])
+        except Exception as error:
+            print(f'Knowledge reload failed, keeping the current tables: {str(error)}')
+            return None
+
+        with _scoring_tables_lock:
+            knowledge.replace(loaded)
+            _snapshot_indexes.update(indexes)
+            _scoring_tables = tables
+        # Old entries can no longer be hit, since keys carry the version
+        diagnosis_cache.invalidate()
+        inline_results_cache.invalidate()
+        return tables.version
+
+def canonical_profile(
+    symptoms: List[str],
+    duration: int,
+    duration_unit: str,
+    severity: str,
+    age: int,
+    gender: str,
+    drug_history: Optional[Union[str, List[str]]] = None,
+    travel_region: Optional[str] = None,
+    risk_factors: Optional[List[str]] = None,
+    tables: Optional[ScoringTables] = None
+) -> PatientProfile:
+    """
+    Builds the canonical profile for a set of calculate_diagnosis inputs
+
+    Symptoms are reduced to the name their ID shows in tables (so aliases
+    become their canonical symptom) or else their canonical_name, then
+    deduplicated and sorted;
+    duration and age are reduced to the duration bucket and age group the
+    scorers actually use, so every input that scores identically maps to the same
+    profile.
+    """
+    drugs = [drug_history] if isinstance(drug_history, str) else drug_history or []
+    vocabulary = (tables or get_scoring_tables()).symptoms
+    return PatientProfile(
+        symptoms=tuple(sorted({
+            vocabulary.display(s) or canonical_name(s) for s in symptoms if s.strip()
+        })),
+        duration=categorize_duration(normalize_duration(duration, duration_unit)),
+        severity=severity.lower().strip(),
+        age_group=categorize_age(age),
+        gender=gender.lower().strip(),
+        drug_history=tuple(sorted(set(drugs))),
+        travel_region=travel_region,
+        risk_factors=tuple(sorted(set(risk_factors or [])))
+    )
+
 def calculate_diagnosis(
     symptoms: List[str],
     duration: int,
@@ -315,146 +1025,486 @@ def calculate_diagnosis(
     gender: str,
     drug_history: Optional[Union[str, List[str]]] = None,
     travel_region: Optional[str] = None,
-    risk_factors: Optional[List[str]] = None
+    risk_factors: Optional[List[str]] = None,
+    backend: str = 'dict',
+    top_k: Optional[int] = None,
+    use_cache: bool = True
 ) -> Dict[str, Union[List[DiagnosisResult], str]]:
     """
     Calculates diagnosis based on symptoms and other factors
+
+    With top_k set, only the k most probable diagnoses are returned, and the
+    dict backend ranks them with rank_top_diagnoses. Inputs are scored in
+    their canonical_profile form and results are served from diagnosis_cache
+    when the same profile was scored before; cached results are shared
+    between callers and must not be modified.
     """
     try:
         # Input validation
         if not symptoms:
             return {'error': 'Please select at least one symptom'}
 
-        # Normalize duration to days
-        normalized_duration = normalize_duration(duration, duration_unit)
-        age_group = categorize_age(age)
-
-        # Calculate scores using both combination and individual approaches
-        diagnosis_scores = calculate_complete_scores(symptoms, {
-            'duration': normalized_duration,
-            'severity': severity,
-            'age_group': age_group,
-            'gender': gender
-        })
-
-        # Apply additional factor weights
-        apply_travel_risks(diagnosis_scores, travel_region)
-        apply_drug_history(diagnosis_scores, drug_history)
-        apply_risk_factors(diagnosis_scores, risk_factors)
-
-        # Filter out diagnoses with zero scores
-        filtered_scores = {
-            disease: data for disease, data in diagnosis_scores.items()
-            if data['score'] > 0
-        }
-
-        if not filtered_scores:
-            return {'error': 'No matching diagnoses found for the given symptoms'}
+        # The whole calculation uses one snapshot, even if a reload lands midway
+        tables = get_scoring_tables()
+        profile = canonical_profile(
+            symptoms, duration, duration_unit, severity, age, gender,
+            drug_history, travel_region, risk_factors, tables
+        )
+        cache_key = (tables.version, profile, top_k)
+        if use_cache:
+            cached = diagnosis_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-        results = calculate_final_results(filtered_scores, symptoms, {
-            'travel_region': travel_region,
-            'risk_factors': risk_factors
-        })
+        symptom_ids = tables.symptom_ids(profile.symptoms)
+        if top_k is not None and backend == 'dict' and tables.bounds().admissible:
+            result = rank_top_diagnoses(
+                symptom_ids,
+                profile.scoring_factors(),
+                list(profile.drug_history) or None,
+                profile.travel_region,
+                list(profile.risk_factors) or None,
+                top_k,
+                tables
+            )
+        else:
+            # Calculate scores using both combination and individual approaches
+            diagnosis_scores = calculate_complete_scores(
+                symptom_ids, profile.scoring_factors(), backend, tables
+            )
 
-        return {
-            'detailed': [
-                DiagnosisResult(
-                    diagnosis=result['disease'],
-                    probability=round(result['probability'] * 100),
-                    confidence=get_confidence_level(result['probability']),
-                    matching_factors={
-                        'symptom_match': ', '.join(result['factors'].symptoms),
-                        'risk_factor_match': ', '.join(result['factors'].risks),
-                        'travel_risk_match': result['factors'].travel or 'None'
-                    }
-                )
-                for result in results
-            ]
-        }
+            result = finalize_diagnosis(
+                diagnosis_scores,
+                symptom_ids,
+                list(profile.drug_history) or None,
+                profile.travel_region,
+                list(profile.risk_factors) or None,
+                top_k,
+                tables
+            )
+        if use_cache:
+            diagnosis_cache.put(cache_key, result)
+        return result
 
     except Exception as error:
         print(f'Calculation error: {str(error)}')
         return {'error': f'Error calculating diagnosis: {str(error)}'}
 
+def calculate_diagnosis_batch(
+    profiles: List[Dict],
+    backend: str = 'dict',
+    top_k: Optional[int] = None
+) -> List[Dict[str, Union[List[DiagnosisResult], str]]]:
+    """
+    Calculates diagnoses for many patient profiles in one call
+
+    Each profile holds the keyword arguments of calculate_diagnosis and is
+    reduced to its canonical_profile. Profiles that canonicalize identically
+    are scored once, partial combination matches are shared between equal
+    symptom sets, and the matrix backend scores the whole batch in one pass.
+    Results are returned in profile order and bypass diagnosis_cache.
+    """
+    if backend not in SCORING_BACKENDS:
+        raise ValueError(f"Unknown scoring backend: {backend}")
+
+    tables = get_scoring_tables()
+    outcomes: List[Optional[Dict]] = [None] * len(profiles)
+    positions: Dict[PatientProfile, List[int]] = {}
+
+    for index, profile in enumerate(profiles):
+        try:
+            if not profile['symptoms']:
+                outcomes[index] = {'error': 'Please select at least one symptom'}
+                continue
+            positions.setdefault(canonical_profile(**profile, tables=tables), []).append(index)
+        except Exception as error:
+            print(f'Calculation error: {str(error)}')
+            outcomes[index] = {'error': f'Error calculating diagnosis: {str(error)}'}
+
+    unique_profiles = list(positions)
+    symptom_ids = [tables.symptom_ids(profile.symptoms) for profile in unique_profiles]
+    if backend == 'matrix':
+        individual_scores = tables.matrix().score_batch([
+            (ids, tables.profile_multipliers(profile.modifier_keys()))
+            for ids, profile in zip(symptom_ids, unique_profiles)
+        ])
+    else:
+        individual_scores = [None] * len(unique_profiles)
+
+    partial_cache = {}
+    for profile, ids, individual in zip(unique_profiles, symptom_ids, individual_scores):
+        try:
+            if profile.symptoms not in partial_cache:
+                partial_cache[profile.symptoms] = find_partial_matches(ids, tables, backend)
+            if individual is None:
+                individual = calculate_individual_scores(
+                    ids, profile.scoring_factors(), tables=tables
+                )
+
+            diagnosis_scores = combine_scores(
+                ids, partial_cache[profile.symptoms], individual, tables
+            )
+            outcome = finalize_diagnosis(
+                diagnosis_scores,
+                ids,
+                list(profile.drug_history) or None,
+                profile.travel_region,
+                list(profile.risk_factors) or None,
+                top_k,
+                tables
+            )
+        except Exception as error:
+            print(f'Calculation error: {str(error)}')
+            outcome = {'error': f'Error calculating diagnosis: {str(error)}'}
+
+        for index in positions[profile]:
+            outcomes[index] = outcome
+
+    return outcomes
+
+def finalize_diagnosis(
+    diagnosis_scores: Dict[int, Dict],
+    symptom_ids: List[int],
+    drug_history: Optional[Union[str, List[str]]],
+    travel_region: Optional[str],
+    risk_factors: Optional[List[str]],
+    top_k: Optional[int] = None,
+    tables: Optional[ScoringTables] = None
+) -> Dict[str, Union[List[DiagnosisResult], str]]:
+    """Applies additional factor weights and builds the ranked results"""
+    tables = tables or get_scoring_tables()
+
+    # Apply additional factor weights
+    apply_travel_risks(diagnosis_scores, travel_region, tables)
+    apply_drug_history(diagnosis_scores, drug_history, tables)
+    apply_risk_factors(diagnosis_scores, risk_factors, tables)
+
+    # Filter out diagnoses with zero scores
+    filtered_scores = {
+        disease_id: data for disease_id, data in diagnosis_scores.items()
+        if data['score'] > 0
+    }
+
+    if not filtered_scores:
+        return {'error': 'No matching diagnoses found for the given symptoms'}
+
+    results = calculate_final_results(filtered_scores, symptom_ids, {
+        'travel_region': travel_region,
+        'risk_factors': risk_factors
+    }, top_k, tables)
+    return format_diagnosis(results)
+
+def format_diagnosis(results: List[Dict]) -> Dict[str, List[DiagnosisResult]]:
+    """Builds the detailed diagnosis list from calculate_final_results output"""
+    return {
+        'detailed': [
+            DiagnosisResult(
+                diagnosis=result['disease'],
+                probability=round(round(result['probability'] * 100, PERCENT_DIGITS)),
+                confidence=get_confidence_level(result['probability']),
+                matching_factors={
+                    'symptom_match': ', '.join(result['factors'].symptoms),
+                    'risk_factor_match': ', '.join(result['factors'].risks),
+                    'travel_risk_match': result['factors'].travel or 'None'
+                }
+            )
+            for result in results
+        ]
+    }
+
+def rank_top_diagnoses(
+    symptom_ids: List[int],
+    factors: Dict[str, Union[int, str]],
+    drug_history: Optional[Union[str, List[str]]],
+    travel_region: Optional[str],
+    risk_factors: Optional[List[str]],
+    top_k: int,
+    tables: ScoringTables
+) -> Dict[str, Union[List[DiagnosisResult], str]]:
+    """
+    Ranks the top_k diagnoses without scoring every candidate disease
+
+    A candidate's upper bound adds, for every symptom weight entry,
+    matched combination, travel region, drug and risk factor listing it,
+    the largest contribution one source of that kind can add to that
+    disease (ScoringTables.bounds).
+    Candidates are scored one at a time in decreasing bound order, and
+    scoring stops once the next bound falls below the k-th best score.
+    Probabilities are relative to the total of all scores, which is summed
+    from per-row totals instead of per-disease scores.
+
+    Results match finalize_diagnosis over calculate_complete_scores,
+    including the order of tied diagnoses; the bounds are only admissible
+    while every weight and modifier factor is non-negative.
+    """
+    bounds = tables.bounds()
+    index = tables.combinations
+    multipliers = tables.profile_multipliers(resolve_modifier_keys(factors))
+
+    # Every active source of score, in the order calculate_complete_scores
+    # and the apply_* functions add them
+    exact_id = exact_combination(symptom_ids, index)
+    exact = index.diseases[exact_id] if exact_id is not None else {}
+    matches = index.matches(symptom_mask(symptom_ids))
+    partial = [
+        (index.diseases[combination_id], len(intersection) / len(index.members[combination_id]), intersection)
+        for combination_id, intersection in matches
+    ]
+    rows = [symptom_id for symptom_id in symptom_ids if symptom_id in bounds.row_diseases]
+    travel = tables.travel[travel_region] if travel_region and travel_region in tables.travel else {}
+    drugs = [drug_history] if isinstance(drug_history, str) else drug_history or []
+    drug_rows = [tables.drugs[drug] for drug in drugs if drug in tables.drugs]
+    risk_rows = [(factor, tables.risks[factor]) for factor in risk_factors or [] if factor in tables.risks]
+
+    total_score = bounds.combination_totals[exact_id] if exact_id is not None else 0
+    for (combination_id, _), (_, ratio, _) in zip(matches, partial):
+        total_score += bounds.combination_totals[combination_id] * ratio
+    for symptom_id in rows:
+        total_score += sum(
+            weight * multipliers[profile_id] for profile_id, weight in bounds.row_totals[symptom_id].items()
+        )
+    if travel:
+        total_score += bounds.factor_totals['travel'][travel_region]
+    total_score += sum(bounds.factor_totals['drugs'][drug] for drug in drugs if drug in tables.drugs)
+    total_score += sum(bounds.factor_totals['risks'][factor] for factor, _ in risk_rows)
+
+    # Upper bound of every candidate, built up source by source; the dict
+    # lists candidates in the order the full score table first lists them,
+    # which breaks ties between equal probabilities
+    upper_bounds = {disease_id: bounds.combination[disease_id] for disease_id in exact}
+    for diseases, _, _ in partial:
+        for disease_id in diseases:
+            upper_bounds[disease_id] = upper_bounds.get(disease_id, 0) + bounds.combination[disease_id]
+    for symptom_id in rows:
+        for disease_id in bounds.row_diseases[symptom_id]:
+            upper_bounds[disease_id] = upper_bounds.get(disease_id, 0) + bounds.symptom[disease_id]
+    factor_rows_by_kind = (
+        ('travel', [travel]), ('drugs', drug_rows), ('risks', [row for _, row in risk_rows])
+    )
+    for kind, factor_rows in factor_rows_by_kind:
+        kind_bounds = getattr(bounds, kind)
+        for row in factor_rows:
+            for disease_id in row:
+                upper_bounds[disease_id] = upper_bounds.get(disease_id, 0) + kind_bounds[disease_id]
+    first_seen = {disease_id: position for position, disease_id in enumerate(upper_bounds)}
+
+    def score(disease_id: int) -> float:
+        """Sums a disease's contributions in the order the full score table does"""
+        total = exact.get(disease_id, 0)
+        partial_score = 0
+        for diseases, ratio, _ in partial:
+            if disease_id in diseases:
+                partial_score += diseases[disease_id] * ratio
+        total += partial_score
+        individual_score = 0
+        entries = bounds.symptom_entries.get(disease_id, {})
+        for symptom_id in rows:
+            for weight, profile_id in entries.get(symptom_id, ()):
+                individual_score += weight * multipliers[profile_id]
+        total += individual_score
+        total += travel.get(disease_id, 0)
+        for row in drug_rows:
+            total += row.get(disease_id, 0)
+        for _, row in risk_rows:
+            total += row.get(disease_id, 0)
+        return total
+
+    scored: Dict[int, float] = {}
+    best: List[float] = []
+    for disease_id in sorted(upper_bounds, key=upper_bounds.get, reverse=True):
+        # The slack keeps rounding in the bound's sums from pruning a tie
+        if len(best) == top_k and upper_bounds[disease_id] * BOUND_SLACK < best[0]:
+            break
+        disease_score = score(disease_id)
+        if disease_score <= 0:
+            continue
+        scored[disease_id] = disease_score
+        if len(best) < top_k:
+            heapq.heappush(best, disease_score)
+        elif disease_score > best[0]:
+            heapq.heapreplace(best, disease_score)
+
+    if not scored:
+        return {'error': 'No matching diagnoses found for the given symptoms'}
+
+    ranked = sorted(
+        scored,
+        key=lambda disease_id: (-(scored[disease_id] / total_score), first_seen[disease_id])
+    )[:top_k]
+
+    scores = {}
+    for disease_id in ranked:
+        # Matching symptoms are merged exactly as merge_scores merges them
+        matching = list(symptom_ids) if disease_id in exact else None
+        shared = [
+            symptom_id for diseases, _, intersection in partial if disease_id in diseases
+            for symptom_id in intersection
+        ]
+        if any(disease_id in diseases for diseases, _, _ in partial):
+            matching = list(set((matching or []) + shared))
+        matched_rows = []
+        for symptom_id in rows:
+            if (disease_id in bounds.row_diseases[symptom_id]
+                    and (not matched_rows or matched_rows[-1] != symptom_id)):
+                matched_rows.append(symptom_id)
+        if matched_rows:
+            matching = list(set((matching or []) + matched_rows))
+
+        scores[disease_id] = {'score': scored[disease_id], 'matching_symptoms': matching or []}
+        if disease_id in travel:
+            scores[disease_id]['travel_risk'] = travel_region
+        risks = [factor for factor, row in risk_rows if disease_id in row]
+        if risks:
+            scores[disease_id]['risk_factors'] = risks
+
+    return format_diagnosis(calculate_final_results(scores, symptom_ids, {
+        'travel_region': travel_region,
+        'risk_factors': risk_factors
+    }, top_k, tables, total_score))
+
 def calculate_complete_scores(
-    symptoms: List[str],
-    factors: Dict[str, Union[int, str]]
-) -> Dict[str, Dict]:
+    symptom_ids: List[int],
+    factors: Dict[str, Union[int, str]],
+    backend: str = 'dict',
+    tables: Optional[ScoringTables] = None
+) -> Dict[int, Dict]:
     """Calculates complete scores using both combination and individual approaches"""
+    tables = tables or get_scoring_tables()
+    return combine_scores(
+        symptom_ids,
+        find_partial_matches(symptom_ids, tables, backend),
+        calculate_individual_scores(symptom_ids, factors, backend, tables),
+        tables
+    )
+
+def combine_scores(
+    symptom_ids: List[int],
+    partial_matches: Dict[int, Dict],
+    individual_scores: Dict[int, Dict],
+    tables: Optional[ScoringTables] = None
+) -> Dict[int, Dict]:
+    """Combines exact, partial and individual scores into one fresh score table"""
     scores = {}
-    
+
     # First try exact combinations
-    exact_matches = find_exact_matches(symptoms)
+    exact_matches = find_exact_matches(symptom_ids, tables)
     if exact_matches:
         scores.update(exact_matches)
 
     # Then try partial combinations
-    partial_matches = find_partial_matches(symptoms)
     merge_scores(scores, partial_matches)
 
     # Finally, evaluate individual symptoms
-    individual_scores = calculate_individual_scores(symptoms, factors)
     merge_scores(scores, individual_scores)
 
     return scores
 
-def find_exact_matches(symptoms: List[str]) -> Dict:
-    """Finds exact matches in symptom combinations"""
-    sorted_symptoms = ', '.join(sorted(symptoms))
-    if sorted_symptoms in symptom_combinations:
-        matches = {}
-        for disease, weight in symptom_combinations[sorted_symptoms].items():
-            matches[disease] = {
-                'score': weight,
-                'matching_symptoms': symptoms,
-                'is_exact_match': True
-            }
-        return matches
-    return {}
+def find_exact_matches(
+    symptom_ids: List[int],
+    tables: Optional[ScoringTables] = None
+) -> Dict:
+    """Finds the combination made of exactly the given symptoms"""
+    index = (tables or get_scoring_tables()).combinations
+    combination_id = exact_combination(symptom_ids, index)
+    if combination_id is None:
+        return {}
+
+    matches = {}
+    for disease_id, weight in index.diseases[combination_id].items():
+        matches[disease_id] = {
+            'score': weight,
+            'matching_symptoms': list(symptom_ids),
+            'is_exact_match': True
+        }
+    return matches
+
+def exact_combination(symptom_ids: List[int], index: CombinationIndex) -> Optional[int]:
+    """Returns the ID of the combination made of exactly the given symptoms, if any"""
+    mask = symptom_mask(symptom_ids)
+    # Unknown or repeated symptoms leave fewer bits set than symptoms given
+    if mask.bit_count() != len(symptom_ids):
+        return None
+    return index.exact.get(mask)
 
-def find_partial_matches(symptoms: List[str]) -> Dict:
+def find_partial_matches(
+    symptom_ids: List[int],
+    tables: Optional[ScoringTables] = None,
+    backend: str = 'dict'
+) -> Dict:
     """Finds partial matches in symptom combinations"""
+    if backend not in SCORING_BACKENDS:
+        raise ValueError(f"Unknown scoring backend: {backend}")
+    tables = tables or get_scoring_tables()
+    if backend == 'matrix':
+        return tables.combination_matrix().partial_matches(symptom_ids)
+
     matches = {}
-    symptom_set = set(symptoms)
+    combination_index = tables.combinations
 
-    for combination, diseases in symptom_combinations.items():
-        combination_symptoms = combination.split(', ')
-        intersection = [s for s in combination_symptoms if s in symptom_set]
-        
-        if len(intersection) >= min(2, len(combination_symptoms)):
-            match_ratio = len(intersection) / len(combination_symptoms)
-            
-            for disease, weight in diseases.items():
-                if disease not in matches:
-                    matches[disease] = {
-                        'score': 0,
-                        'matching_symptoms': []
-                    }
-                matches[disease]['score'] += weight * match_ratio
-                matches[disease]['matching_symptoms'].extend(intersection)
+    for combination_id, intersection in combination_index.matches(symptom_mask(symptom_ids)):
+        match_ratio = len(intersection) / len(combination_index.members[combination_id])
+
+        for disease_id, weight in combination_index.diseases[combination_id].items():
+            if disease_id not in matches:
+                matches[disease_id] = {
+                    'score': 0,
+                    'matching_symptoms': []
+                }
+            matches[disease_id]['score'] += weight * match_ratio
+            matches[disease_id]['matching_symptoms'].extend(intersection)
 
     return matches
 
 def calculate_individual_scores(
-    symptoms: List[str],
-    factors: Dict[str, Union[int, str]]
+    symptom_ids: List[int],
+    factors: Dict[str, Union[int, str]],
+    backend: str = 'dict',
+    tables: Optional[ScoringTables] = None
 ) -> Dict:
     """Calculates scores based on individual symptoms"""
+    if backend not in SCORING_BACKENDS:
+        raise ValueError(f"Unknown scoring backend: {backend}")
+    tables = tables or get_scoring_tables()
+    # Patient factors are resolved once, then every profile's modifier
+    # product is a single list shared by all weight entries
+    multipliers = tables.profile_multipliers(resolve_modifier_keys(factors))
+    if backend == 'matrix':
+        return tables.matrix().score(symptom_ids, multipliers)
+
+    return score_symptom_rows(
+        [
+            (symptom_id, tables.symptom_rows[symptom_id]) for symptom_id in symptom_ids
+            if symptom_id in tables.symptom_rows
+        ],
+        multipliers
+    )
+
+def score_symptom_rows(
+    rows: List[Tuple[int, List[Tuple[int, float, int]]]],
+    multipliers: List[float]
+) -> Dict:
+    """
+    Sums modified weights of (symptom ID, weight row) pairs per disease ID
+
+    Entries refer to their modifier profile by ID, and multipliers holds the
+    patient's modifier product of every profile, as returned by
+    ScoringTables.profile_multipliers.
+    """
     scores = {}
-    
-    for symptom in symptoms:
-        if symptom in symptom_weights:
-            for disease, data in symptom_weights[symptom].items():
-                if disease not in scores:
-                    scores[disease] = {
-                        'score': 0,
-                        'matching_symptoms': []
-                    }
-                
-                base_score = data['weight']
-                modifiers = calculate_modifiers(data, factors)
-                scores[disease]['score'] += base_score * modifiers
-                scores[disease]['matching_symptoms'].append(symptom)
+
+    for symptom_id, entries in rows:
+        for disease_id, base_score, profile_id in entries:
+            if disease_id not in scores:
+                scores[disease_id] = {
+                    'score': 0,
+                    'matching_symptoms': []
+                }
+
+            scores[disease_id]['score'] += base_score * multipliers[profile_id]
+            # A disease spelled twice in one row still matched the symptom once
+            matching = scores[disease_id]['matching_symptoms']
+            if not matching or matching[-1] != symptom_id:
+                matching.append(symptom_id)
 
     return scores
 
@@ -480,6 +1530,13 @@ def normalize_duration(duration: int, unit: str) -> int:
     }
     return duration * multipliers.get(unit.lower(), 1)
 
+def categorize_duration(days: int) -> str:
+    """Buckets a day count into the duration factor keys of symptom weights"""
+    for bucket, limit in DURATION_BUCKETS:
+        if days <= limit:
+            return bucket
+    return 'long'
+
 def categorize_age(age: int) -> str:
     """Categorizes age into groups"""
     if age <= 12:
@@ -490,79 +1547,122 @@ def categorize_age(age: int) -> str:
         return 'adult'
     return 'elderly'
 
-def calculate_modifiers(data: Dict, factors: Dict) -> float:
-    """Calculates modifiers based on various factors"""
+def resolve_modifier_keys(factors: Dict[str, Union[int, str]]) -> ModifierKeys:
+    """
+    Resolves patient factors to the modifier table keys to look up
+
+    A duration given in days is bucketed first; age groups fall back to the
+    broader groups some tables use instead (adult -> adults, allAges).
+    """
+    duration = factors['duration']
+    if isinstance(duration, int):
+        duration = categorize_duration(duration)
     return (
-        data.get('duration_factors', {}).get(factors['duration'], 1) *
-        data.get('severity_factors', {}).get(factors['severity'], 1) *
-        data.get('age_factors', {}).get(factors['age_group'], 1) *
-        data.get('gender_factors', {}).get(factors['gender'], 1)
+        (duration,),
+        (factors['severity'],),
+        AGE_FACTOR_KEYS.get(factors['age_group'], (factors['age_group'], 'allAges')),
+        (factors['gender'],)
     )
 
-def apply_travel_risks(scores: Dict, region: Optional[str]) -> None:
+def calculate_modifiers(data: Dict, factors: Dict) -> float:
+    """Calculates modifiers based on various factors"""
+    return modifier_product(data, resolve_modifier_keys(factors))
+
+def apply_travel_risks(
+    scores: Dict,
+    region: Optional[str],
+    tables: Optional[ScoringTables] = None
+) -> None:
     """Applies travel risk factors to scores"""
-    if not region or region not in travel_risk_factors:
+    travel_risks = (tables or get_scoring_tables()).travel
+    if not region or region not in travel_risks:
         return
 
-    for disease, weight in travel_risk_factors[region].items():
-        if disease not in scores:
-            scores[disease] = {'score': 0, 'matching_symptoms': []}
-        scores[disease]['score'] += weight
-        scores[disease]['travel_risk'] = region
+    for disease_id, weight in travel_risks[region].items():
+        if disease_id not in scores:
+            scores[disease_id] = {'score': 0, 'matching_symptoms': []}
+        scores[disease_id]['score'] += weight
+        scores[disease_id]['travel_risk'] = region
 
 def apply_drug_history(
     scores: Dict,
-    drugs: Optional[Union[str, List[str]]]
+    drugs: Optional[Union[str, List[str]]],
+    tables: Optional[ScoringTables] = None
 ) -> None:
     """Applies drug history factors to scores"""
     if not drugs:
         return
-    
+
+    drug_weights = (tables or get_scoring_tables()).drugs
     drug_list = [drugs] if isinstance(drugs, str) else drugs
     for drug in drug_list:
-        if drug in drug_history_weights:
-            for disease, weight in drug_history_weights[drug].items():
-                if disease not in scores:
-                    scores[disease] = {'score': 0, 'matching_symptoms': []}
-                scores[disease]['score'] += weight
+        if drug in drug_weights:
+            for disease_id, weight in drug_weights[drug].items():
+                if disease_id not in scores:
+                    scores[disease_id] = {'score': 0, 'matching_symptoms': []}
+                scores[disease_id]['score'] += weight
 
-def apply_risk_factors(scores: Dict, factors: Optional[List[str]]) -> None:
+def apply_risk_factors(
+    scores: Dict,
+    factors: Optional[List[str]],
+    tables: Optional[ScoringTables] = None
+) -> None:
     """Applies general risk factors to scores"""
     if not factors:
         return
 
+    risk_weights = (tables or get_scoring_tables()).risks
     for factor in factors:
-        if factor in risk_factor_weights:
-            for disease, weight in risk_factor_weights[factor].items():
-                if disease not in scores:
-                    scores[disease] = {'score': 0, 'matching_symptoms': []}
-                scores[disease]['score'] += weight
-                if 'risk_factors' not in scores[disease]:
-                    scores[disease]['risk_factors'] = []
-                scores[disease]['risk_factors'].append(factor)
+        if factor in risk_weights:
+            for disease_id, weight in risk_weights[factor].items():
+                if disease_id not in scores:
+                    scores[disease_id] = {'score': 0, 'matching_symptoms': []}
+                scores[disease_id]['score'] += weight
+                if 'risk_factors' not in scores[disease_id]:
+                    scores[disease_id]['risk_factors'] = []
+                scores[disease_id]['risk_factors'].append(factor)
 
 def calculate_final_results(
     scores: Dict,
-    symptoms: List[str],
-    factors: Dict[str, Optional[Union[str, List[str]]]]
+    symptom_ids: List[int],
+    factors: Dict[str, Optional[Union[str, List[str]]]],
+    top_k: Optional[int] = None,
+    tables: Optional[ScoringTables] = None,
+    total_score: Optional[float] = None
 ) -> List[Dict]:
-    """Calculates final diagnostic results with probabilities"""
-    total_score = sum(data['score'] for data in scores.values())
-    
-    results = []
-    for disease, data in scores.items():
-        probability = data['score'] / total_score if total_score > 0 else 0
-        results.append({
-            'disease': disease,
-            'probability': probability,
+    """
+    Calculates final diagnostic results with probabilities
+
+    With top_k set, the k best diagnoses are picked with a heap and matching
+    factors are only built for those, instead of sorting every candidate.
+    Disease and symptom IDs are turned back into display names here.
+    Probabilities are relative to total_score, the sum of all scores unless
+    given.
+    """
+    tables = tables or get_scoring_tables()
+    if total_score is None:
+        total_score = sum(data['score'] for data in scores.values())
+
+    def probability(item) -> float:
+        return item[1]['score'] / total_score if total_score > 0 else 0
+
+    if top_k is None:
+        ranked = sorted(scores.items(), key=probability, reverse=True)
+    else:
+        ranked = heapq.nlargest(top_k, scores.items(), key=probability)
+
+    return [
+        {
+            'disease': tables.diseases.name(disease_id),
+            'probability': probability((disease_id, data)),
             'factors': DiagnosisFactors(
-                symptoms=list(set(data['matching_symptoms'])),
+                symptoms=tables.symptom_names(set(data['matching_symptoms'])),
                 risks=data.get('risk_factors', []),
                 travel=data.get('travel_risk')
             )
-        })
-    
-    return sorted(results, key=lambda x: x['probability'], reverse=True)
+        }
+        for disease_id, data in ranked
+    ]
 
 def get_confidence_level(probability: float) -> str:
     """Determines confidence level based on probability"""
@@ -572,7 +1672,30 @@ def get_confidence_level(probability: float) -> str:
         return 'Medium'
     return 'Low'
 
-def setup_bot(application):
-    """Setup the bot with the symptom tracking system"""
-    tracker = SymptomTracker()
-    application.add_handler(tracker.get_conversation_handler())
\ No newline at end of file
+def setup_bot(
+    application,
+    executor: Optional[ScoringExecutor] = None,
+    prewarm: bool = True,
+    reload_signal: bool = True
+):
+    """
+    Setup the bot with the symptom tracking system
+
+    Admins listed in CAREWAVE_ADMIN_IDS can reload the knowledge tables with
+    /reload_knowledge; with reload_signal set, SIGHUP reloads them as well.
+    """
+    if prewarm:
+        prewarm_knowledge_base(background=True)
+    tracker = SymptomTracker(executor)
+    application.add_handler(tracker.get_conversation_handler())
+    application.add_handler(tracker.get_inline_query_handler())
+    application.add_handler(CommandHandler('reload_knowledge', tracker.handle_reload))
+
+    # Signal handlers can only be installed from the main thread
+    if reload_signal and hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread():
+        def on_hangup(signum, frame):
+            threading.Thread(
+                target=tracker.reload_knowledge, name='knowledge-reload', daemon=True
+            ).start()
+
+        signal.signal(signal.SIGHUP, on_hangup)
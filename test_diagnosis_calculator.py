@@ -0,0 +1,95 @@
+import random
+import unittest
+
+from diagnosis import POSSIBLE_DIAGNOSES
+from diagnosis_calculator import DiagnosisCalculator
+
+
+class SimilarDiagnosesTest(unittest.TestCase):
+    def setUp(self):
+        self.calculator = DiagnosisCalculator([
+            {
+                'diagnosis': 'Common Cold',
+                'symptoms': ['Cough', 'Runny Nose', 'Sore Throat'],
+                'risk_factors': ['Smoking History']
+            },
+            {
+                'diagnosis': 'Flu',
+                'symptoms': ['Cough', 'Runny Nose', 'Sore Throat', 'Fever'],
+                'risk_factors': ['Smoking History']
+            }
+        ])
+
+    def test_factors_match_canonical_patient_input(self):
+        symptoms = frozenset(self.calculator._canonical_symptoms('Cough, sore throat'))
+        primary, _, risks = self.calculator.similarity.factors[0]
+
+        self.assertEqual(primary & symptoms, {'cough', 'sore throat'})
+        self.assertEqual(risks & frozenset(self.calculator._canonical_list('Smoking History')), {'smoking history'})
+
+    def test_patient_similarity_counts_shared_matches(self):
+        similarity = self.calculator.similarity
+        symptoms = frozenset(self.calculator._canonical_symptoms('cough, runny nose, sore throat'))
+        primary, secondary, risks = similarity.factors[0]
+        matched = (primary & symptoms, secondary & symptoms, risks & frozenset(['smoking history']))
+
+        # Flu has every factor the patient matched for the common cold
+        self.assertAlmostEqual(similarity.patient_similarity(0, 1, matched), 1.0)
+
+    def test_patient_similarity_weighs_unshared_matches(self):
+        similarity = self.calculator.similarity
+        symptoms = frozenset(self.calculator._canonical_symptoms('cough, runny nose, sore throat, fever'))
+        primary, secondary, risks = similarity.factors[1]
+        matched = (primary & symptoms, secondary & symptoms, risks & frozenset(['smoking history']))
+
+        # Fever is matched for the flu but is not a common cold symptom
+        self.assertAlmostEqual(similarity.patient_similarity(1, 0, matched), (3 * 0.5 + 0.2) / (4 * 0.5 + 0.2))
+
+    def test_similar_runner_up_gets_medium_confidence(self):
+        results = [
+            {'diagnosis': 'Flu', 'confidence': {'level': 'High', 'score': 0.8}},
+            {'diagnosis': 'Common Cold', 'confidence': {'level': 'High', 'score': 0.8}}
+        ]
+        symptoms = frozenset(self.calculator._canonical_symptoms('cough, runny nose, sore throat, fever'))
+
+        adjusted = self.calculator._adjust_similar_diagnoses(results, symptoms, ['smoking history'])
+
+        self.assertEqual(adjusted[0]['confidence'], {'level': 'High', 'score': 0.8})
+        self.assertEqual(adjusted[1]['confidence']['level'], 'Medium')
+        self.assertAlmostEqual(adjusted[1]['confidence']['score'], 0.72)
+
+    def test_bronchitis_factors_overlap_patient_symptoms(self):
+        calculator = DiagnosisCalculator(POSSIBLE_DIAGNOSES)
+        primary, _, risks = calculator.similarity.factors[calculator.similarity.index['Bronchitis']]
+
+        self.assertEqual(primary & frozenset(calculator._canonical_symptoms('cough, fatigue')), {'cough', 'fatigue'})
+        self.assertIn('smoking history', risks)
+
+
+class BatchDiagnosisTest(unittest.TestCase):
+    def test_batch_matches_single_calls(self):
+        calculator = DiagnosisCalculator(POSSIBLE_DIAGNOSES, cache_size=0)
+        symptoms = sorted({symptom for diagnosis in POSSIBLE_DIAGNOSES for symptom in diagnosis['symptoms']})
+        rng = random.Random(4)
+        profiles = [
+            {
+                'symptoms': ', '.join(rng.sample(symptoms, rng.randint(1, 5))),
+                'risk_factors': rng.choice(['', 'Smoking History', 'asthma, exposure to pollution']),
+                'severity': rng.choice(['mild', '4-5 - Moderate', '10 - Extremely Severe']),
+                'age': rng.choice(['0-12', '20-39', '60-79']),
+                'duration': rng.choice(['1-3 days', '4-7 days', 'More than 2 weeks']),
+                'sex': rng.choice(['Male', 'Female']),
+                'drug_history': rng.choice(['No medications', 'aspirin daily']),
+                'travel_history': rng.choice(['No recent travel', 'International travel'])
+            }
+            for _ in range(150)
+        ]
+
+        self.assertEqual(
+            calculator.calculate_diagnosis_batch(profiles),
+            [calculator.calculate_diagnosis(profile) for profile in profiles]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import random
+import string
+import unittest
+
+from fuzzy_index import FuzzyIndex, edit_distance
+from symptom_tracker import get_symptom_resolver
+
+
+def full_edit_distance(first: str, second: str) -> int:
+    """Optimal string alignment distance over the whole table"""
+    rows = [[i + j if not i or not j else 0 for j in range(len(second) + 1)] for i in range(len(first) + 1)]
+    for i in range(1, len(first) + 1):
+        for j in range(1, len(second) + 1):
+            cost = 0 if first[i - 1] == second[j - 1] else 1
+            rows[i][j] = min(rows[i - 1][j] + 1, rows[i][j - 1] + 1, rows[i - 1][j - 1] + cost)
+            if i > 1 and j > 1 and first[i - 1] == second[j - 2] and first[i - 2] == second[j - 1]:
+                rows[i][j] = min(rows[i][j], rows[i - 2][j - 2] + 1)
+    return rows[-1][-1]
+
+
+def misspell(text: str, edits: int, rng: random.Random) -> str:
+    """Applies up to edits random insertions, deletions, substitutions or swaps"""
+    for _ in range(edits):
+        position = rng.randrange(len(text) + 1)
+        letter = rng.choice(string.ascii_lowercase)
+        edit = rng.choice(['insert', 'delete', 'substitute', 'swap'])
+        if edit == 'insert':
+            text = text[:position] + letter + text[position:]
+        elif position < len(text) and edit == 'delete':
+            text = text[:position] + text[position + 1:]
+        elif position < len(text) and edit == 'substitute':
+            text = text[:position] + letter + text[position + 1:]
+        elif position + 1 < len(text):
+            text = text[:position] + text[position + 1] + text[position] + text[position + 2:]
+    return text
+
+
+class EditDistanceTest(unittest.TestCase):
+    def test_counts_each_kind_of_edit_once(self):
+        self.assertEqual(edit_distance('cough', 'cough', 2), 0)
+        self.assertEqual(edit_distance('cough', 'couhg', 2), 1)
+        self.assertEqual(edit_distance('cough', 'coug', 2), 1)
+        self.assertEqual(edit_distance('cough', 'cougha', 2), 1)
+        self.assertEqual(edit_distance('cough', 'caugh', 2), 1)
+        self.assertEqual(edit_distance('fever', 'cough', 2), 3)
+
+    def test_banded_distance_matches_full_table(self):
+        rng = random.Random(10)
+        for _ in range(2000):
+            first = ''.join(rng.choice('abcde') for _ in range(rng.randint(0, 9)))
+            second = misspell(first, rng.randint(0, 4), rng)
+            limit = rng.randint(0, 3)
+
+            self.assertEqual(
+                edit_distance(first, second, limit),
+                min(full_edit_distance(first, second), limit + 1),
+                (first, second, limit)
+            )
+
+
+class FuzzyIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = FuzzyIndex([
+            ('headache', 'headache'),
+            ('head ache', 'headache'),
+            ('fever', 'fever'),
+            ('fever', 'pyrexia'),
+            ('sensitivity to light', 'photophobia')
+        ])
+
+    def test_resolves_known_and_misspelled_terms(self):
+        self.assertEqual(self.index.resolve('Fever '), 'fever')
+        self.assertEqual(self.index.resolve('hedache'), 'headache')
+        self.assertEqual(self.index.resolve('sensitivty to ligth'), 'photophobia')
+        self.assertIsNone(self.index.resolve('nausea'))
+
+    def test_short_text_tolerates_fewer_edits(self):
+        self.assertIsNone(FuzzyIndex([('flu', 'flu')]).resolve('flo'))
+        self.assertEqual(self.index.resolve('fevr'), 'fever')
+        self.assertIsNone(self.index.resolve('fxvxr'))
+
+    def test_closest_term_wins_and_ties_go_to_the_earlier_term(self):
+        self.assertEqual(self.index.matches('headach', 2), [(1, 'headache'), (2, 'head ache')])
+        index = FuzzyIndex([('abdominal', 'first'), ('abdominax', 'second')])
+        self.assertEqual(index.matches('abdominaz', 2), [(1, 'abdominal'), (1, 'abdominax')])
+        self.assertEqual(index.resolve('abdominaz'), 'first')
+
+    def test_first_pair_of_a_term_wins(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.resolve('fever'), 'fever')
+
+    def test_symptom_resolver_matches_brute_force(self):
+        index = get_symptom_resolver()
+        rng = random.Random(11)
+        for _ in range(100):
+            query = misspell(rng.choice(index.terms), rng.randint(1, 3), rng)
+            max_distance = rng.randint(0, 2)
+            expected = []
+            for term_id, term in enumerate(index.terms):
+                # Texts differing in length by more edits cannot be within them
+                if abs(len(term) - len(query)) <= max_distance:
+                    distance = full_edit_distance(query, term)
+                    if distance <= max_distance:
+                        expected.append((distance, term_id))
+            expected.sort()
+
+            self.assertEqual(
+                index.matches(query, max_distance),
+                [(distance, index.terms[term_id]) for distance, term_id in expected],
+                query
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import symptom_tracker
+from scoring_executor import ScoringExecutor
+
+PATIENT = {
+    'symptoms': ['fever', 'cough'],
+    'duration': 3,
+    'duration_unit': 'days',
+    'severity': 'mild',
+    'age': 30,
+    'gender': 'Male',
+    'top_k': 3
+}
+
+
+class SharedSnapshotFilesTest(unittest.IsolatedAsyncioTestCase):
+    async def test_restart_removes_the_previous_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(symptom_tracker, 'SHARED_TABLES_DIR', directory):
+            executor = ScoringExecutor('process', max_workers=1, share_tables=True)
+            try:
+                first = await executor.run(symptom_tracker.calculate_diagnosis, **PATIENT)
+                [previous] = os.listdir(directory)
+
+                symptom_tracker.reload_knowledge_tables()
+                executor.restart()
+                second = await executor.run(symptom_tracker.calculate_diagnosis, **PATIENT)
+                # The old pool is retired in the background
+                for thread in threading.enumerate():
+                    if thread.name == 'scoring-retire':
+                        thread.join()
+
+                self.assertEqual(first, second)
+                self.assertNotIn(previous, os.listdir(directory))
+                self.assertEqual(len(os.listdir(directory)), 1)
+            finally:
+                executor.shutdown()
+            self.assertEqual(os.listdir(directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
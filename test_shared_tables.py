@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+
+import symptom_tracker
+from symptom_tracker import calculate_diagnosis, find_partial_matches, get_scoring_tables
+from test_symptom_tracker import random_profiles, ranked
+
+
+class SharedScoringTablesTest(unittest.TestCase):
+    def setUp(self):
+        self.heap_tables = get_scoring_tables()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = symptom_tracker.export_shared_tables(directory.name)
+
+    def tearDown(self):
+        symptom_tracker._scoring_tables = self.heap_tables
+
+    def score(self, tables, profiles, backend):
+        symptom_tracker._scoring_tables = tables
+        return [
+            ranked(calculate_diagnosis(**profile, backend=backend, use_cache=False))
+            for profile in profiles
+        ]
+
+    def test_attached_tables_match_heap_tables(self):
+        symptom_tracker.attach_shared_tables(self.path)
+        shared_tables = get_scoring_tables()
+        self.assertIsNot(shared_tables, self.heap_tables)
+        self.assertEqual(shared_tables.version, self.heap_tables.version)
+
+        profiles = random_profiles(300, seed=6)
+        profiles[0] = dict(profiles[0], symptoms=profiles[0]['symptoms'] + ['not a symptom'])
+        for backend in ('dict', 'matrix'):
+            for top_k in (None, 5):
+                batch = [dict(profile, top_k=top_k) for profile in profiles]
+                self.assertEqual(
+                    self.score(shared_tables, batch, backend),
+                    self.score(self.heap_tables, batch, backend),
+                    (backend, top_k)
+                )
+
+    def test_attached_partial_matches_match_heap_tables(self):
+        symptom_tracker.attach_shared_tables(self.path)
+        shared_tables = get_scoring_tables()
+        for members in self.heap_tables.combinations.members[:300]:
+            symptom_ids = list(members) + [-1]
+            expected = find_partial_matches(symptom_ids, self.heap_tables)
+            for backend in ('dict', 'matrix'):
+                self.assertEqual(find_partial_matches(symptom_ids, shared_tables, backend), expected, backend)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import random
+import unittest
+from typing import List, Tuple
+
+from suggestion_index import MIN_SIMILARITY, SuggestionIndex, trigrams
+from symptom_tracker import get_suggestion_index
+
+TERMS = [
+    ('chest pain', 'chest pain'),
+    ('pain in chest', 'chest pain'),
+    ('back pain', 'back pain'),
+    ('painful urination', 'painful urination'),
+    ('headache', 'headache'),
+    ('migraine headache', 'migraine headache'),
+    ('sensitivity to light', 'photophobia'),
+    ('photophobia', 'photophobia')
+]
+
+
+def brute_force_suggest(index: SuggestionIndex, text: str, limit: int) -> List[str]:
+    """Ranks every term of index the way SuggestionIndex documents, without the trie or pruning"""
+    query = text.strip().lower()
+    query_trigrams = set(trigrams(query))
+    term_trigrams = [set(trigrams(term)) for term in index.terms]
+    ranked: List[Tuple[float, int]] = []
+    for term_id, term in enumerate(index.terms):
+        if term.startswith(query):
+            rank = 0
+        elif f' {query}' in term:
+            rank = 1
+        elif query in term:
+            rank = 2
+        else:
+            shared = len(query_trigrams & term_trigrams[term_id])
+            similarity = 2 * shared / (len(query_trigrams) + len(term_trigrams[term_id]))
+            if similarity < MIN_SIMILARITY:
+                continue
+            rank = 4 - similarity
+        ranked.append((rank, term_id))
+
+    suggestions: List[str] = []
+    for _, term_id in sorted(ranked):
+        if index.suggestions[term_id] not in suggestions:
+            suggestions.append(index.suggestions[term_id])
+    return suggestions[:limit]
+
+
+class SuggestionIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SuggestionIndex(TERMS)
+
+    def test_whole_term_prefixes_rank_before_word_prefixes(self):
+        self.assertEqual(self.index.suggest('pain'), ['chest pain', 'painful urination', 'back pain'])
+        self.assertEqual(self.index.suggest('head'), ['headache', 'migraine headache'])
+
+    def test_substring_and_misspelled_text(self):
+        self.assertEqual(self.index.suggest('ache'), ['headache', 'migraine headache'])
+        self.assertEqual(self.index.suggest('hedache'), ['headache'])
+        self.assertEqual(self.index.suggest('xyzzy'), [])
+
+    def test_aliases_suggest_their_symptom_once(self):
+        self.assertEqual(self.index.suggest('Sensitivity'), ['photophobia'])
+        self.assertEqual(self.index.suggest('ches'), ['chest pain'])
+
+    def test_limit_and_empty_text(self):
+        self.assertEqual(self.index.suggest('pain', limit=1), ['chest pain'])
+        self.assertEqual(self.index.suggest('   '), [])
+        self.assertEqual(SuggestionIndex(TERMS, top=1).suggest('pain', limit=3), self.index.suggest('pain', limit=3))
+
+    def test_symptom_index_matches_brute_force(self):
+        index = get_suggestion_index()
+        rng = random.Random(9)
+        for _ in range(100):
+            term = rng.choice(index.terms)
+            start = rng.randrange(len(term))
+            query = term[start:start + rng.randint(3, 12)]
+            if rng.random() < 0.5 and len(query) > 3:
+                position = rng.randrange(len(query))
+                query = query[:position] + query[position + 1:]
+            query = query.strip()
+            if len(query) < 3:
+                continue
+            limit = rng.choice([1, 5, 8])
+
+            self.assertEqual(index.suggest(query, limit), brute_force_suggest(index, query, limit), query)
+
+
+if __name__ == '__main__':
+    unittest.main()
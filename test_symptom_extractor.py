@@ -0,0 +1,89 @@
+import random
+import unittest
+from typing import List, Tuple
+
+from symptom_extractor import SymptomExtractor
+from symptom_tracker import get_symptom_extractor
+
+TERMS = [
+    ('fever', 'fever'),
+    ('hay fever', 'hay fever'),
+    ('cough', 'cough'),
+    ('chills', 'chills'),
+    ('sensitivity to light', 'photophobia'),
+    ('photophobia', 'photophobia')
+]
+
+
+def brute_force_matches(extractor: SymptomExtractor, text: str) -> List[Tuple[int, int, int]]:
+    """Leftmost-longest whole-word term occurrences, found by trying every term at every position"""
+    matches = []
+    position = 0
+    while position < len(text):
+        found = [
+            (position + len(term), term_id) for term_id, term in enumerate(extractor.terms)
+            if text.startswith(term, position)
+            and (position == 0 or not text[position - 1].isalnum())
+            and (position + len(term) == len(text) or not text[position + len(term)].isalnum())
+        ]
+        if found:
+            end, term_id = max(found, key=lambda match: (match[0], -match[1]))
+            matches.append((position, end, term_id))
+            position = end
+        else:
+            position += 1
+    return matches
+
+
+class SymptomExtractorTest(unittest.TestCase):
+    def setUp(self):
+        self.extractor = SymptomExtractor(TERMS)
+
+    def test_finds_whole_word_symptoms_in_order(self):
+        self.assertEqual(self.extractor.extract('I have a Cough and a fever'), ['cough', 'fever'])
+        self.assertEqual(self.extractor.extract('feverish, coughing'), [])
+        self.assertEqual(self.extractor.extract('my hay fever is back'), ['hay fever'])
+
+    def test_aliases_report_their_symptom_once(self):
+        self.assertEqual(
+            self.extractor.extract('photophobia, also called sensitivity to light'),
+            ['photophobia']
+        )
+
+    def test_negation_cues_within_the_window(self):
+        self.assertEqual(self.extractor.mentions('no fever'), [('fever', True)])
+        self.assertEqual(self.extractor.mentions("I don't have a cough"), [('cough', True)])
+        self.assertEqual(self.extractor.mentions('I don’t have a cough'), [('cough', True)])
+        self.assertEqual(self.extractor.mentions('no signs of fever'), [('fever', True)])
+        self.assertEqual(self.extractor.mentions('no recent history of any fever'), [('fever', False)])
+
+    def test_negation_carries_through_lists(self):
+        self.assertEqual(
+            self.extractor.mentions('no fever, cough or chills'),
+            [('fever', True), ('cough', True), ('chills', True)]
+        )
+        self.assertEqual(self.extractor.extract('denies fever, cough or chills'), [])
+
+    def test_clause_breaks_end_negation(self):
+        self.assertEqual(self.extractor.extract('no fever but a bad cough'), ['cough'])
+        self.assertEqual(self.extractor.extract('No fever. Chills at night'), ['chills'])
+        self.assertEqual(self.extractor.extract('no fever, then a cough'), ['cough'])
+
+    def test_negated_mention_does_not_hide_a_later_one(self):
+        self.assertEqual(self.extractor.extract('no fever yesterday, fever today'), ['fever'])
+
+    def test_symptom_extractor_matches_brute_force(self):
+        extractor = get_symptom_extractor()
+        rng = random.Random(12)
+        fillers = ['and', 'no', 'a', 'bad', ',', '.', 'x', 'feel']
+        for _ in range(200):
+            words = []
+            for _ in range(rng.randint(1, 8)):
+                words.append(rng.choice(extractor.terms) if rng.random() < 0.5 else rng.choice(fillers))
+            text = ' '.join(words)
+
+            self.assertEqual(extractor._longest_matches(text), brute_force_matches(extractor, text), text)
+
+
+if __name__ == '__main__':
+    unittest.main()
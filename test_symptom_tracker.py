@@ -0,0 +1,248 @@
+import random
+import unittest
+from types import SimpleNamespace
+from typing import Dict, List
+from unittest.mock import AsyncMock
+
+import symptom_tracker
+from symptom_tracker import (
+    IncrementalScorer,
+    SymptomTracker,
+    calculate_diagnosis,
+    calculate_diagnosis_batch,
+    calculate_individual_scores,
+    find_partial_matches,
+    get_scoring_tables
+)
+
+PATIENT = {
+    'duration': 3,
+    'duration_unit': 'days',
+    'severity': 'moderate',
+    'age': 30,
+    'gender': 'Female',
+    'use_cache': False
+}
+
+
+def message_update(text: str) -> SimpleNamespace:
+    return SimpleNamespace(message=SimpleNamespace(text=text, reply_text=AsyncMock()))
+
+
+def random_profiles(count: int, seed: int) -> List[Dict]:
+    """Random calculate_diagnosis inputs; every third one lists a whole symptom combination"""
+    tables = get_scoring_tables()
+    rng = random.Random(seed)
+    profiles = []
+    for position in range(count):
+        if position % 3 == 0:
+            symptoms = tables.symptom_names(rng.choice(tables.combinations.members))
+        else:
+            symptoms = rng.sample(tables.symptoms.names, rng.randint(1, 6))
+        profiles.append({
+            'symptoms': list(symptoms),
+            'duration': rng.randint(1, 60),
+            'duration_unit': rng.choice(['days', 'weeks', 'months']),
+            'severity': rng.choice(['mild', 'moderate', 'severe']),
+            'age': rng.randint(1, 90),
+            'gender': rng.choice(['male', 'female', 'other']),
+            'drug_history': rng.choice([None] + list(tables.drugs)),
+            'travel_region': rng.choice([None, None] + list(tables.travel)),
+            'risk_factors': rng.sample(list(tables.risks), rng.randint(0, 3)) or None
+        })
+    return profiles
+
+
+def ranked(result: Dict) -> List:
+    """The diagnoses of a result, with matched symptoms in a fixed order"""
+    if 'error' in result:
+        return result
+    return [
+        (
+            diagnosis.diagnosis,
+            diagnosis.probability,
+            diagnosis.confidence,
+            sorted(diagnosis.matching_factors['symptom_match'].split(', ')),
+            diagnosis.matching_factors['risk_factor_match'],
+            diagnosis.matching_factors['travel_risk_match']
+        )
+        for diagnosis in result['detailed']
+    ]
+
+
+class TrackAliasesTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tracker = SymptomTracker()
+        self.context = SimpleNamespace(user_data={}, args=[])
+        await self.tracker.start_tracking(message_update('/track'), self.context)
+
+    async def send(self, text: str) -> str:
+        update = message_update(text)
+        await self.tracker.handle_symptoms(update, self.context)
+        return update.message.reply_text.await_args.args[0]
+
+    async def remove(self, symptom: str) -> str:
+        update = message_update(f'/remove {symptom}')
+        self.context.args = symptom.split()
+        await self.tracker.handle_remove_symptom(update, self.context)
+        return update.message.reply_text.await_args.args[0]
+
+    @property
+    def symptoms(self):
+        return self.context.user_data['patient_info']['symptoms']
+
+    async def test_alias_of_listed_symptom_is_already_added(self):
+        self.assertTrue((await self.send('photophobia')).startswith('Added'))
+        self.assertIn('already in your list', await self.send('sensitivity to light'))
+        self.assertEqual(self.symptoms, ['photophobia'])
+
+    async def test_remove_by_alias_keeps_list_and_scorer_in_step(self):
+        await self.send('sensitivity to light')
+        await self.send('fever')
+
+        self.assertTrue((await self.remove('photophobia')).startswith('Removed: sensitivity to light'))
+        self.assertEqual(self.symptoms, ['fever'])
+        self.assertEqual(self.context.user_data['scorer'].symptoms, {'fever'})
+
+    async def test_finalize_matches_calculate_diagnosis_after_alias_edits(self):
+        await self.send('photophobia')
+        await self.send('sensitivity to light')
+        await self.send('fever')
+        await self.remove('photophobia')
+        await self.send('sensitivity to light')
+
+        scorer = self.context.user_data['scorer']
+        self.assertEqual(
+            scorer.finalize(symptoms=list(self.symptoms), **PATIENT),
+            calculate_diagnosis(symptoms=list(self.symptoms), **PATIENT)
+        )
+        self.assertEqual(
+            scorer.finalize(symptoms=['sensitivity to light', 'fever'], **PATIENT)['detailed'][0].diagnosis,
+            'Meningitis'
+        )
+
+
+class ReloadIndexesTest(unittest.TestCase):
+    def test_reload_publishes_indexes_with_the_snapshot(self):
+        version = symptom_tracker.reload_knowledge_tables()
+
+        self.assertEqual(version, symptom_tracker.get_scoring_tables().version)
+        for name in symptom_tracker.SNAPSHOT_INDEXES:
+            self.assertEqual(symptom_tracker._snapshot_indexes[name][0], version)
+        self.assertEqual(symptom_tracker.get_symptom_resolver().resolve('couhg'), 'cough')
+
+
+class ScoringBackendsTest(unittest.TestCase):
+    def test_matrix_backend_scores_like_dict_backend(self):
+        tables = get_scoring_tables()
+        factors = {'duration': 'short', 'severity': 'mild', 'age_group': 'adult', 'gender': 'female'}
+        for profile in random_profiles(300, seed=2):
+            symptom_ids = tables.symptom_ids(profile['symptoms'])
+            expected = calculate_individual_scores(symptom_ids, factors, 'dict', tables)
+            scores = calculate_individual_scores(symptom_ids, factors, 'matrix', tables)
+
+            self.assertEqual(scores.keys(), expected.keys())
+            for disease_id, data in expected.items():
+                self.assertAlmostEqual(scores[disease_id]['score'], data['score'])
+
+    def test_backends_give_identical_diagnoses(self):
+        for profile in random_profiles(300, seed=2):
+            self.assertEqual(
+                ranked(calculate_diagnosis(**profile, backend='matrix', use_cache=False)),
+                ranked(calculate_diagnosis(**profile, backend='dict', use_cache=False)),
+                profile
+            )
+
+    def test_combination_matrix_matches_dict_partial_matches(self):
+        tables = get_scoring_tables()
+        rng = random.Random(7)
+        for position in range(500):
+            if position % 2:
+                symptom_ids = rng.sample(range(len(tables.symptoms)), rng.randint(1, 8))
+            else:
+                # Whole combinations, part of one, or one with an unknown symptom
+                members = list(rng.choice(tables.combinations.members))
+                symptom_ids = rng.sample(members, rng.randint(1, len(members)))
+            if position % 5 == 0:
+                symptom_ids.append(-1)
+
+            self.assertEqual(
+                find_partial_matches(symptom_ids, tables, 'matrix'),
+                find_partial_matches(symptom_ids, tables, 'dict'),
+                symptom_ids
+            )
+
+
+class TopDiagnosesTest(unittest.TestCase):
+    def test_pruned_ranking_matches_full_ranking(self):
+        rng = random.Random(8)
+        for profile in random_profiles(1000, seed=8):
+            top_k = rng.choice([1, 3, 5, 10])
+            full = ranked(calculate_diagnosis(**profile, use_cache=False))
+            expected = full if 'error' in full else full[:top_k]
+
+            self.assertEqual(ranked(calculate_diagnosis(**profile, top_k=top_k, use_cache=False)), expected, profile)
+            self.assertEqual(
+                ranked(calculate_diagnosis(**profile, backend='matrix', top_k=top_k, use_cache=False)),
+                expected,
+                profile
+            )
+
+
+class BatchDiagnosisTest(unittest.TestCase):
+    def test_batch_matches_single_calls(self):
+        profiles = random_profiles(200, seed=3)
+        # Repeated profiles are scored once and must still land in every position
+        profiles += profiles[:20]
+        for backend in ('dict', 'matrix'):
+            for top_k in (None, 5):
+                expected = [
+                    ranked(calculate_diagnosis(**profile, backend=backend, top_k=top_k, use_cache=False))
+                    for profile in profiles
+                ]
+                batch = calculate_diagnosis_batch(profiles, backend, top_k)
+                self.assertEqual([ranked(result) for result in batch], expected, (backend, top_k))
+
+    def test_batch_reports_empty_profiles_in_place(self):
+        profiles = random_profiles(2, seed=3)
+        profiles.insert(1, dict(profiles[0], symptoms=[]))
+
+        results = calculate_diagnosis_batch(profiles)
+
+        self.assertEqual(results[1], {'error': 'Please select at least one symptom'})
+        self.assertEqual(ranked(results[2]), ranked(calculate_diagnosis(**profiles[2], use_cache=False)))
+
+
+class IncrementalScorerTest(unittest.TestCase):
+    def test_random_edits_match_full_scoring(self):
+        for profile in random_profiles(60, seed=5):
+            scorer = IncrementalScorer()
+            tables = scorer.tables
+            rng = random.Random(profile['age'])
+            pool = profile['symptoms'] + rng.sample(tables.symptoms.names, 3) + ['not a symptom']
+            tracked = set()
+            for _ in range(15):
+                symptom = rng.choice(pool)
+                if symptom in tracked:
+                    self.assertTrue(scorer.remove(symptom))
+                    tracked.discard(symptom)
+                else:
+                    self.assertTrue(scorer.add(symptom))
+                    tracked.add(symptom)
+
+                self.assertEqual(
+                    scorer.partial_matches(),
+                    find_partial_matches(tables.symptom_ids(list(tracked)), tables)
+                )
+
+            # finalize syncs to the symptoms it is given, not the tracked ones
+            symptoms = rng.sample(pool, 3)
+            self.assertEqual(
+                ranked(scorer.finalize(**dict(profile, symptoms=symptoms), use_cache=False)),
+                ranked(calculate_diagnosis(**dict(profile, symptoms=symptoms), use_cache=False))
+            )
+            self.assertEqual(scorer.symptoms, {scorer.canonical(symptom) for symptom in symptoms})
+
+
+if __name__ == '__main__':
+    unittest.main()
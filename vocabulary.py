@@ -0,0 +1,71 @@
+from typing import Dict, Iterable, List, Optional
+
+# ID given to names that are not in a vocabulary; it never matches a table entry
+UNKNOWN_ID = -1
+
+
+def canonical_name(name: str) -> str:
+    """Lower-cases a name and collapses its whitespace, so spellings compare equal"""
+    return ' '.join(name.split()).casefold()
+
+
+class Vocabulary:
+    """Dense integer IDs for names that may be spelled several ways"""
+
+    def __init__(self, keep_case: bool = True):
+        """
+        Args:
+            keep_case: Display names keep their table spelling; otherwise the
+                canonical lower-case spelling is shown
+        """
+        self.keep_case = keep_case
+        # Canonical spelling or alias -> ID, and ID -> name shown to users
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        """
+        Returns the ID of name, adding it when no spelling of it is known yet.
+
+        The display name of an ID is its first spelling, except that a
+        capitalized spelling ("Dengue Fever") replaces an all-lower-case one
+        ("dengue fever") when both occur.
+        """
+        key = canonical_name(name)
+        spelling = ' '.join(name.split()) if self.keep_case else key
+        name_id = self.ids.get(key)
+        if name_id is None:
+            name_id = self.ids[key] = len(self.names)
+            self.names.append(spelling)
+        elif self.names[name_id].islower() and not spelling.islower():
+            self.names[name_id] = spelling
+        return name_id
+
+    def add_alias(self, alias: str, name: str) -> int:
+        """Maps alias onto the ID of name and returns that ID"""
+        name_id = self.intern(name)
+        self.ids.setdefault(canonical_name(alias), name_id)
+        return name_id
+
+    def id(self, name: str) -> int:
+        """Returns the ID of name, or UNKNOWN_ID"""
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.ids.get(canonical_name(name), UNKNOWN_ID)
+        return name_id
+
+    def ids_of(self, names: Iterable[str]) -> List[int]:
+        """Returns the IDs of names in order, with UNKNOWN_ID for unknown ones"""
+        return [self.id(name) for name in names]
+
+    def name(self, name_id: int) -> str:
+        """Returns the display name of an ID"""
+        return self.names[name_id]
+
+    def display(self, name: str) -> Optional[str]:
+        """Returns the display name for any spelling of a known name"""
+        name_id = self.id(name)
+        return None if name_id == UNKNOWN_ID else self.names[name_id]